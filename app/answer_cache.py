@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from psycopg2.extras import Json
+
+from db_utils import PgConnectionPool, make_conn_str
+from instrumentation import METRICS
+
+_ANSWER_CACHE: "SemanticAnswerCache | None" = None
+_ANSWER_CACHE_LOCK = threading.Lock()
+
+
+class SemanticAnswerCache:
+    """
+    질문 임베딩의 코사인 유사도로 이전 답변을 재사용하는 pgvector 기반 캐시.
+    (컬렉션, 임베딩 모델, k, 질문의 제품 집합, 섹션 집합)이 같고 TTL 안에 저장된 답변 중 가장 가까운 것이
+    threshold 이상이면 guard/검색/생성 없이 그 답변과 근거를 돌려준다.
+    임베딩이 비슷해도 다른 약의 답변을 돌려주면 안 되므로, 제품명이 없는 질문은 캐시하지 않는다.
+    같은 약이라도 "보관법"과 "부작용"처럼 묻는 섹션이 다르면 다른 답변이므로 섹션 집합도 키에 넣는다.
+    TTL이 지난 행은 store()가 purge_interval초마다 한 번씩 지운다.
+    """
+
+    def __init__(
+        self,
+        conn_str: str,
+        table: str = "rag_answer_cache",
+        threshold: float = 0.95,
+        ttl_seconds: int = 86400,
+        purge_interval: float = 3600.0,
+    ) -> None:
+        self.table = table
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.pool = PgConnectionPool(conn_str, minconn=1)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.purged = 0
+        self._last_purge = time.monotonic()
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def ensure_schema(self) -> None:
+        """캐시 테이블이 없으면 만든다. 모델마다 차원이 달라 embedding은 차원 제한 없이 둔다."""
+        if self._schema_ready:
+            return
+
+        def _create(conn) -> None:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        id BIGSERIAL PRIMARY KEY,
+                        collection TEXT NOT NULL,
+                        embedding_model TEXT NOT NULL,
+                        k INTEGER NOT NULL,
+                        products TEXT[] NOT NULL DEFAULT '{{}}',
+                        sections TEXT[] NOT NULL DEFAULT '{{}}',
+                        question TEXT NOT NULL,
+                        embedding VECTOR NOT NULL,
+                        answer TEXT NOT NULL,
+                        citations JSONB NOT NULL DEFAULT '[]'::jsonb,
+                        in_domain BOOLEAN NOT NULL DEFAULT TRUE,
+                        hit_count INTEGER NOT NULL DEFAULT 0,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                # products 컬럼이 없던 테이블: 기존 행은 빈 제품 집합이 되어 다시는 조회되지 않는다
+                cur.execute(
+                    f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS products TEXT[] NOT NULL DEFAULT '{{}}'"
+                )
+                # sections 컬럼이 없던 테이블: 기존 행은 NULL이 되어 어떤 섹션 집합과도 같지 않으므로 조회되지 않는다
+                cur.execute(f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS sections TEXT[]")
+                cur.execute(f"DROP INDEX IF EXISTS {self.table}_lookup_idx")
+                cur.execute("SELECT indexdef FROM pg_indexes WHERE indexname = %s", (f"{self.table}_products_lookup_idx",))
+                row = cur.fetchone()
+                if row and "sections" not in row[0]:
+                    cur.execute(f"DROP INDEX {self.table}_products_lookup_idx")
+                cur.execute(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS {self.table}_products_lookup_idx
+                    ON {self.table} (collection, embedding_model, k, products, sections, created_at)
+                    """
+                )
+
+        self.pool.run(_create)
+        self._schema_ready = True
+
+    def lookup(
+        self,
+        embedding: List[float],
+        collection: str,
+        embedding_model: str,
+        k: int,
+        products: Sequence[str],
+        sections: Sequence[str] = (),
+    ) -> Optional[Dict[str, Any]]:
+        """
+        제품 집합과 섹션 집합이 정확히 같은 질문 중 threshold 이상으로 비슷한 캐시된 답변을 찾는다 (없으면 None).
+        products가 비어 있으면 조회하지 않는다.
+        """
+        products = product_key(products)
+        if not products:
+            return None
+        sections = product_key(sections)
+        self.ensure_schema()
+
+        def _select(conn):
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    SELECT id, question, answer, citations, in_domain,
+                           1 - (embedding <=> %s::vector) AS similarity
+                    FROM {self.table}
+                    WHERE collection = %s
+                      AND embedding_model = %s
+                      AND k = %s
+                      AND products = %s::text[]
+                      AND sections = %s::text[]
+                      AND created_at > now() - make_interval(secs => %s)
+                    ORDER BY embedding <=> %s::vector
+                    LIMIT 1
+                    """,
+                    (embedding, collection, embedding_model, k, products, sections, self.ttl_seconds, embedding),
+                )
+                row = cur.fetchone()
+                if row and row[5] >= self.threshold:
+                    cur.execute(
+                        f"UPDATE {self.table} SET hit_count = hit_count + 1 WHERE id = %s",
+                        (row[0],),
+                    )
+                return row
+
+        row = self.pool.run(_select)
+        hit = row is not None and row[5] >= self.threshold
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not hit:
+            return None
+        return {
+            "question": row[1],
+            "answer": row[2],
+            "citations": row[3],
+            "in_domain": row[4],
+            "similarity": float(row[5]),
+        }
+
+    def store(
+        self,
+        embedding: List[float],
+        collection: str,
+        embedding_model: str,
+        k: int,
+        question: str,
+        answer: str,
+        citations: List[Dict[str, Any]],
+        in_domain: bool,
+        products: Sequence[str],
+        sections: Sequence[str] = (),
+    ) -> bool:
+        """
+        생성된 답변을 질문의 제품 집합, 섹션 집합과 함께 캐시에 저장한다 (저장했으면 True).
+        제품명이 없는 질문과 도메인 밖(fallback) 답변은 저장하지 않는다.
+        """
+        products = product_key(products)
+        if not answer or not in_domain or not products:
+            return False
+        sections = product_key(sections)
+        self.ensure_schema()
+        purge = self._purge_due()
+
+        def _insert(conn) -> int:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO {self.table}
+                        (collection, embedding_model, k, products, sections, question, embedding, answer, citations, in_domain)
+                    VALUES (%s, %s, %s, %s::text[], %s::text[], %s, %s::vector, %s, %s, %s)
+                    """,
+                    (
+                        collection, embedding_model, k, products, sections,
+                        question, embedding, answer, Json(citations), in_domain,
+                    ),
+                )
+                if not purge:
+                    return 0
+                cur.execute(
+                    f"DELETE FROM {self.table} WHERE created_at <= now() - make_interval(secs => %s)",
+                    (self.ttl_seconds,),
+                )
+                return cur.rowcount
+
+        purged = self.pool.run(_insert)
+        with self._lock:
+            self.stores += 1
+            self.purged += purged
+        return True
+
+    def _purge_due(self) -> bool:
+        """마지막 정리 후 purge_interval초가 지났으면 이번 store()에서 만료 행을 지운다."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_purge < self.purge_interval:
+                return False
+            self._last_purge = now
+            return True
+
+    def invalidate(self, collection: Optional[str] = None) -> int:
+        """컬렉션(없으면 전체)의 캐시를 비운다. 재적재 후 예전 근거로 만든 답변을 버리기 위함."""
+        def _delete(conn) -> int:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (self.table,))
+                if not cur.fetchone()[0]:
+                    return 0
+                if collection is None:
+                    cur.execute(f"DELETE FROM {self.table}")
+                else:
+                    cur.execute(f"DELETE FROM {self.table} WHERE collection = %s", (collection,))
+                return cur.rowcount
+
+        return self.pool.run(_delete)
+
+    def purge_expired(self) -> int:
+        """TTL이 지난 캐시 행을 삭제한다."""
+        self.ensure_schema()
+
+        def _delete(conn) -> int:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"DELETE FROM {self.table} WHERE created_at <= now() - make_interval(secs => %s)",
+                    (self.ttl_seconds,),
+                )
+                return cur.rowcount
+
+        purged = self.pool.run(_delete)
+        with self._lock:
+            self._last_purge = time.monotonic()
+            self.purged += purged
+        return purged
+
+    def stats(self) -> Dict[str, float]:
+        """캐시 적중률 지표 (instrumentation.METRICS의 Prometheus 출력에도 rag_answer_cache_*로 나간다)"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "purged": self.purged,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def product_key(products: Sequence[str]) -> List[str]:
+    """캐시 키로 쓰는 제품/섹션 집합 (순서와 중복을 없앤 정렬 목록)"""
+    return sorted({product for product in products if product})
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """ANSWER_CACHE_ENABLED=true로 명시해 켠 경우에만 프로세스 공용 캐시를 반환 (기본은 꺼짐, None)"""
+    global _ANSWER_CACHE
+    if os.getenv("ANSWER_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    with _ANSWER_CACHE_LOCK:
+        if _ANSWER_CACHE is None:
+            _ANSWER_CACHE = SemanticAnswerCache(
+                make_conn_str(),
+                table=os.getenv("ANSWER_CACHE_TABLE", "rag_answer_cache"),
+                threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+                ttl_seconds=int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400")),
+                purge_interval=float(os.getenv("ANSWER_CACHE_PURGE_INTERVAL", "3600")),
+            )
+            METRICS.add_source("answer_cache", _ANSWER_CACHE.stats)
+    return _ANSWER_CACHE
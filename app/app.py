@@ -1,6 +1,5 @@
 import html
 import re
-import time
 import streamlit as st
 
 from screen.constant import ROLE_TYPE
@@ -14,6 +13,8 @@ from screen.history import (
 from screen.input import get_prompt
 from screen.utils import init_page, init_display
 from screen.top10 import render_top10
+from screen.debug import render_debug_panel
+from screen.display import throttled_stream
 from screen.pill_wallet import render_pill_wallet, render_pending_suggestions, process_user_message
 
 
@@ -73,22 +74,15 @@ def main():
             """
             update_chat_box(typing_html)
 
-            chunks = []
-            for part in provider(prompt):
-                chunks.append(str(part))
-                time.sleep(0.02)
-            final_answer = sanitize_answer("".join(chunks))
-
-            if final_answer:
-                assistant_template = "<div class=\"msg assistant\"><div class=\"content\">{}</div></div>"
-                chunk_len = 8
-                for idx in range(0, len(final_answer), chunk_len):
-                    partial_answer = final_answer[: idx + chunk_len]
+            # 첫 토큰은 바로, 이후 LLM 토큰은 STREAM_RENDER_EVERY개마다 말풍선을 갱신 (첫 토큰 전까지는 로딩 말풍선 유지)
+            assistant_template = "<div class=\"msg assistant\"><div class=\"content\">{}</div></div>"
+            answer = ""
+            for answer in throttled_stream(provider(prompt)):
+                partial_answer = sanitize_answer(answer)
+                if partial_answer:
                     partial_html = html.escape(partial_answer).replace("\n", "<br>")
                     update_chat_box(assistant_template.format(partial_html))
-                    time.sleep(0.04)
-            else:
-                update_chat_box()
+            final_answer = sanitize_answer(answer)
 
             add_history(ROLE_TYPE.assistant, final_answer)
             update_chat_box()  # 로딩 말풍선 제거 + 최종 답변 반영
@@ -97,6 +91,7 @@ def main():
             st.rerun()
 
         render_pending_suggestions()
+        render_debug_panel()
 
         st.markdown(
             """
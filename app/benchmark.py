@@ -0,0 +1,669 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from custom_pgvector import CustomPGVector, WRITE_MODES
+from db_utils import make_conn_str
+from embedding_utils import get_embedding_model
+from ingest_doc import CHUNK_STRATEGIES
+from instrumentation import LLMUsageCallback, percentile
+
+# 질문 파일을 주지 않았을 때 쓰는 기본 질문 (마지막은 도메인 밖 질문)
+DEFAULT_QUESTIONS: List[str] = [
+    "타이레놀 복용법 알려줘",
+    "지르텍 보관법은?",
+    "이부프로펜 부작용이 뭐야?",
+    "베아제를 먹고 속이 더부룩해요",
+    "바흐의 녹턴 교향곡이 외계인에게 주는 증상은?",
+]
+
+
+# guard 시드 예시와 겹치지 않는 평가용 질문 (True = 의약품 도메인)
+HELD_OUT_GUARD_QUESTIONS: List[Tuple[str, bool]] = [
+    ("판피린 먹고 졸음이 와요", True),
+    ("훼스탈은 식후에 먹나요?", True),
+    ("생리통에 먹을 수 있는 진통제 알려줘", True),
+    ("어린이 부루펜 시럽 보관 방법은?", True),
+    ("고혈압약이랑 감기약 같이 먹어도 돼?", True),
+    ("눈이 충혈됐을 때 쓰는 안약 추천해줘", True),
+    ("멀미약은 언제 먹어야 효과가 있어?", True),
+    ("수면유도제 오래 먹어도 괜찮나요?", True),
+    ("비타민C를 하루에 얼마나 먹어야 돼?", True),
+    ("아스피린 먹고 속쓰림이 있어요", True),
+    ("롤 티어 올리는 법 알려줘", False),
+    ("제주도 맛집 추천해줘", False),
+    ("모차르트 레퀴엠은 왜 미완성이야?", False),
+    ("비트코인 지금 사도 될까?", False),
+    ("고양이가 밥을 안 먹어", False),
+    ("스파이더맨 최신작 줄거리 알려줘", False),
+    ("이력서 자기소개 잘 쓰는 법", False),
+    ("외계인이 피자를 먹으면 무슨 일이 생겨?", False),
+    ("엑셀 VLOOKUP 함수 사용법", False),
+    ("월드컵 우승 국가 목록 알려줘", False),
+]
+
+
+def load_questions(path: str | None) -> List[str]:
+    """한 줄에 질문 하나인 txt 또는 {"question": ...} JSONL 파일을 읽는다."""
+    if not path:
+        return list(DEFAULT_QUESTIONS)
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            questions.append(json.loads(line)["question"] if line.startswith("{") else line)
+    return questions
+
+
+def bench_index(args) -> None:
+    """ANN 인덱스의 recall@k / 지연시간을 exact scan과 비교"""
+    store = CustomPGVector(
+        conn_str=make_conn_str(),
+        embedding_fn=get_embedding_model(),
+        table=args.table,
+    )
+    results = store.evaluate_index(
+        sample_size=args.samples,
+        k=args.k,
+        search_values=args.values,
+    )
+    print(f"=== INDEX RECALL (table={args.table}, k={args.k}, samples={args.samples}) ===")
+    for row in results:
+        print(
+            f"{row['setting']}={row['value']:<5} "
+            f"recall@{args.k}={row['recall']:.4f} | "
+            f"ann mean={row['latency_ms_mean']:.2f}ms p95={row['latency_ms_p95']:.2f}ms | "
+            f"exact mean={row['exact_latency_ms_mean']:.2f}ms p95={row['exact_latency_ms_p95']:.2f}ms"
+        )
+
+
+def bench_write(args) -> None:
+    """add_texts 쓰기 방식별 처리량(rows/sec) 비교 - 임베딩 비용을 빼기 위해 난수 벡터를 사용"""
+    conn_str = make_conn_str()
+    scratch = f"{args.table}_bench_write"
+    with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+        # 기본값까지 복사하면 id가 원본 테이블의 시퀀스를 같이 써서 벤치마크가 원본 id를 소모하므로
+        # 기본값은 빼고 id에 scratch 전용 identity를 붙인다 (원본이 identity면 LIKE가 새 시퀀스로 복사한다)
+        cur.execute(f"CREATE TABLE {scratch} (LIKE {args.table} INCLUDING ALL EXCLUDING DEFAULTS)")
+        cur.execute(
+            "SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+            (scratch,),
+        )
+        if cur.fetchone()[0] == "":
+            cur.execute(f"ALTER TABLE {scratch} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        cur.execute(
+            "SELECT atttypmod FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'embedding'",
+            (args.table,),
+        )
+        dim = cur.fetchone()[0]
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.rows, dim), dtype=np.float32).tolist()
+    texts = [f"제품명: 벤치마크{i} | 효능: " + "두통, 치통, 발열 완화. " * 40 for i in range(args.rows)]
+    metadatas = [
+        {"제품명": f"벤치마크{i}", "product_name": f"벤치마크{i}", "row_index": i, "chunk_index": 0}
+        for i in range(args.rows)
+    ]
+
+    store = CustomPGVector(conn_str=conn_str, embedding_fn=None, table=scratch)
+    results = {}
+    try:
+        store.ensure_schema()
+        for mode in args.modes:
+            store.pool.run(lambda conn: conn.cursor().execute(f"TRUNCATE TABLE {scratch}"))
+            started = time.perf_counter()
+            for start in range(0, args.rows, args.batch_size):
+                end = start + args.batch_size
+                store.add_texts(
+                    texts[start:end],
+                    metadatas=metadatas[start:end],
+                    embeddings=embeddings[start:end],
+                    mode=mode,
+                )
+            results[mode] = args.rows / (time.perf_counter() - started)
+    finally:
+        CustomPGVector.release(store)
+        with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+
+    print(f"=== WRITE THROUGHPUT (rows={args.rows}, batch={args.batch_size}, dim={dim}) ===")
+    baseline = results.get("row")
+    for mode, rows_per_sec in results.items():
+        speedup = f" (x{rows_per_sec / baseline:.1f} vs row)" if baseline else ""
+        print(f"{mode:<7} {rows_per_sec:,.0f} rows/sec{speedup}")
+
+
+def bench_parallel_guard(args) -> None:
+    """guard와 retrieve를 직렬/병렬로 실행했을 때 질문당 end-to-end 지연시간 비교"""
+    # .env에서 의미 캐시를 켜 두었더라도 적중이 측정을 왜곡하지 않도록 끈다 (graph_drug_rag import 전에 설정)
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    from graph_drug_rag import build_graph, warm_up_pipeline
+
+    questions = load_questions(args.questions)
+    warm_up_pipeline([args.collection])
+
+    modes = {"serial": build_graph(parallel_guard=False), "parallel": build_graph(parallel_guard=True)}
+    # 첫 실행 비용(모델 로딩, 임베딩 캐시)을 두 모드가 똑같이 지불하도록 한 번씩 먼저 돌린다
+    for question in questions:
+        modes["serial"].invoke({"question": question, "collection_name": args.collection, "k": args.k})
+
+    latencies = {name: [] for name in modes}
+    for _ in range(args.repeat):
+        for question in questions:
+            for name, app in modes.items():
+                started = time.perf_counter()
+                app.invoke({"question": question, "collection_name": args.collection, "k": args.k})
+                latencies[name].append((time.perf_counter() - started) * 1000)
+
+    print(f"=== GUARD/RETRIEVE PARALLEL (questions={len(questions)}, repeat={args.repeat}) ===")
+    for name, values in latencies.items():
+        print(
+            f"{name:<8} mean={statistics.fmean(values):.0f}ms "
+            f"p50={percentile(values, 50):.0f}ms p95={percentile(values, 95):.0f}ms"
+        )
+    saved = [s - p for s, p in zip(latencies["serial"], latencies["parallel"])]
+    print(f"saved per question: mean={statistics.fmean(saved):.0f}ms p50={percentile(saved, 50):.0f}ms")
+
+
+def bench_guard(args) -> None:
+    """임베딩 guard와 LLM guard의 판정 일치율 / 지연시간 비교 (held-out 질문 사용)"""
+    from domain_guard import get_domain_guard, load_examples
+    from graph_drug_rag import llm_guard
+
+    examples = load_examples(args.questions) if args.questions else HELD_OUT_GUARD_QUESTIONS
+    guard = get_domain_guard()
+    llm_guard(examples[0][0])  # LLM 로딩 비용은 측정에서 제외
+
+    agree = correct_embedding = correct_llm = deferred = 0
+    embedding_ms: List[float] = []
+    llm_ms: List[float] = []
+    for question, label in examples:
+        started = time.perf_counter()
+        verdict = guard.classify(question)
+        embedding_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        llm_verdict = llm_guard(question)
+        llm_ms.append((time.perf_counter() - started) * 1000)
+
+        if verdict is None:
+            deferred += 1
+            verdict = llm_verdict  # embedding 모드에서는 애매하면 LLM 결과를 쓴다
+        agree += verdict == llm_verdict
+        correct_embedding += verdict == label
+        correct_llm += llm_verdict == label
+
+    total = len(examples)
+    print(f"=== DOMAIN GUARD (questions={total}, uncertainty={guard.uncertainty}) ===")
+    print(f"agreement with llm guard: {agree / total:.2%}")
+    print(f"accuracy  embedding={correct_embedding / total:.2%} llm={correct_llm / total:.2%}")
+    print(f"deferred to llm: {deferred}/{total} ({deferred / total:.0%})")
+    print(
+        f"latency   embedding mean={statistics.fmean(embedding_ms):.1f}ms p95={percentile(embedding_ms, 95):.1f}ms | "
+        f"llm mean={statistics.fmean(llm_ms):.0f}ms p95={percentile(llm_ms, 95):.0f}ms"
+    )
+
+
+def naive_extract(lexicon: dict, text: str) -> list:
+    """예전 pill_wallet 방식: 메시지마다 별칭을 길이순 정렬 후 하나씩 부분문자열 검사"""
+    found = []
+    for alias in sorted(lexicon.keys(), key=len, reverse=True):
+        if alias and alias in text and lexicon[alias] not in found:
+            found.append(lexicon[alias])
+    return found
+
+
+def bench_extract(args) -> None:
+    """약 이름 추출: 별칭 루프 vs Aho-Corasick 매처 (별칭 사전은 합성 이름으로 --aliases개까지 채움)"""
+    from drug_matcher import AliasMatcher
+    from drug_synonyms import load_drug_synonyms
+
+    rng = np.random.default_rng(0)
+    syllables = [chr(code) for code in range(0xAC00, 0xD7A4, 37)]
+    lexicon = dict(load_drug_synonyms())
+    while len(lexicon) < args.aliases:
+        name = "".join(rng.choice(syllables, size=int(rng.integers(3, 9)))) + str(rng.choice(["정", "캡슐", "시럽", "연고"]))
+        lexicon[name] = (name, "합성성분")
+    aliases = list(lexicon)
+    messages = [
+        f"요즘 {rng.choice(aliases)}이랑 {rng.choice(aliases)} 복용 중인데 같이 먹어도 되나요? 어제부터 두통이 있어요"
+        for _ in range(args.messages)
+    ]
+
+    started = time.perf_counter()
+    matcher = AliasMatcher(lexicon)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    results = {}
+    for name, extract in (("loop", lambda text: naive_extract(lexicon, text)), ("aho", matcher.extract)):
+        latencies = []
+        for text in messages:
+            started = time.perf_counter()
+            extract(text)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[name] = latencies
+
+    print(f"=== DRUG EXTRACTION (aliases={len(lexicon):,}, messages={len(messages)}) ===")
+    print(f"matcher build: {build_ms:.0f}ms (한 번만)")
+    for name, values in results.items():
+        print(f"{name:<5} mean={statistics.fmean(values):.3f}ms p95={percentile(values, 95):.3f}ms")
+    print(f"speedup: x{statistics.fmean(results['loop']) / statistics.fmean(results['aho']):.0f}")
+
+
+def load_labeled_questions(path: str | None, store: CustomPGVector, samples: int) -> List[Tuple[str, str]]:
+    """
+    (질문, 정답 제품명) 목록. {"question": ..., "product": ...} JSONL을 주지 않으면
+    테이블에서 제품/섹션을 뽑아 "<제품명> <섹션> 알려줘" 형태로 만든다.
+    """
+    if path:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return [(row["question"], row["product"]) for row in rows]
+    with store.pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT setseed(0)")
+        cur.execute(
+            f"""
+            SELECT product_name, section
+            FROM (SELECT DISTINCT product_name, section FROM {store.table}
+                  WHERE product_name IS NOT NULL AND section IS NOT NULL) t
+            ORDER BY random()
+            LIMIT %s
+            """,
+            (samples,),
+        )
+        return [(f"{product} {section} 알려줘", product) for product, section in cur.fetchall()]
+
+
+def bench_hybrid(args) -> None:
+    """vector 단독 vs hybrid(vector + 부분일치 RRF) 검색의 hit-rate@k / MRR / 지연시간 비교"""
+    store = CustomPGVector(
+        conn_str=make_conn_str(),
+        embedding_fn=get_embedding_model(),
+        table=args.table,
+    )
+    labeled = load_labeled_questions(args.questions, store, args.samples)
+    modes = {"vector": store.similarity_search_with_score, "hybrid": store.hybrid_search_with_score}
+    # 첫 호출 비용(모델 로딩, 커넥션 생성)은 측정에서 제외
+    for search in modes.values():
+        search(labeled[0][0], k=args.k)
+
+    print(f"=== HYBRID RETRIEVAL (table={args.table}, questions={len(labeled)}, k={args.k}) ===")
+    for name, search in modes.items():
+        hits = 0
+        reciprocal_ranks: List[float] = []
+        latencies: List[float] = []
+        for question, product in labeled:
+            started = time.perf_counter()
+            docs_and_scores = search(question, k=args.k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            products = [doc.metadata.get("product_name") for doc, _ in docs_and_scores]
+            rank = products.index(product) + 1 if product in products else 0
+            hits += rank > 0
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+        print(
+            f"{name:<7} hit@{args.k}={hits / len(labeled):.2%} MRR={statistics.fmean(reciprocal_ranks):.4f} | "
+            f"mean={statistics.fmean(latencies):.1f}ms p95={percentile(latencies, 95):.1f}ms"
+        )
+
+
+def bench_multi_query(args) -> None:
+    """질의 N개: similarity_search_with_score 반복 vs similarity_search_batch (임베딩 캐시 없이 측정)"""
+    model = get_embedding_model()
+    store = CustomPGVector(
+        conn_str=make_conn_str(),
+        embedding_fn=getattr(model, "embeddings", model),  # CachedEmbeddings면 원본 모델
+        table=args.table,
+    )
+    questions = load_questions(args.questions)
+    store.similarity_search_batch(questions[:1], k=args.k)  # 모델 로딩/커넥션 생성은 제외
+
+    loop_ms: List[float] = []
+    batch_ms: List[float] = []
+    mismatched = 0
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        looped = [store.similarity_search_with_score(question, k=args.k) for question in questions]
+        loop_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        batched = store.similarity_search_batch(questions, k=args.k)
+        batch_ms.append((time.perf_counter() - started) * 1000)
+        mismatched += sum(
+            [doc.page_content for doc, _ in a] != [doc.page_content for doc, _ in b]
+            for a, b in zip(looped, batched)
+        )
+
+    print(f"=== MULTI-QUERY RETRIEVAL (queries={len(questions)}, k={args.k}, repeat={args.repeat}) ===")
+    print(f"loop  mean={statistics.fmean(loop_ms):.1f}ms p95={percentile(loop_ms, 95):.1f}ms")
+    print(f"batch mean={statistics.fmean(batch_ms):.1f}ms p95={percentile(batch_ms, 95):.1f}ms")
+    print(f"speedup: x{statistics.fmean(loop_ms) / statistics.fmean(batch_ms):.1f} | result mismatches: {mismatched}")
+
+
+class StubChatModel(BaseChatModel):
+    """guard 프롬프트(분류기)에는 YES, 그 밖에는 고정 답변을 바로 돌려주는 LLM - 파이프라인 지연만 측정"""
+
+    answer: str = "벤치마크용 고정 답변입니다."
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        is_guard = any("분류기" in str(message.content) for message in messages)
+        text = "YES" if is_guard else self.answer
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def latency_summary(values: List[float]) -> dict:
+    return {
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def build_labeled_set(frame: pd.DataFrame, samples: int, seed: int) -> List[Tuple[str, str]]:
+    """CSV 행에서 (제품명 + 비어 있지 않은 섹션) 질문과 정답 제품명을 뽑는다."""
+    from custom_loader import DrugCSVLoader
+
+    product_col = DrugCSVLoader.PRODUCT_COLUMN
+    sections = [col for col in DrugCSVLoader.DEFAULT_CONTENT_COLUMNS if col != product_col and col in frame.columns]
+    rng = np.random.default_rng(seed)
+    rows = frame.sample(n=min(samples, len(frame)), random_state=seed)
+    labeled = []
+    for _, row in rows.iterrows():
+        product = str(row[product_col]).strip()
+        filled = [col for col in sections if str(row[col]).strip()]
+        if product and filled:
+            labeled.append((f"{product} {rng.choice(filled)} 알려줘", product))
+    return labeled
+
+
+def compare_reports(report: dict, baseline: dict, latency_tolerance: float, quality_tolerance: float) -> List[str]:
+    """같은 설정(chunk_strategy, chunk_size, chunk_overlap, k)끼리 비교해 p95 지연 증가 / recall·MRR 하락을 찾는다."""
+    def _key(config: dict) -> tuple:
+        # chunk_strategy가 없는 이전 리포트는 기본값(section)으로 적재한 것이다
+        return config.get("chunk_strategy", "section"), config["chunk_size"], config["chunk_overlap"], config["k"]
+
+    previous = {_key(config): config for config in baseline.get("configs", [])}
+    regressions = []
+    for config in report["configs"]:
+        old = previous.get(_key(config))
+        if old is None:
+            continue
+        name = "chunk_strategy={} chunk_size={} chunk_overlap={} k={}".format(*_key(config))
+        for metric in ("embed_ms", "sql_ms", "e2e_ms"):
+            before, after = old[metric]["p95"], config[metric]["p95"]
+            if before and after > before * (1 + latency_tolerance):
+                regressions.append(f"{name}: {metric} p95 {before:.1f}ms -> {after:.1f}ms")
+        for metric in ("recall_at_k", "mrr"):
+            if config[metric] < old[metric] - quality_tolerance:
+                regressions.append(f"{name}: {metric} {old[metric]:.4f} -> {config[metric]:.4f}")
+    return regressions
+
+
+def _create_rag_table(conn_str: str, table: str, dim: int) -> None:
+    with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(
+            f"""
+            CREATE TABLE {table} (
+                id SERIAL PRIMARY KEY,
+                content TEXT,
+                embedding VECTOR({dim}),
+                metadata JSONB,
+                content_hash TEXT,
+                product_name TEXT,
+                section TEXT
+            )
+            """
+        )
+
+
+def bench_rag(args) -> None:
+    """
+    청크 설정(chunk_size × chunk_overlap)마다 CSV 일부를 임시 테이블에 적재하고, k마다
+    임베딩 / SQL / run_once end-to-end 지연(p50/p95/p99)과 recall@k, MRR을 측정해 JSON 리포트로 남긴다.
+    LLM은 기본으로 StubChatModel을 써서 검색 파이프라인만 측정한다.
+    """
+    # .env에서 의미 캐시를 켜 두었더라도 적중이 측정을 왜곡하지 않도록 끈다 (graph_drug_rag import 전에 설정)
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    import graph_drug_rag
+    from embedding_utils import get_embedding_dim
+    from ingest_doc import CustomVectorIngestor, IngestConfig
+
+    if args.llm == "stub":
+        graph_drug_rag._LLM_INSTANCE = StubChatModel(callbacks=[LLMUsageCallback()])
+    conn_str = make_conn_str()
+    model = get_embedding_model()
+    raw_model = getattr(model, "embeddings", model)  # 임베딩 지연은 캐시 없이 측정
+    frame = pd.read_csv(args.csv, nrows=args.rows).fillna("")
+    labeled = build_labeled_set(frame, args.samples, args.seed)
+    scratch = f"{args.table}_bench_rag"
+
+    configs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        subset_csv = os.path.join(tmp, "subset.csv")
+        frame.to_csv(subset_csv, index=False)
+        for chunk_size in args.chunk_sizes:
+            for chunk_overlap in args.chunk_overlaps:
+                if chunk_overlap >= chunk_size:
+                    print(f"skip chunk_size={chunk_size} chunk_overlap={chunk_overlap} (overlap >= size)")
+                    continue
+                _create_rag_table(conn_str, scratch, get_embedding_dim())
+                stats = CustomVectorIngestor(
+                    IngestConfig(
+                        csv_path=subset_csv,
+                        table_name=scratch,
+                        chunk_size=chunk_size,
+                        chunk_overlap=chunk_overlap,
+                        chunk_strategy=args.chunk_strategy,
+                        batch_size=64,
+                        reset=False,
+                        text_index=False,
+                    )
+                ).run()
+                store = CustomPGVector(conn_str=conn_str, embedding_fn=model, table=scratch)
+                store.warm_up()
+                graph_drug_rag.run_once(labeled[0][0], collection_name=scratch, k=max(args.k))  # 첫 실행 비용 제외
+
+                for k in args.k:
+                    embed_ms, sql_ms, e2e_ms = [], [], []
+                    stages: dict = {}
+                    context_saved = []
+                    hits = 0
+                    reciprocal_ranks = []
+                    for question, product in labeled:
+                        started = time.perf_counter()
+                        embedding = raw_model.embed_query(question)
+                        embed_ms.append((time.perf_counter() - started) * 1000)
+
+                        started = time.perf_counter()
+                        docs_and_scores = store.similarity_search_with_score_by_vector(embedding, k=k)
+                        sql_ms.append((time.perf_counter() - started) * 1000)
+                        products = [doc.metadata.get("product_name") for doc, _ in docs_and_scores]
+                        rank = products.index(product) + 1 if product in products else 0
+                        hits += rank > 0
+                        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+                        started = time.perf_counter()
+                        result = graph_drug_rag.run_once(question, collection_name=scratch, k=k)
+                        e2e_ms.append((time.perf_counter() - started) * 1000)
+                        for stage, ms in result["timings"].items():
+                            stages.setdefault(stage, []).append(ms)
+                        if result["context_tokens"]:
+                            context_saved.append(result["context_tokens"]["saved"])
+
+                    configs.append(
+                        {
+                            "chunk_strategy": args.chunk_strategy,
+                            "chunk_size": chunk_size,
+                            "chunk_overlap": chunk_overlap,
+                            "k": k,
+                            "chunks": stats["chunks"],
+                            "recall_at_k": hits / len(labeled),
+                            "mrr": statistics.fmean(reciprocal_ranks),
+                            "embed_ms": latency_summary(embed_ms),
+                            "sql_ms": latency_summary(sql_ms),
+                            "e2e_ms": latency_summary(e2e_ms),
+                            "stages_ms": {stage: latency_summary(values) for stage, values in stages.items()},
+                            "context_tokens_saved_mean": statistics.fmean(context_saved) if context_saved else 0.0,
+                        }
+                    )
+                CustomPGVector.release(store)
+    if not args.keep_table:
+        with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {scratch}")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embedding_model": os.getenv("LOCAL_EMBEDDING_MODEL"),
+        "llm": args.llm,
+        "csv": args.csv,
+        "rows": len(frame),
+        "questions": len(labeled),
+        "seed": args.seed,
+        "configs": configs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"=== RAG BENCHMARK (rows={len(frame)}, questions={len(labeled)}, llm={args.llm}) ===")
+    for config in configs:
+        print(
+            f"chunk={config['chunk_strategy']}:{config['chunk_size']}/{config['chunk_overlap']} k={config['k']:<3} "
+            f"recall@k={config['recall_at_k']:.2%} MRR={config['mrr']:.4f} | "
+            f"embed p95={config['embed_ms']['p95']:.1f}ms sql p95={config['sql_ms']['p95']:.1f}ms "
+            f"e2e p50={config['e2e_ms']['p50']:.0f}ms p95={config['e2e_ms']['p95']:.0f}ms p99={config['e2e_ms']['p99']:.0f}ms"
+        )
+    print(f"report: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.latency_tolerance, args.quality_tolerance)
+        if regressions:
+            print("⚠️ regressions vs baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print("no regressions vs baseline")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="검색/적재 성능 벤치마크")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    index = sub.add_parser("index", help="ANN 인덱스 recall vs 지연시간 비교")
+    index.add_argument("--table", default="drug_info", help="pgvector 테이블명")
+    index.add_argument("--k", type=int, default=10, help="recall@k 의 k")
+    index.add_argument("--samples", type=int, default=50, help="질의로 사용할 샘플 임베딩 수")
+    index.add_argument(
+        "--values",
+        type=int,
+        nargs="+",
+        default=None,
+        help="비교할 hnsw.ef_search 또는 ivfflat.probes 값 목록",
+    )
+    index.set_defaults(func=bench_index)
+
+    write = sub.add_parser("write", help="add_texts 쓰기 방식별 처리량 비교")
+    write.add_argument("--table", default="drug_info", help="스키마를 복사할 pgvector 테이블명")
+    write.add_argument("--rows", type=int, default=5000, help="적재할 행 수")
+    write.add_argument("--batch-size", type=int, default=64, help="add_texts 한 번에 넣을 행 수")
+    write.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(WRITE_MODES),
+        default=list(WRITE_MODES),
+        help="비교할 쓰기 방식",
+    )
+    write.set_defaults(func=bench_write)
+
+    parallel = sub.add_parser("parallel-guard", help="guard/retrieve 직렬 vs 병렬 end-to-end 지연시간 비교")
+    parallel.add_argument("--collection", default="drug_info", help="pgvector 컬렉션명")
+    parallel.add_argument("--k", type=int, default=5, help="검색 상위 k")
+    parallel.add_argument("--questions", default=None, help="질문 파일 (txt 또는 JSONL)")
+    parallel.add_argument("--repeat", type=int, default=3, help="질문 세트 반복 횟수")
+    parallel.set_defaults(func=bench_parallel_guard)
+
+    guard = sub.add_parser("guard", help="임베딩 guard vs LLM guard 일치율/지연시간 비교")
+    guard.add_argument(
+        "--questions",
+        default=None,
+        help='평가용 JSONL ({"question": ..., "label": "YES"|"NO"}), 생략 시 내장 held-out 질문',
+    )
+    guard.set_defaults(func=bench_guard)
+
+    extract = sub.add_parser("extract", help="약 이름 추출: 별칭 루프 vs Aho-Corasick 비교")
+    extract.add_argument("--aliases", type=int, default=30000, help="별칭 사전 크기 (부족분은 합성 이름으로 채움)")
+    extract.add_argument("--messages", type=int, default=200, help="측정할 메시지 수")
+    extract.set_defaults(func=bench_extract)
+
+    hybrid = sub.add_parser("hybrid", help="vector 단독 vs hybrid(RRF) 검색 hit-rate/지연시간 비교")
+    hybrid.add_argument("--table", default="drug_info", help="pgvector 테이블명")
+    hybrid.add_argument("--k", type=int, default=5, help="hit-rate@k 의 k")
+    hybrid.add_argument(
+        "--questions",
+        default=None,
+        help='평가용 JSONL ({"question": ..., "product": ...}), 생략 시 테이블에서 제품/섹션 질문 생성',
+    )
+    hybrid.add_argument("--samples", type=int, default=100, help="자동 생성할 질문 수")
+    hybrid.set_defaults(func=bench_hybrid)
+
+    multi = sub.add_parser("multi-query", help="질의 여러 개: 반복 검색 vs similarity_search_batch 비교")
+    multi.add_argument("--table", default="drug_info", help="pgvector 테이블명")
+    multi.add_argument("--k", type=int, default=5, help="검색 상위 k")
+    multi.add_argument("--questions", default=None, help="질문 파일 (txt 또는 JSONL)")
+    multi.add_argument("--repeat", type=int, default=5, help="반복 횟수")
+    multi.set_defaults(func=bench_multi_query)
+
+    rag = sub.add_parser("rag", help="청크 설정/k별 임베딩·SQL·end-to-end 지연과 recall@k/MRR 리포트")
+    rag.add_argument("--csv", default="../data/drug_info_preprocessed.csv", help="질문/적재에 쓸 CSV (ingest_doc.py와 같은 기본값)")
+    rag.add_argument("--rows", type=int, default=500, help="CSV 앞에서부터 적재할 행 수")
+    rag.add_argument("--samples", type=int, default=100, help="평가 질문 수")
+    rag.add_argument("--seed", type=int, default=0, help="질문 샘플링 시드")
+    rag.add_argument("--table", default="drug_info", help="임시 테이블 이름 접두어 (<table>_bench_rag)")
+    rag.add_argument("--k", type=int, nargs="+", default=[3, 5, 10], help="비교할 검색 상위 k 목록")
+    rag.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000], help="비교할 chunk_size 목록")
+    rag.add_argument("--chunk-overlaps", type=int, nargs="+", default=[300], help="비교할 chunk_overlap 목록")
+    rag.add_argument(
+        "--chunk-strategy",
+        choices=list(CHUNK_STRATEGIES),
+        default="section",
+        help="적재할 때 쓸 청크 분할 방식 (ingest_doc.py --chunk-strategy와 같음)",
+    )
+    rag.add_argument("--llm", choices=["stub", "ollama"], default="stub", help="end-to-end 측정에 쓸 LLM")
+    rag.add_argument("--output", default="bench_rag_report.json", help="JSON 리포트 경로")
+    rag.add_argument("--baseline", default=None, help="비교할 이전 리포트 (회귀가 있으면 exit 1)")
+    rag.add_argument("--latency-tolerance", type=float, default=0.2, help="p95 지연 허용 증가율")
+    rag.add_argument("--quality-tolerance", type=float, default=0.01, help="recall@k/MRR 허용 하락폭")
+    rag.add_argument("--keep-table", action="store_true", help="측정 후 임시 테이블을 지우지 않음")
+    rag.set_defaults(func=bench_rag)
+    return p.parse_args()
+
+
+def main():
+    load_dotenv()
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from custom_loader import DrugCSVLoader
+
+# 문장 3-gram 자카드 유사도가 이 값 이상이면 앞에서 이미 넣은 문장과 같은 내용으로 보고 뺀다
+NEAR_DUPLICATE_JACCARD = 0.85
+# 이보다 짧은 문장(정규화 후 글자 수)은 중복 검사 없이 그대로 둔다 ("1일 3회." 같은 문장이 사라지지 않게)
+MIN_DEDUP_CHARS = 12
+# 겹침으로 인정할 최소 길이 (우연히 같은 몇 글자로 청크를 잘못 이어 붙이지 않게)
+MIN_OVERLAP_CHARS = 10
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_HANGUL = re.compile(r"[가-힣]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    LLM 토큰 수 근사치 (Ollama 모델 토크나이저 없이 계산)
+    한글은 음절당 1토큰, 나머지 공백 아닌 글자는 4글자당 1토큰으로 센다.
+    """
+    hangul = len(_HANGUL.findall(text))
+    others = len(text) - hangul - sum(ch.isspace() for ch in text)
+    return hangul + math.ceil(others / 4)
+
+
+def product_of(doc: Document) -> str:
+    meta = doc.metadata or {}
+    return meta.get("제품명") or meta.get("title") or meta.get("product") or "알 수 없는 제품"
+
+
+def context_line(product: str, text: str) -> str:
+    return f"[제품명: {product}] {text}"
+
+
+def _strip_prefix(text: str, header: str) -> str:
+    return text[len(header):] if header and text.startswith(header) else text
+
+
+def _overlap(left: str, right: str) -> int:
+    """left의 끝과 right의 시작이 겹치는 가장 긴 길이 (MIN_OVERLAP_CHARS 미만이면 0)"""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_chunks(docs: Sequence[Document]) -> Tuple[str, str]:
+    """
+    같은 제품·섹션의 청크를 chunk_index 순으로 이어 붙여 (머리말, 본문)으로 돌려준다.
+    청크마다 반복되는 "제품명: X | 섹션: " 머리말(section 방식 적재)은 떼어 내고,
+    chunk_overlap으로 겹친 부분은 한 번만 남긴다.
+    """
+    ordered = sorted(docs, key=lambda doc: (doc.metadata or {}).get("chunk_index") or 0)
+    meta = ordered[0].metadata or {}
+    header = ""
+    if meta.get("section"):
+        header = DrugCSVLoader.section_header(meta.get("product_name") or meta.get("제품명") or "", meta["section"])
+    merged = ""
+    for doc in ordered:
+        piece = _strip_prefix(doc.page_content.strip(), header).strip()
+        size = _overlap(merged, piece)
+        merged = merged + piece[size:] if size or not merged else f"{merged} {piece}"
+    return header, merged
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def _shingles(normalized: str) -> set:
+    return {normalized[i : i + 3] for i in range(len(normalized) - 2)}
+
+
+class _SentenceDeduper:
+    """앞에서 넣은 문장과 같거나(정규화 후) 거의 같은 문장을 걸러낸다."""
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_JACCARD) -> None:
+        self.threshold = threshold
+        self._exact: set = set()
+        self._kept: List[set] = []
+
+    def is_duplicate(self, sentence: str) -> bool:
+        normalized = _NON_WORD.sub("", sentence)
+        if len(normalized) < MIN_DEDUP_CHARS:
+            return False
+        if normalized in self._exact:
+            return True
+        shingles = _shingles(normalized)
+        return any(len(shingles & kept) / len(shingles | kept) >= self.threshold for kept in self._kept)
+
+    def add(self, sentence: str) -> None:
+        normalized = _NON_WORD.sub("", sentence)
+        if len(normalized) >= MIN_DEDUP_CHARS:
+            self._exact.add(normalized)
+            self._kept.append(_shingles(normalized))
+
+
+def assemble_context(
+    docs_and_scores: Sequence[Tuple[Document, float]],
+    budget: Optional[int] = None,
+    sections: Sequence[str] = (),
+) -> Tuple[str, Dict[str, int]]:
+    """
+    검색 결과로 생성 프롬프트의 CONTEXT를 만든다.
+    1) 같은 제품(행)·섹션의 청크는 겹침을 지우고 하나로 합친다.
+    2) 앞에서 이미 나온 문장과 거의 같은 문장은 뺀다.
+    3) 질문이 묻는 섹션(sections)을 먼저, 나머지는 검색 순위대로 놓고
+       budget(추정 토큰 수, None/0이면 무제한) 안에서 문장 단위로 채운다.
+    반환값은 (context, 통계) 이며 통계의 saved는 청크를 그대로 이어 붙였을 때보다 줄어든 토큰 수다.
+    """
+    naive = "\n\n".join(context_line(product_of(doc), doc.page_content) for doc, _ in docs_and_scores)
+
+    groups: Dict[Tuple[Any, ...], List[Document]] = {}
+    for doc, _ in docs_and_scores:
+        meta = doc.metadata or {}
+        key = (product_of(doc), meta.get("row_index"), meta.get("section"))
+        groups.setdefault(key, []).append(doc)  # dict 순서 = 그룹에서 가장 높은 검색 순위
+
+    wanted = set(sections)
+    ordered = sorted(enumerate(groups.items()), key=lambda item: (item[1][0][2] not in wanted, item[0]))
+
+    # 같은 문장이라도 다른 제품의 설명이면 남겨야 하므로 중복 검사는 제품별로 한다
+    dedupers: Dict[str, _SentenceDeduper] = {}
+    lines: List[str] = []
+    used = dropped = 0
+    for _, ((product, _row, _section), docs) in ordered:
+        deduper = dedupers.setdefault(product, _SentenceDeduper())
+        header, body = merge_chunks(docs)
+        kept: List[str] = []
+        prefix_tokens = estimate_tokens(context_line(product, header))
+        for sentence in split_sentences(body):
+            if deduper.is_duplicate(sentence):
+                dropped += 1
+                continue
+            cost = estimate_tokens(sentence) + (0 if kept else prefix_tokens)
+            # 예산이 작아도 가장 관련 높은 그룹의 첫 문장은 남긴다
+            if budget and used + cost > budget and (lines or kept):
+                break
+            deduper.add(sentence)
+            kept.append(sentence)
+            used += cost
+        if kept:
+            lines.append(context_line(product, header + " ".join(kept)))
+
+    context = "\n\n".join(lines)
+    before, after = estimate_tokens(naive), estimate_tokens(context)
+    return context, {
+        "chunks": len(docs_and_scores),
+        "groups": len(groups),
+        "dropped_sentences": dropped,
+        "before": before,
+        "after": after,
+        "saved": before - after,
+    }
@@ -1,5 +1,5 @@
 import os
-from typing import Iterable, List
+from typing import Iterable, Iterator, List
 
 import pandas as pd
 from langchain_core.documents import Document
@@ -19,6 +19,8 @@ class DrugCSVLoader(BaseLoader):
         "보관법",
     ]
     DEFAULT_METADATA_COLUMNS: List[str] = ["제품명"]
+    # 섹션 단위 Document에서 모든 청크 앞에 붙이는 제품명 컬럼
+    PRODUCT_COLUMN: str = "제품명"
 
     def __init__(
         self,
@@ -31,6 +33,7 @@ class DrugCSVLoader(BaseLoader):
         na_fill: str = "",
         dataframe: pd.DataFrame | None = None,
         read_kwargs: dict | None = None,
+        chunksize: int = 5000,
     ) -> None:
         # csv 파일경로
         self.file_path = file_path
@@ -48,6 +51,8 @@ class DrugCSVLoader(BaseLoader):
         self.dataframe = dataframe
         # pd.read_csv에 그대로 전달할 추가 인자 딕셔너리
         self.read_kwargs = read_kwargs or {}
+        # lazy_load에서 한 번에 읽을 행 수
+        self.chunksize = chunksize
 
     def load(self) -> List[Document]:
         """
@@ -55,48 +60,115 @@ class DrugCSVLoader(BaseLoader):
             "컬럼명": "값" 문자열을 만들어서 page_content로
             metadata컬럼은 metadata로 담아 Document 객체로 리턴
         """
-        df = (
-            self.dataframe.copy()
-            if self.dataframe is not None
-            else pd.read_csv(
-                self.file_path,
-                sep=self.sep,
-                encoding=self.encoding,
-                **self.read_kwargs,
-            )
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        """
+            csv(또는 dataframe)를 chunksize 행씩 읽어 Document를 하나씩 내보낸다.
+            전체 CSV를 메모리에 올리지 않고 적재 파이프라인으로 바로 흘려보낼 때 사용
+        """
+        for frame in self._iter_frames():
+            yield from self._frame_to_documents(frame)
+
+    def lazy_load_sections(self) -> Iterator[Document]:
+        """
+            제품(행) × 섹션(컬럼)마다 Document를 하나씩 내보낸다.
+            page_content는 "제품명: X | 섹션: 값" 형태이고 metadata["section"]에 섹션명을 담는다.
+            섹션 값이 하나도 없는 행은 제품명만으로 Document 하나를 만든다.
+        """
+        for frame in self._iter_frames():
+            yield from self._frame_to_section_documents(frame)
+
+    @classmethod
+    def section_header(cls, product: str, section: str) -> str:
+        """섹션 Document의 page_content 앞부분 (본문 앞 "제품명: X | 섹션: ")"""
+        prefix = f"{cls.PRODUCT_COLUMN}: {product} | " if product and section != cls.PRODUCT_COLUMN else ""
+        return f"{prefix}{section}: "
+
+    def _iter_frames(self) -> Iterator[pd.DataFrame]:
+        if self.dataframe is not None:
+            for start in range(0, len(self.dataframe), self.chunksize):
+                yield self.dataframe.iloc[start:start + self.chunksize]
+            return
+        # chunksize로 읽으면 청크가 바뀌어도 행 인덱스(row_index)는 이어진다
+        yield from pd.read_csv(
+            self.file_path,
+            sep=self.sep,
+            encoding=self.encoding,
+            chunksize=self.chunksize,
+            **self.read_kwargs,
         )
-        df = df.fillna(self.na_fill)
-
-        # Document 객체를 담을 리스트
-        documents = [] 
-        for idx, row in df.iterrows():
-            content_parts = []
-            used_fields = []
-            for col in self.content_columns:
-                if col not in df.columns:
-                    continue
-                value = str(row[col]).strip()
-                if not value:
-                    continue
-                content_parts.append(f"{col}: {value}")
-                used_fields.append(col)
-
-            if not content_parts:
-                continue
 
-            metadata = {
-                col: str(row[col])
-                for col in self.metadata_columns
-                if col in df.columns
-            }
+    def _frame_to_documents(self, frame: pd.DataFrame) -> Iterator[Document]:
+        """행 단위 루프 대신 컬럼 단위 문자열 연산으로 page_content를 만든다."""
+        frame = frame.fillna(self.na_fill)
+        content_cols = [col for col in self.content_columns if col in frame.columns]
+        metadata_cols = [col for col in self.metadata_columns if col in frame.columns]
+
+        content = pd.Series("", index=frame.index, dtype=object)
+        used = {}
+        for col in content_cols:
+            value = frame[col].astype(str).str.strip()
+            used[col] = (value != "").to_numpy()
+            part = (f"{col}: " + value).where(used[col], "")
+            sep = pd.Series(" | ", index=frame.index).where((content != "") & used[col], "")
+            content = content + sep + part
+
+        metadata_values = {col: frame[col].astype(str).str.strip().tolist() for col in metadata_cols}
+        source = os.path.basename(self.file_path)
+        for pos, (idx, page_content) in enumerate(zip(frame.index.tolist(), content.tolist())):
+            if not page_content:
+                continue
+            metadata = {col: values[pos] for col, values in metadata_values.items()}
             metadata["row_index"] = idx
-            metadata["source"] = os.path.basename(self.file_path)
-            metadata["source_fields"] = used_fields
-            if "제품명" in metadata and "product_name" not in metadata:
-                metadata["product_name"] = metadata["제품명"]
+            metadata["source"] = source
+            metadata["source_fields"] = [col for col in content_cols if used[col][pos]]
+            if self.PRODUCT_COLUMN in metadata and "product_name" not in metadata:
+                metadata["product_name"] = metadata[self.PRODUCT_COLUMN]
+            yield Document(page_content=page_content, metadata=metadata)
 
-            documents.append(
-                Document(page_content=" | ".join(content_parts), metadata=metadata)
-            )
+    def _frame_to_section_documents(self, frame: pd.DataFrame) -> Iterator[Document]:
+        """섹션 컬럼을 (행, 섹션, 값) 긴 형태로 펼쳐서 비어 있지 않은 값마다 Document를 만든다."""
+        frame = frame.fillna(self.na_fill)
+        section_cols = [
+            col for col in self.content_columns
+            if col in frame.columns and col != self.PRODUCT_COLUMN
+        ]
+        metadata_cols = [col for col in self.metadata_columns if col in frame.columns]
+        if self.PRODUCT_COLUMN in frame.columns:
+            products = frame[self.PRODUCT_COLUMN].astype(str).str.strip()
+        else:
+            products = pd.Series("", index=frame.index)
 
-        return documents
+        long = (
+            frame[section_cols]
+            .astype(str)
+            .apply(lambda col: col.str.strip())
+            .rename_axis("row_index")
+            .reset_index()
+            .melt(id_vars="row_index", var_name="section", value_name="value")
+        )
+        long = long[long["value"] != ""]
+        # 제품명만 있는 행도 검색될 수 있도록 제품명 자체를 섹션으로 남긴다
+        bare = products[(products != "") & ~products.index.isin(long["row_index"])]
+        if self.PRODUCT_COLUMN in self.content_columns and not bare.empty:
+            long = pd.concat([
+                long,
+                pd.DataFrame({"row_index": bare.index, "section": self.PRODUCT_COLUMN, "value": bare.to_numpy()}),
+            ])
+        order = {col: pos for pos, col in enumerate(self.content_columns)}
+        long = long.assign(order=long["section"].map(order)).sort_values(["row_index", "order"], kind="stable")
+
+        # 제품명은 위에서 한 번만 다듬은 값(products)을 머리말과 metadata 양쪽에 쓴다
+        metadata_rows = frame[metadata_cols].astype(str).apply(lambda col: col.str.strip()).to_dict("index")
+        source = os.path.basename(self.file_path)
+        for idx, section, value in zip(long["row_index"].tolist(), long["section"].tolist(), long["value"].tolist()):
+            product = products.at[idx]
+            metadata = dict(metadata_rows[idx])
+            metadata["row_index"] = idx
+            metadata["source"] = source
+            metadata["source_fields"] = [section]
+            metadata["section"] = section
+            if product and "product_name" not in metadata:
+                metadata["product_name"] = product
+            yield Document(page_content=self.section_header(product, section) + value, metadata=metadata)
@@ -1,27 +1,199 @@
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+import asyncio
+import inspect
+import io
 import json
+import math
+import os
+import statistics
+import struct
+import threading
+import time
+import weakref
 
-from psycopg2.extras import Json
+from pgvector import Vector
+from psycopg2.extras import Json, execute_values
 import psycopg2
 
+from db_utils import PgConnectionPool, make_async_pool
+from embedding_utils import embed_queries
+from instrumentation import percentile, step
+
 from langchain_core.vectorstores import VectorStore
 from langchain_core.documents import Document
 
-class Singleton(type(VectorStore)):
-    _instances: Dict[type, VectorStore] = {}
+# distance 이름 -> (정렬 연산자, 인덱스 opclass)
+DISTANCE_OPS: Dict[str, Tuple[str, str]] = {
+    "l2": ("<->", "vector_l2_ops"),
+    "cosine": ("<=>", "vector_cosine_ops"),
+    "ip": ("<#>", "vector_ip_ops"),
+}
+# 검색/인덱스 기본 distance (적재한 인덱스와 같아야 검색이 인덱스를 탄다)
+DEFAULT_DISTANCE = os.getenv("PGVECTOR_DISTANCE", "l2")
+INDEX_METHODS: Tuple[str, ...] = ("hnsw", "ivfflat")
+# pgvector가 허용하는 hnsw.ef_search 최대값
+MAX_EF_SEARCH = 1000
+# add_texts 쓰기 방식: 바이너리 COPY / 다중행 INSERT / 행 단위 INSERT
+WRITE_MODES: Tuple[str, ...] = ("copy", "values", "row")
+
+# COPY ... (FORMAT BINARY) 스트림 헤더(시그니처 + flags + 확장영역 길이)와 종료 마커
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+# jsonb 바이너리 포맷 버전
+_JSONB_VERSION = b"\x01"
+
+# 하이브리드 검색에서 질문 단어 끝에서 떼어낼 조사/어미 (긴 것부터 비교)
+_KOREAN_SUFFIXES: Tuple[str, ...] = tuple(sorted(
+    ["은", "는", "이", "가", "을", "를", "에", "의", "도", "만", "랑", "이랑", "과", "와", "으로", "로",
+     "에서", "에게", "한테", "하고", "이나", "나", "요", "야", "인가요", "인데", "해줘", "알려줘"],
+    key=len,
+    reverse=True,
+))
+# 하이브리드 검색어에서 뺄 요청/의문 표현 (어느 문서에나 붙을 수 있어 순위를 흐린다)
+_LEXICAL_STOP_WORDS = frozenset(
+    ["알려줘", "알려주세요", "알려줄래", "설명해줘", "설명해주세요", "말해줘", "해줘", "해주세요", "주세요",
+     "뭐야", "뭐예요", "뭔가요", "무엇", "무엇인가요", "무엇이야", "어떻게", "어떤", "있나요", "있어",
+     "있어요", "인가요", "되나요", "하나요", "대해", "대해서", "대한", "관련", "관련해서", "궁금해", "궁금해요"]
+)
+# 부분일치 검색어 최소 길이 (pg_trgm 인덱스는 3글자 미만 패턴에 쓰이지 않아 전체를 훑게 된다)
+MIN_LEXICAL_TERM = 3
+# Reciprocal Rank Fusion 상수 (순위 r 문서의 점수 = 1 / (RRF_K + r))
+RRF_K = 60
+# embedding 컬럼에 걸린 ANN 인덱스 (describe_index / adescribe_index 공용)
+_DESCRIBE_INDEX_SQL = """
+    SELECT c.relname, am.amname, opc.opcname, c.reloptions,
+           (SELECT extversion FROM pg_extension WHERE extname = 'vector')
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_am am ON am.oid = c.relam
+    JOIN pg_opclass opc ON opc.oid = i.indclass[0]
+    WHERE i.indrelid = %s::regclass
+      AND am.amname IN ('hnsw', 'ivfflat')
+    ORDER BY c.relname
+    LIMIT 1
+"""
+
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class StoreRegistry(type(VectorStore)):
+    """
+    생성자 인자 전체(기본값 포함)와 임베딩 객체의 타입/모델로 만든 키마다 인스턴스를 하나씩 재사용하는 메타클래스.
+    최대 PGVECTOR_MAX_STORES개까지 LRU로 유지하고, 밀려난 인스턴스는 close()로 동기/비동기 풀을 바로 닫아
+    열린 커넥션 수를 PGVECTOR_MAX_STORES × 풀 크기 안으로 묶는다. 밀려난 인스턴스를 계속 쓰려면 다시 생성한다.
+    """
+    _instances: "OrderedDict[Hashable, VectorStore]" = OrderedDict()
+    _lock = threading.RLock()
+    max_instances: int = int(os.getenv("PGVECTOR_MAX_STORES", "8"))
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        bound = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        arguments.pop(next(iter(arguments)))  # self
+        key = (cls, cls.registry_key(**arguments))
+        evicted = []
+        with cls._lock:
+            instance = cls._instances.get(key)
+            if instance is not None:
+                cls._instances.move_to_end(key)
+                return instance
+            instance = super().__call__(*args, **kwargs)
+            cls._instances[key] = instance
+            while len(cls._instances) > max(1, cls.max_instances):
+                evicted.append(cls._instances.popitem(last=False)[1])
+        # 닫기는 비동기 풀이 도는 루프를 기다릴 수 있으므로 레지스트리 잠금 밖에서 한다
+        for store in evicted:
+            store.close()
+        return instance
+
+    def instances(cls) -> List[VectorStore]:
+        """현재 살아있는 인스턴스 목록 (오래된 순)"""
+        with cls._lock:
+            return [store for (owner, _), store in cls._instances.items() if issubclass(owner, cls)]
 
+    def release(cls, store: VectorStore) -> None:
+        """인스턴스를 레지스트리에서 빼고 커넥션을 닫는다."""
+        with cls._lock:
+            for key, instance in list(cls._instances.items()):
+                if instance is store:
+                    del cls._instances[key]
+        store.close()
 
-class CustomPGVector(VectorStore, metaclass=Singleton):
-    def __init__(self, conn_str, embedding_fn, table: str = "my_vectors"):
+    def close_all(cls) -> None:
+        """이 클래스로 만든 인스턴스를 모두 닫는다."""
+        for store in cls.instances():
+            cls.release(store)
+
+
+def embedding_type_key(embedding_fn: Any) -> str:
+    """임베딩 객체의 타입 (CachedEmbeddings와 감싸지 않은 모델은 모델명이 같아도 다른 인스턴스로 본다)"""
+    return f"{type(embedding_fn).__module__}.{type(embedding_fn).__qualname__}"
+
+
+def embedding_model_key(embedding_fn: Any) -> str:
+    """임베딩 객체를 레지스트리 키로 쓸 수 있게 모델명(없으면 객체 id)으로 식별"""
+    name = getattr(embedding_fn, "model_name", None) or getattr(embedding_fn, "model", None)
+    if isinstance(name, str) and name:
+        return name
+    return f"{type(embedding_fn).__name__}@{id(embedding_fn):x}"
+
+
+class CustomPGVector(VectorStore, metaclass=StoreRegistry):
+    def __init__(
+        self,
+        conn_str,
+        embedding_fn,
+        table: str = "my_vectors",
+        distance: str = DEFAULT_DISTANCE,
+        ef_search_factor: int = 4,
+        min_ef_search: int = 40,
+        ivfflat_probes: Optional[int] = None,
+        pool_min: Optional[int] = None,
+        pool_max: Optional[int] = None,
+        write_mode: str = "copy",
+        over_fetch_factor: int = 3,
+    ):
+        if distance not in DISTANCE_OPS:
+            raise ValueError(f"지원하지 않는 distance입니다: {distance}")
+        if write_mode not in WRITE_MODES:
+            raise ValueError(f"지원하지 않는 write_mode입니다: {write_mode}")
         self.conn_str = conn_str
-        self.conn = psycopg2.connect(self.conn_str)
+        # 세션 스레드들이 동시에 검색할 수 있도록 호출마다 풀에서 커넥션을 빌린다
+        self.pool = PgConnectionPool(self.conn_str, pool_min, pool_max)
         self.embedding_fn = embedding_fn
         self.table = table
+        self.distance = distance
+        # 검색 시 k에 곱해 hnsw.ef_search를 정하는 배수와 하한
+        self.ef_search_factor = ef_search_factor
+        self.min_ef_search = min_ef_search
+        # ivfflat.probes 기본값 (None이면 sqrt(lists))
+        self.ivfflat_probes = ivfflat_probes
+        self.write_mode = write_mode
+        # 중복 제거/제품별 상한으로 줄어들 것을 감안해 k의 몇 배를 후보로 가져올지
+        self.over_fetch_factor = over_fetch_factor
+        self._index_info: Optional[Dict[str, Any]] = None
+        self._index_checked = False
+        # 비동기 API용 psycopg_pool.AsyncConnectionPool (처음 쓸 때 생성)과 그 풀을 연 이벤트 루프
+        self._apool = None
+        self._apool_loop: Optional[asyncio.AbstractEventLoop] = None
+        # close()를 부르지 않고 버려진 인스턴스도 마지막 참조가 사라지면 동기 풀을 닫는다
+        weakref.finalize(self, self.pool.close)
+
+    @staticmethod
+    def registry_key(conn_str, embedding_fn, **config) -> Tuple[Hashable, ...]:
+        """StoreRegistry가 인스턴스를 구분하는 키 (임베딩 외 생성자 인자는 기본값을 채워 모두 포함)"""
+        return (
+            conn_str,
+            embedding_type_key(embedding_fn),
+            embedding_model_key(embedding_fn),
+            tuple(sorted(config.items())),
+        )
+
+    @property
+    def _distance_op(self) -> str:
+        return DISTANCE_OPS[self.distance][0]
 
     @classmethod
     def from_texts(
@@ -41,91 +213,1031 @@ class CustomPGVector(VectorStore, metaclass=Singleton):
         self,
         texts: List[str],
         metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        embeddings: Optional[List[List[float]]] = None,
+        mode: Optional[str] = None,
     ) -> None:
+        """
+        텍스트를 임베딩해 한 트랜잭션으로 저장한다.
+        embeddings를 넘기면 임베딩을 건너뛰고, mode로 쓰기 방식(copy/values/row)을 고를 수 있다.
+        """
+        texts = list(texts)
         metadatas = metadatas or [{} for _ in texts]
-        embeddings = self.embedding_fn.embed_documents(texts)
+        if embeddings is None:
+            embeddings = self.embedding_fn.embed_documents(texts)
+
+        mode = mode or self.write_mode
+        writers = {
+            "copy": self._write_copy,
+            "values": self._write_values,
+            "row": self._write_rows,
+        }
+        if mode not in writers:
+            raise ValueError(f"지원하지 않는 write_mode입니다: {mode}")
+        writer = writers[mode]
+        self.pool.run(lambda conn: writer(conn, texts, embeddings, metadatas))
+
+    # metadata 값 중 별도 컬럼으로도 저장하는 것들 (텍스트 컬럼, B-tree 인덱스)
+    PROMOTED_COLUMNS: Tuple[str, ...] = ("content_hash", "product_name", "section")
+
+    @property
+    def _write_columns(self) -> str:
+        return ", ".join(("content", "embedding", "metadata") + self.PROMOTED_COLUMNS)
+
+    def _promoted_values(self, meta: Dict[str, Any]) -> List[Optional[str]]:
+        values = []
+        for column in self.PROMOTED_COLUMNS:
+            value = meta.get(column)
+            values.append(None if value is None else str(value))
+        return values
+
+    def _write_copy(self, conn, texts, embeddings, metadatas) -> None:
+        """COPY FROM STDIN (FORMAT BINARY)로 벡터를 float4 바이너리 그대로 전송"""
+        with conn.cursor() as cur:
+            cur.copy_expert(
+                f"COPY {self.table} ({self._write_columns}) FROM STDIN WITH (FORMAT BINARY)",
+                io.BytesIO(self._copy_payload(texts, embeddings, metadatas)),
+            )
+
+    def _copy_payload(self, texts, embeddings, metadatas) -> bytes:
+        """COPY ... (FORMAT BINARY) 스트림 (psycopg2 copy_expert / psycopg3 copy 공용)"""
+        buffer = io.BytesIO()
+        buffer.write(_COPY_HEADER)
+        for text, emb, meta in zip(texts, embeddings, metadatas):
+            fields = [
+                text.encode("utf-8"),
+                Vector(emb).to_binary(),
+                _JSONB_VERSION + json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+            ] + [
+                None if value is None else value.encode("utf-8")
+                for value in self._promoted_values(meta)
+            ]
+            buffer.write(struct.pack("!h", len(fields)))
+            for field in fields:
+                if field is None:
+                    buffer.write(struct.pack("!i", -1))  # NULL
+                    continue
+                buffer.write(struct.pack("!i", len(field)))
+                buffer.write(field)
+        buffer.write(_COPY_TRAILER)
+        return buffer.getvalue()
 
-        with self.conn.cursor() as cur:
+    def _write_values(self, conn, texts, embeddings, metadatas, page_size: int = 500) -> None:
+        """execute_values로 여러 행을 한 INSERT 문에 묶어 전송"""
+        rows = [
+            (text, Vector(emb).to_text(), Json(meta), *self._promoted_values(meta))
+            for text, emb, meta in zip(texts, embeddings, metadatas)
+        ]
+        template = "(%s, %s::vector, %s" + ", %s" * len(self.PROMOTED_COLUMNS) + ")"
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                f"INSERT INTO {self.table} ({self._write_columns}) VALUES %s",
+                rows,
+                template=template,
+                page_size=page_size,
+            )
+
+    def _write_rows(self, conn, texts, embeddings, metadatas) -> None:
+        """행마다 INSERT를 보내는 기존 방식 (벤치마크 비교용)"""
+        placeholders = ", ".join(["%s"] * (3 + len(self.PROMOTED_COLUMNS)))
+        with conn.cursor() as cur:
             for text, emb, meta in zip(texts, embeddings, metadatas):
                 cur.execute(
                     f"""
-                    INSERT INTO {self.table} (content, embedding, metadata)
-                    VALUES (%s, %s, %s)
+                    INSERT INTO {self.table} ({self._write_columns})
+                    VALUES ({placeholders})
                     """,
-                    (text, emb, Json(meta)),
+                    (text, emb, Json(meta), *self._promoted_values(meta)),
+                )
+
+    # ------------------------------------------------------------------
+    # 스키마 / 증분 적재 지원
+    # ------------------------------------------------------------------
+    def ensure_schema(self) -> None:
+        """
+        init.sql 이전 버전으로 만든 테이블에도 필요한 컬럼/인덱스를 추가한다.
+        새로 추가한 컬럼은 기존 행의 metadata 값으로 채운다.
+        """
+        def _migrate(conn) -> None:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+                    (self.table,),
                 )
-        self.conn.commit()
+                existing = {row[0] for row in cur.fetchall()}
+                for column in self.PROMOTED_COLUMNS:
+                    if column not in existing:
+                        cur.execute(f"ALTER TABLE {self.table} ADD COLUMN {column} TEXT")
+                        cur.execute(
+                            f"UPDATE {self.table} SET {column} = metadata->>%s WHERE metadata ? %s",
+                            (column, column),
+                        )
+                    cur.execute(
+                        f"CREATE INDEX IF NOT EXISTS {self.table}_{column}_idx ON {self.table} ({column})"
+                    )
+                # 승격하지 않은 metadata 키로 거르는 similarity_search(filter=...)용
+                cur.execute(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS {self.table}_metadata_gin_idx
+                    ON {self.table} USING gin (metadata jsonb_path_ops)
+                    """
+                )
+
+        self.pool.run(_migrate)
+
+    def fetch_content_hashes(self) -> Dict[Optional[str], int]:
+        """저장된 content_hash별 행 수 (해시 없이 저장된 예전 행은 None 키)"""
+        rows = self._fetch(
+            f"SELECT content_hash, count(*) FROM {self.table} GROUP BY content_hash"
+        )
+        return {row[0]: int(row[1]) for row in rows}
+
+    def delete_content_hashes(self, hashes: Iterable[str], include_unhashed: bool = False) -> int:
+        """주어진 content_hash(와 선택적으로 해시가 없는 행)를 삭제하고 삭제 행 수를 반환"""
+        hashes = list(hashes)
+        if not hashes and not include_unhashed:
+            return 0
+
+        def _delete(conn) -> int:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    DELETE FROM {self.table}
+                    WHERE content_hash = ANY(%s)
+                       OR (%s AND content_hash IS NULL)
+                    """,
+                    (hashes, include_unhashed),
+                )
+                return cur.rowcount
+
+        return self.pool.run(_delete)
+
+    def delete_duplicate_hashes(self) -> int:
+        """같은 content_hash로 여러 번 저장된 행은 가장 먼저 저장된 것만 남긴다."""
+        def _delete(conn) -> int:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    DELETE FROM {self.table} a
+                    USING {self.table} b
+                    WHERE a.content_hash = b.content_hash
+                      AND a.id > b.id
+                    """
+                )
+                return cur.rowcount
+
+        return self.pool.run(_delete)
 
     def similarity_search(
         self,
         query: str,
         k: int = 4,
         filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
     ) -> List[Document]:
-        query_emb = self.embedding_fn.embed_query(query)
-        params: List[Any] = []
+        docs_and_scores = self.similarity_search_with_score(
+            query, k, filter, products=products, sections=sections, per_product=per_product
+        )
+        return [doc for doc, _ in docs_and_scores]
 
-        sql_query_template = f"""
-            SELECT content, metadata
-            FROM {self.table}
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
+    ) -> List[Tuple[Document, float]]:
         """
+        products/sections를 주면 승격 컬럼(B-tree 인덱스) 조건으로 후보를 줄인 뒤 거리순으로 정렬한다.
+        filter는 metadata @> 조건 (GIN 인덱스)
+        같은 content는 가장 가까운 한 행만 남기고, per_product를 주면 제품당 그 개수까지만 돌려준다.
+        중복 제거는 SQL 안에서 하므로 k * over_fetch_factor개 후보로 한 번의 왕복에 k개를 채운다.
+        """
+        with step("embed"):
+            query_emb = self.embedding_fn.embed_query(query)
+        return self.similarity_search_with_score_by_vector(
+            query_emb,
+            k,
+            filter,
+            products=products,
+            sections=sections,
+            per_product=per_product,
+        )
 
-        where_clauses: List[str] = []
-        if filter:
-            filter_json = json.dumps(filter)
-            where_clauses.append("metadata @> %s::jsonb")
-            params.append(filter_json)
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        docs_and_scores = self.similarity_search_with_score_by_vector(embedding, k, filter, **kwargs)
+        return [doc for doc, _ in docs_and_scores]
 
-        if where_clauses:
-            sql_query_template += " WHERE " + " AND ".join(where_clauses)
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
+    ) -> List[Tuple[Document, float]]:
+        """이미 만든 질의 임베딩으로 검색 (similarity_search_with_score에서 임베딩 단계만 뺀 것)"""
+        build = self._vector_query(embedding, k, filter, products, sections, per_product)
+        return _scored_documents(self._fetch(*build(k * self.over_fetch_factor)))
 
-        sql_query_template += """
-            ORDER BY embedding <-> %s::vector
-            LIMIT %s
+    def hybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
+        candidates: Optional[int] = None,
+        rrf_k: int = RRF_K,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """
+        벡터 검색과 content 부분일치(pg_trgm GIN 인덱스) 검색을 각각 candidates개씩 뽑아
+        Reciprocal Rank Fusion 점수 순으로 돌려준다. 한 번의 SQL 왕복으로 처리한다.
+        score는 similarity_search_with_score와 같은 벡터 거리(작을수록 가까움)이고,
+        순위를 정한 RRF 점수(클수록 가까움)는 metadata["rrf_score"]에 담는다.
+        질문에서 검색어를 뽑지 못하면 벡터 검색 순위만으로 점수를 매긴다.
+        중복 content 제거와 per_product 상한은 similarity_search_with_score와 같다.
+        embedding에 이미 만든 질의 임베딩을 주면 다시 임베딩하지 않는다.
+        """
+        query_emb = embedding
+        if query_emb is None:
+            with step("embed"):
+                query_emb = self.embedding_fn.embed_query(query)
+        build = self._hybrid_query(query, query_emb, k, filter, products, sections, per_product, rrf_k)
+        return _hybrid_documents(self._fetch(*build(candidates or max(k * 4, 20))))
+
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
         """
-        params.append(query_emb)
-        params.append(k)
+        여러 질의를 한 번의 배치 임베딩과 한 번의 SQL(unnest한 벡터 배열에 LATERAL 조인)로 검색해
+        질의 순서대로 similarity_search_with_score와 같은 결과 목록을 돌려준다.
+        중복 제거와 필터 검색의 후보 보충은 similarity_search_with_score와 같이 SQL과 pgvector iterative scan이 맡는다.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        with step("embed"):
+            query_embs = embed_queries(self.embedding_fn, queries)
+        where_clauses, params = self._filter_clauses(filter, products, sections)
+        where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+        candidates = k * self.over_fetch_factor
 
-        with self.conn.cursor() as cur:
-            cur.execute(sql_query_template, tuple(params))
-            rows = self.__get_unique_documents(cur.fetchall())
+        rows = self._fetch(
+            f"""
+            WITH candidates AS (
+                SELECT q.ord, c.id, c.content, c.metadata, c.score
+                FROM unnest(%s::vector[]) WITH ORDINALITY AS q(query_embedding, ord)
+                CROSS JOIN LATERAL (
+                    SELECT id, content, metadata,
+                           (embedding {self._distance_op} q.query_embedding) AS score
+                    FROM {self.table}
+                    {where_sql}
+                    ORDER BY score
+                    LIMIT %s
+                ) c
+            ),
+            deduped AS (
+                SELECT *,
+                       row_number() OVER (PARTITION BY ord, md5(content) ORDER BY score, id) AS content_rank
+                FROM candidates
+            ),
+            ranked AS (
+                SELECT *, row_number() OVER (PARTITION BY ord ORDER BY score, id) AS rank
+                FROM deduped
+                WHERE content_rank = 1
+            )
+            SELECT ord, content, metadata, score
+            FROM ranked
+            WHERE rank <= %s
+            ORDER BY ord, rank
+            """,
+            ([Vector(emb).to_text() for emb in query_embs], *params, candidates, k),
+            self._search_settings(candidates, filtered=bool(where_clauses)),
+        )
 
-        return [Document(page_content=row[0], metadata=row[1]) for row in rows]
+        grouped: List[List[Tuple[Any, ...]]] = [[] for _ in queries]
+        for row in rows:
+            grouped[row[0] - 1].append(row[1:])
+        return [_scored_documents(query_rows) for query_rows in grouped]
 
-    def similarity_search_with_score(
+    # ------------------------------------------------------------------
+    # 비동기 API (psycopg3 AsyncConnectionPool, 한 이벤트 루프에서 사용)
+    # ------------------------------------------------------------------
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
+    ) -> List[Document]:
+        docs_and_scores = await self.asimilarity_search_with_score(
+            query, k, filter, products=products, sections=sections, per_product=per_product
+        )
+        return [doc for doc, _ in docs_and_scores]
+
+    async def asimilarity_search_with_score(
         self,
         query: str,
         k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
     ) -> List[Tuple[Document, float]]:
-        query_emb = self.embedding_fn.embed_query(query)
+        """similarity_search_with_score의 비동기 버전 (같은 SQL을 비동기 풀로 실행)"""
+        with step("embed"):
+            query_emb = await self.embedding_fn.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(
+            query_emb, k, filter, products=products, sections=sections, per_product=per_product
+        )
 
-        with self.conn.cursor() as cur:
-            cur.execute(
-                f"""
-                SELECT content, metadata, (embedding <-> %s::vector) AS score
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
+    ) -> List[Tuple[Document, float]]:
+        """similarity_search_with_score_by_vector의 비동기 버전"""
+        build = self._vector_query(embedding, k, filter, products, sections, per_product)
+        await self.adescribe_index()  # build()가 읽는 인덱스 정보를 이벤트 루프를 막지 않고 캐시
+        return _scored_documents(await self._afetch(*build(k * self.over_fetch_factor)))
+
+    async def ahybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        products: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None,
+        per_product: Optional[int] = None,
+        candidates: Optional[int] = None,
+        rrf_k: int = RRF_K,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """hybrid_search_with_score의 비동기 버전"""
+        query_emb = embedding
+        if query_emb is None:
+            with step("embed"):
+                query_emb = await self.embedding_fn.aembed_query(query)
+        build = self._hybrid_query(query, query_emb, k, filter, products, sections, per_product, rrf_k)
+        await self.adescribe_index()
+        return _hybrid_documents(await self._afetch(*build(candidates or max(k * 4, 20))))
+
+    async def aadd_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> None:
+        """add_texts의 비동기 버전. 쓰기 방식과 상관없이 바이너리 COPY로 한 트랜잭션에 저장한다."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        if embeddings is None:
+            embeddings = await self.embedding_fn.aembed_documents(texts)
+
+        payload = self._copy_payload(texts, embeddings, metadatas)
+        pool = await self._async_pool()
+        async with pool.connection() as conn:
+            async with conn.cursor() as cur:
+                async with cur.copy(
+                    f"COPY {self.table} ({self._write_columns}) FROM STDIN WITH (FORMAT BINARY)"
+                ) as copy:
+                    await copy.write(payload)
+
+    async def _async_pool(self):
+        """
+        비동기 풀은 처음 쓸 때 만들고 연다 (동기 API만 쓰면 psycopg3가 없어도 된다)
+        풀은 만든 이벤트 루프에 묶이므로, asyncio.run을 여러 번 부르는 등 다른 루프에서 불리면 새로 만든다.
+        """
+        loop = asyncio.get_running_loop()
+        if self._apool is not None and self._apool_loop is not loop:
+            _discard_async_pool(self._apool, self._apool_loop)
+            self._apool = self._apool_loop = None
+        if self._apool is None:
+            self._apool = make_async_pool(self.conn_str, self.pool.minconn, self.pool.maxconn)
+            self._apool_loop = loop
+        if self._apool.closed:
+            await self._apool.open()  # 이미 열려 있으면 아무 일도 하지 않는다
+        return self._apool
+
+    async def _afetch(
+        self,
+        query: str,
+        params: Tuple[Any, ...] = (),
+        settings: Optional[List[Tuple[str, str]]] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """_fetch의 비동기 버전 (커넥션 상태 확인과 재연결은 psycopg_pool이 처리)"""
+        pool = await self._async_pool()
+        with step("sql"):
+            async with pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    for name, value in settings or []:
+                        await cur.execute("SELECT set_config(%s, %s, true)", (name, value))
+                    await cur.execute(query, params)
+                    return await cur.fetchall()
+
+    async def awarm_up(self) -> Optional[Dict[str, Any]]:
+        """비동기 풀을 열고 인덱스 정보를 캐시한다."""
+        await self._async_pool()
+        return await self.adescribe_index(refresh=True)
+
+    async def aclose(self) -> None:
+        """비동기 풀을 닫고 끝날 때까지 기다린다. (동기 풀은 close()로 닫는다)"""
+        if self._apool is not None:
+            await self._apool.close()
+            self._apool = self._apool_loop = None
+
+    # ------------------------------------------------------------------
+    # 검색 SQL (동기/비동기 공용)
+    # ------------------------------------------------------------------
+    def _vector_query(
+        self,
+        query_emb: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]],
+        products: Optional[List[str]],
+        sections: Optional[List[str]],
+        per_product: Optional[int],
+    ) -> Callable[[int], Tuple[str, Tuple[Any, ...], List[Tuple[str, str]]]]:
+        """후보 수를 받아 (SQL, 파라미터, 검색 설정)을 돌려주는 함수"""
+        where_clauses, params = self._filter_clauses(filter, products, sections)
+        where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+        sql = f"""
+            WITH candidates AS (
+                SELECT id, content, metadata, product_name,
+                       (embedding {self._distance_op} %s::vector) AS score
                 FROM {self.table}
+                {where_sql}
                 ORDER BY score
                 LIMIT %s
-                """,
-                (query_emb, k),
             )
-            rows = self.__get_unique_documents(cur.fetchall())
+            {self._unique_rows_sql("candidates", "score")}
+        """
 
-        return [
-            (Document(page_content=row[0], metadata=row[1]), float(row[2]))
-            for row in rows
-        ]
+        def build(candidates: int):
+            return (
+                sql,
+                (query_emb, *params, candidates, per_product, k),
+                self._search_settings(candidates, filtered=bool(where_clauses)),
+            )
+
+        return build
+
+    def _hybrid_query(
+        self,
+        query: str,
+        query_emb: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]],
+        products: Optional[List[str]],
+        sections: Optional[List[str]],
+        per_product: Optional[int],
+        rrf_k: int,
+    ) -> Callable[[int], Tuple[str, Tuple[Any, ...], List[Tuple[str, str]]]]:
+        """
+        _vector_query와 같지만 벡터/부분일치 후보를 RRF로 합친 점수(음수, 작을수록 가까움)로 정렬한다.
+        행은 (content, metadata, 벡터 거리, RRF 점수(음수))이다.
+        """
+        where_clauses, params = self._filter_clauses(filter, products, sections)
+        patterns = [f"%{_escape_like(term)}%" for term in lexical_terms(query)]
+        vec_where = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+        lex_where = " AND ".join(["content ILIKE ANY(%s)"] + where_clauses)
+        sql = f"""
+            WITH vec AS (
+                SELECT id, row_number() OVER (ORDER BY dist) AS rank
+                FROM (
+                    SELECT id, embedding {self._distance_op} %s::vector AS dist
+                    FROM {self.table}
+                    {vec_where}
+                    ORDER BY dist
+                    LIMIT %s
+                ) v
+            ),
+            lex AS (
+                SELECT id, row_number() OVER (ORDER BY hits DESC, len) AS rank
+                FROM (
+                    SELECT id,
+                           (SELECT count(*) FROM unnest(%s::text[]) AS p WHERE content ILIKE p) AS hits,
+                           length(content) AS len
+                    FROM {self.table}
+                    WHERE {lex_where}
+                    ORDER BY hits DESC, len
+                    LIMIT %s
+                ) l
+            ),
+            fused AS (
+                SELECT t.id, t.content, t.metadata, t.product_name,
+                       t.embedding {self._distance_op} %s::vector AS distance,
+                       -sum(1.0 / (%s + ranked.rank)) AS score
+                FROM (SELECT * FROM vec UNION ALL SELECT * FROM lex) ranked
+                JOIN {self.table} t ON t.id = ranked.id
+                GROUP BY t.id
+            )
+            {self._unique_rows_sql("fused", "score", score="distance")}
+        """
+
+        def build(limit: int):
+            return (
+                sql,
+                (
+                    query_emb, *params, limit,
+                    patterns, patterns, *params, limit,
+                    query_emb, rrf_k, per_product, k,
+                ),
+                self._search_settings(limit, filtered=bool(where_clauses)),
+            )
+
+        return build
 
     @staticmethod
-    def __get_unique_documents(rows: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
-        unique_contents = set()
-        unique_documents = []
+    def _unique_rows_sql(source: str, order_by: str, score: Optional[str] = None) -> str:
+        """
+        source(CTE)의 후보에서 같은 content는 order_by가 가장 작은 행만 남기고,
+        제품별 순위가 상한(%s, NULL이면 무제한) 안인 것만 골라 k(%s)개를 돌려주는 SELECT.
+        세 번째 컬럼은 score(없으면 order_by)이고, score를 따로 주면 그 뒤에 order_by 값을 붙인다.
+        후보 수는 호출한 쪽이 k * over_fetch_factor로 한 번 정하고, 다시 조회하지 않는다.
+        """
+        columns = f"{score}, {order_by}" if score else order_by
+        return f"""
+            SELECT content, metadata, {columns}
+            FROM (
+                SELECT *,
+                       row_number() OVER (
+                           PARTITION BY coalesce(product_name, id::text) ORDER BY {order_by}, id
+                       ) AS product_rank
+                FROM (
+                    SELECT *,
+                           row_number() OVER (PARTITION BY md5(content) ORDER BY {order_by}, id) AS content_rank
+                    FROM {source}
+                ) deduped
+                WHERE content_rank = 1
+            ) capped
+            WHERE product_rank <= coalesce(%s, product_rank)
+            ORDER BY {order_by}, id
+            LIMIT %s
+        """
 
-        for row in rows:
-            content = row[0]
-            if content not in unique_contents:
-                unique_contents.add(content)
-                unique_documents.append(row)
+    def ensure_text_index(self) -> bool:
+        """
+        하이브리드 검색용 content 트라이그램 GIN 인덱스를 만든다.
+        pg_trgm 확장을 쓸 수 없으면 False (하이브리드 검색은 인덱스 없이 동작)
+        """
+        def _create(conn) -> None:
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cur.execute(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS {self.table}_content_trgm_idx
+                    ON {self.table} USING gin (content gin_trgm_ops)
+                    """
+                )
+
+        try:
+            self.pool.run(_create)
+        except psycopg2.Error:
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # ANN 인덱스 관리 (HNSW / IVFFlat)
+    # ------------------------------------------------------------------
+    def index_name(self, method: str) -> str:
+        """테이블/인덱스 방식에 대응하는 인덱스 이름"""
+        return f"{self.table}_embedding_{method}_idx"
+
+    def describe_index(self, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        embedding 컬럼에 걸린 ANN 인덱스 정보를 반환 (없으면 None)
+        검색 연산자(self.distance)는 바꾸지 않는다. info["distance"]와 다르면 검색이 인덱스를 타지 못하므로
+        같은 distance로 인스턴스를 만들거나 create_index로 인덱스를 다시 만드는 것은 호출한 쪽이 정한다.
+        """
+        if self._index_checked and not refresh:
+            return self._index_info
+        return self._set_index_info(self._fetch(_DESCRIBE_INDEX_SQL, (self.table,)))
+
+    async def adescribe_index(self, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """describe_index의 비동기 버전 (처음 조회할 때 이벤트 루프를 막지 않도록 비동기 풀을 쓴다)"""
+        if self._index_checked and not refresh:
+            return self._index_info
+        return self._set_index_info(await self._afetch(_DESCRIBE_INDEX_SQL, (self.table,)))
+
+    def _set_index_info(self, rows: List[Tuple[Any, ...]]) -> Optional[Dict[str, Any]]:
+        """describe_index 쿼리 결과를 인덱스 정보로 바꿔 캐시한다."""
+        info = None
+        if rows:
+            row = rows[0]
+            options = dict(opt.split("=", 1) for opt in (row[3] or []))
+            distance = next(
+                (name for name, (_, opclass) in DISTANCE_OPS.items() if opclass == row[2]),
+                None,
+            )
+            info = {
+                "name": row[0],
+                "method": row[1],
+                "opclass": row[2],
+                "distance": distance,
+                "options": options,
+                # 필터 검색에서 결과가 k개보다 모자라지 않게 하는 hnsw/ivfflat.iterative_scan은 pgvector 0.8부터
+                "iterative_scan": _version_tuple(row[4]) >= (0, 8),
+            }
+        self._index_info = info
+        self._index_checked = True
+        return info
+
+    def create_index(
+        self,
+        method: str = "hnsw",
+        distance: Optional[str] = None,
+        *,
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: Optional[int] = None,
+        maintenance_work_mem: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        embedding 컬럼에 HNSW/IVFFlat 인덱스를 (재)생성한다.
+        기존 ANN 인덱스는 지우고 새로 만들며, distance를 바꾸면 검색 연산자도 같이 바뀐다.
+        """
+        if method not in INDEX_METHODS:
+            raise ValueError(f"지원하지 않는 인덱스 방식입니다: {method}")
+        distance = distance or self.distance
+        if distance not in DISTANCE_OPS:
+            raise ValueError(f"지원하지 않는 distance입니다: {distance}")
+        opclass = DISTANCE_OPS[distance][1]
+
+        if method == "hnsw":
+            with_clause = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+        else:
+            lists = lists or self._default_ivfflat_lists()
+            with_clause = f"lists = {int(lists)}"
+
+        self.drop_index()
+        statement = (
+            f"CREATE INDEX {self.index_name(method)} ON {self.table} "
+            f"USING {method} (embedding {opclass}) WITH ({with_clause})"
+        )
+        elapsed = self._run_index_ddl(statement, maintenance_work_mem, progress_callback)
+
+        self.distance = distance
+        info = self.describe_index(refresh=True) or {}
+        return {**info, "build_seconds": elapsed}
+
+    def rebuild_index(
+        self,
+        maintenance_work_mem: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """현재 ANN 인덱스를 같은 설정으로 REINDEX 한다."""
+        info = self.describe_index(refresh=True)
+        if info is None:
+            raise RuntimeError(f"'{self.table}' 테이블에 ANN 인덱스가 없습니다.")
+        elapsed = self._run_index_ddl(
+            f"REINDEX INDEX {info['name']}", maintenance_work_mem, progress_callback
+        )
+        return {**info, "build_seconds": elapsed}
+
+    def drop_index(self) -> None:
+        """embedding 컬럼의 ANN 인덱스를 모두 제거한다."""
+        def _drop(conn) -> None:
+            with conn.cursor() as cur:
+                for method in INDEX_METHODS:
+                    cur.execute(f"DROP INDEX IF EXISTS {self.index_name(method)}")
+
+        self.pool.run(_drop)
+        self._index_info = None
+        self._index_checked = True
+
+    def _default_ivfflat_lists(self) -> int:
+        """pgvector 권장값: 100만 건 이하는 rows/1000, 그 이상은 sqrt(rows)"""
+        rows = self._fetch(f"SELECT count(*) FROM {self.table}")[0][0]
+        if rows <= 1_000_000:
+            return max(1, rows // 1000)
+        return max(1, int(math.sqrt(rows)))
+
+    def _run_index_ddl(
+        self,
+        statement: str,
+        maintenance_work_mem: Optional[str],
+        progress_callback: Optional[ProgressCallback],
+    ) -> float:
+        """인덱스 DDL을 별도 커넥션에서 실행하고 pg_stat_progress_create_index로 진행률을 보고"""
+        done = threading.Event()
+        watcher = None
+        if progress_callback is not None:
+            watcher = threading.Thread(
+                target=self._watch_index_progress,
+                args=(progress_callback, done),
+                daemon=True,
+            )
+
+        started = time.perf_counter()
+        conn = psycopg2.connect(self.conn_str)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                if maintenance_work_mem:
+                    cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+                if watcher is not None:
+                    watcher.start()
+                cur.execute(statement)
+        finally:
+            done.set()
+            if watcher is not None and watcher.is_alive():
+                watcher.join()
+            conn.close()
+
+        if progress_callback is not None:
+            progress_callback("done", 1, 1)
+        return time.perf_counter() - started
+
+    def _watch_index_progress(
+        self,
+        progress_callback: ProgressCallback,
+        done: threading.Event,
+        poll_interval: float = 1.0,
+    ) -> None:
+        conn = psycopg2.connect(self.conn_str)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not done.wait(poll_interval):
+                    cur.execute(
+                        """
+                        SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+                        FROM pg_stat_progress_create_index
+                        WHERE relid = %s::regclass
+                        """,
+                        (self.table,),
+                    )
+                    row = cur.fetchone()
+                    if not row:
+                        continue
+                    phase, blocks_done, blocks_total, tuples_done, tuples_total = row
+                    if tuples_total:
+                        progress_callback(phase, tuples_done, tuples_total)
+                    else:
+                        progress_callback(phase, blocks_done, blocks_total)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _filter_clauses(
+        filter: Optional[Dict[str, Any]],
+        products: Optional[List[str]],
+        sections: Optional[List[str]],
+    ) -> Tuple[List[str], List[Any]]:
+        """검색 WHERE 조건과 파라미터"""
+        clauses: List[str] = []
+        params: List[Any] = []
+        if filter:
+            clauses.append("metadata @> %s::jsonb")
+            params.append(json.dumps(filter))
+        if products:
+            clauses.append("product_name = ANY(%s)")
+            params.append(list(products))
+        if sections:
+            clauses.append("section = ANY(%s)")
+            params.append(list(sections))
+        return clauses, params
+
+    def _search_settings(self, k: int, filtered: bool = False) -> List[Tuple[str, str]]:
+        """
+        k에 맞춰 ANN 검색 파라미터(hnsw.ef_search / ivfflat.probes)를 정한다.
+        filtered면 ANN 후보가 조건에 걸러져 k개보다 모자라지 않도록 iterative scan을 켠다.
+        (pgvector 0.8 이상에서만, 그 미만에서는 조건에 맞는 행이 k개보다 적게 올 수 있다)
+        """
+        info = self.describe_index()
+        if info is None:
+            return []
+        if info["method"] == "hnsw":
+            ef_search = min(MAX_EF_SEARCH, max(self.min_ef_search, k * self.ef_search_factor))
+            settings = [("hnsw.ef_search", str(ef_search))]
+            if filtered and info.get("iterative_scan"):
+                settings.append(("hnsw.iterative_scan", "strict_order"))
+            return settings
+        lists = int(info["options"].get("lists", 100))
+        base = self.ivfflat_probes or max(1, round(math.sqrt(lists)))
+        settings = [("ivfflat.probes", str(min(lists, max(base, k))))]
+        if filtered and info.get("iterative_scan"):
+            # 바깥 쿼리가 거리순으로 다시 정렬하므로 relaxed_order로 충분하다 (ivfflat은 strict_order 미지원)
+            settings.append(("ivfflat.iterative_scan", "relaxed_order"))
+        return settings
+
+    @staticmethod
+    def _apply_search_settings(cur, settings: List[Tuple[str, str]]) -> None:
+        """현재 트랜잭션에만 유효하도록(set_config is_local) 검색 파라미터를 설정"""
+        for name, value in settings:
+            cur.execute("SELECT set_config(%s, %s, true)", (name, value))
+
+    def _fetch(
+        self,
+        query: str,
+        params: Tuple[Any, ...] = (),
+        settings: Optional[List[Tuple[str, str]]] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """풀에서 커넥션을 빌려 SELECT를 실행하고 모든 행을 반환 (끊긴 커넥션은 한 번 재시도)"""
+        def _select(conn) -> List[Tuple[Any, ...]]:
+            with conn.cursor() as cur:
+                self._apply_search_settings(cur, settings or [])
+                cur.execute(query, params)
+                return cur.fetchall()
+
+        with step("sql"):
+            return self.pool.run(_select)
+
+    def warm_up(self) -> Optional[Dict[str, Any]]:
+        """풀 커넥션을 미리 열고 인덱스 정보를 캐시해 첫 검색 지연을 없앤다."""
+        self.pool.warm_up()
+        return self.describe_index(refresh=True)
+
+    def close(self) -> None:
+        """
+        풀에 열린 커넥션을 모두 닫는다. 비동기 풀은 _close_async_pool 규칙대로 닫으며,
+        비동기 코드 안에서는 닫기가 끝날 때까지 기다리도록 await aclose()를 먼저 부르는 것이 좋다.
+        """
+        self.pool.close()
+        if self._apool is not None:
+            _close_async_pool(self._apool, self._apool_loop)
+            self._apool = self._apool_loop = None
+
+    def evaluate_index(
+        self,
+        sample_size: int = 50,
+        k: int = 10,
+        search_values: Optional[List[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        저장된 임베딩을 질의로 샘플링해 exact scan 대비 ANN recall@k와 지연시간을 비교한다.
+        search_values는 hnsw면 ef_search, ivfflat이면 probes 후보 목록.
+        """
+        info = self.describe_index(refresh=True)
+        if info is None:
+            raise RuntimeError(f"'{self.table}' 테이블에 ANN 인덱스가 없습니다.")
+        setting = "hnsw.ef_search" if info["method"] == "hnsw" else "ivfflat.probes"
+        if not search_values:
+            search_values = [int(value) for _, value in self._search_settings(k)]
+
+        query_sql = f"""
+            SELECT id FROM {self.table}
+            ORDER BY embedding {self._distance_op} %s::vector
+            LIMIT %s
+        """
+        queries = [
+            row[0]
+            for row in self._fetch(
+                f"SELECT embedding::text FROM {self.table} ORDER BY random() LIMIT %s",
+                (sample_size,),
+            )
+        ]
+
+        def _timed_ids(conn, query: str, settings: List[Tuple[str, str]]) -> Tuple[set, float]:
+            # set_config(is_local)이 질의마다 초기화되도록 매번 트랜잭션을 닫는다
+            with conn.cursor() as cur:
+                self._apply_search_settings(cur, settings)
+                started = time.perf_counter()
+                cur.execute(query_sql, (query, k))
+                ids = {row[0] for row in cur.fetchall()}
+                elapsed = (time.perf_counter() - started) * 1000
+            conn.commit()
+            return ids, elapsed
+
+        results: List[Dict[str, Any]] = []
+        with self.pool.connection() as conn:
+            exact_ids: List[set] = []
+            exact_latencies: List[float] = []
+            for query in queries:
+                ids, elapsed = _timed_ids(conn, query, [("enable_indexscan", "off")])
+                exact_ids.append(ids)
+                exact_latencies.append(elapsed)
+
+            for value in search_values:
+                recalls: List[float] = []
+                latencies: List[float] = []
+                for query, truth in zip(queries, exact_ids):
+                    found, elapsed = _timed_ids(conn, query, [(setting, str(value))])
+                    latencies.append(elapsed)
+                    recalls.append(len(found & truth) / len(truth) if truth else 1.0)
+                results.append(
+                    {
+                        "setting": setting,
+                        "value": value,
+                        "recall": statistics.fmean(recalls) if recalls else 0.0,
+                        "latency_ms_mean": statistics.fmean(latencies) if latencies else 0.0,
+                        "latency_ms_p95": percentile(latencies, 95),
+                        "exact_latency_ms_mean": statistics.fmean(exact_latencies) if exact_latencies else 0.0,
+                        "exact_latency_ms_p95": percentile(exact_latencies, 95),
+                    }
+                )
+        return results
+
+
+def _scored_documents(rows: List[Tuple[Any, ...]]) -> List[Tuple[Document, float]]:
+    return [(Document(page_content=row[0], metadata=row[1]), float(row[2])) for row in rows]
+
+
+def _close_async_pool(pool, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    비동기 풀은 그 풀을 연 이벤트 루프(loop)에서만 닫을 수 있다.
+    - loop 안에서 불림: 기다릴 수 없으므로 닫기 작업을 예약한다
+    - loop가 다른 스레드에서 도는 중: 그 루프에 닫기를 맡기고 끝날 때까지 기다린다
+    - loop가 멈춰 있음: 그 루프에서 바로 닫는다
+    - loop가 이미 닫힘(asyncio.run 종료 뒤): 풀의 워커 태스크가 닫힌 루프에 묶여 있어 다른 루프에서
+      pool.close()를 기다릴 수 없다. 워커는 asyncio.run이 이미 취소했으므로 참조만 버리고,
+      남은 커넥션은 가비지 컬렉션 때 닫힌다. 확실히 닫으려면 그 루프 안에서 await aclose()를 부른다.
+    """
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        loop.create_task(pool.close())
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop).result()
+    elif not loop.is_closed():
+        loop.run_until_complete(pool.close())
+
+
+def _discard_async_pool(pool, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    다른 루프에서 새 풀을 만들기 전에 예전 풀을 버린다 (지금 루프를 막지 않는다).
+    예전 루프가 다른 스레드에서 돌고 있으면 그 루프에 닫기를 맡기고, 닫혔거나 멈춰 있으면
+    _close_async_pool과 같은 이유로 참조만 버린다.
+    """
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+
+
+def _hybrid_documents(rows: List[Tuple[Any, ...]]) -> List[Tuple[Document, float]]:
+    """_hybrid_query 결과를 (문서, 벡터 거리)로 바꾸고 RRF 점수(클수록 가까움)는 metadata에 남긴다."""
+    results = []
+    for content, metadata, distance, score in rows:
+        metadata = dict(metadata or {}, rrf_score=-float(score))
+        results.append((Document(page_content=content, metadata=metadata), float(distance)))
+    return results
+
+
+def lexical_terms(query: str, min_length: int = MIN_LEXICAL_TERM) -> List[str]:
+    """
+    질문을 공백으로 나누고 끝의 조사/어미를 떼어 부분일치 검색어 목록을 만든다.
+    "알려줘" 같은 요청/의문 표현과 min_length보다 짧은 검색어는 뺀다.
+    """
+    terms: List[str] = []
+    for token in query.split():
+        token = token.strip("?!.,~\"'()[]")
+        if token in _LEXICAL_STOP_WORDS:
+            continue
+        for suffix in _KOREAN_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+                token = token[: -len(suffix)]
+                break
+        if len(token) >= min_length and token not in _LEXICAL_STOP_WORDS and token not in terms:
+            terms.append(token)
+    return terms
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
-        return unique_documents
 
+def _version_tuple(version: Optional[str]) -> Tuple[int, ...]:
+    parts = []
+    for part in (version or "0").split("."):
+        digits = "".join(ch for ch in part if ch.isdigit())
+        parts.append(int(digits or 0))
+    return tuple(parts)
@@ -1,4 +1,17 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+T = TypeVar("T")
+
+# 끊어진 커넥션으로 판단해 버리고 다시 연결할 예외들
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
 
 
 def make_conn_str() -> str:
@@ -9,3 +22,144 @@ def make_conn_str() -> str:
     db = os.getenv("PGDATABASE")
     return f"postgresql://{user}:{pwd}@{host}:{port}/{db}"
 
+
+class PgConnectionPool:
+    """
+    psycopg2 ThreadedConnectionPool 위에 아래 기능을 더한 스레드 안전 커넥션 풀.
+    - maxconn을 넘으면 예외 대신 빈 커넥션이 생길 때까지 대기 (timeout초)
+    - 체크아웃 시 헬스체크 (오래 쉬던 커넥션은 SELECT 1로 확인)
+    - 끊어진 커넥션은 버리고 새로 연결
+    """
+
+    def __init__(
+        self,
+        conn_str: str,
+        minconn: Optional[int] = None,
+        maxconn: Optional[int] = None,
+        *,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        self.minconn = minconn if minconn is not None else int(os.getenv("PG_POOL_MIN", "1"))
+        self.maxconn = maxconn if maxconn is not None else int(os.getenv("PG_POOL_MAX", "8"))
+        if self.maxconn < max(1, self.minconn):
+            raise ValueError("PG 풀의 maxconn은 minconn 이상이어야 합니다.")
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, conn_str)
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        # 커넥션 -> 만들었거나 마지막으로 반납된 시각 (풀에 남아 있는 커넥션만 담는다)
+        self._last_used: Dict[extensions.connection, float] = {}
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._pool.closed)
+
+    @contextmanager
+    def connection(self) -> Iterator[extensions.connection]:
+        """
+        커넥션을 하나 빌려준다. 블록이 정상 종료되면 commit, 예외면 rollback 후 반납.
+        커넥션 오류가 나면 그 커넥션은 닫고 풀에서 제거한다.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"{self.timeout}초 안에 사용할 수 있는 DB 커넥션이 없습니다.")
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+                conn.commit()
+            except CONNECTION_ERRORS:
+                broken = True
+                raise
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+        finally:
+            if conn is not None:
+                self._checkin(conn, broken or bool(conn.closed))
+            self._slots.release()
+
+    def run(self, fn: Callable[[extensions.connection], T], retries: int = 1) -> T:
+        """fn(conn)을 실행하고, 커넥션 오류가 나면 새 커넥션으로 retries번까지 재시도"""
+        attempt = 0
+        while True:
+            try:
+                with self.connection() as conn:
+                    return fn(conn)
+            except CONNECTION_ERRORS:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+
+    def warm_up(self) -> None:
+        """minconn개의 커넥션을 미리 열고 상태를 확인한다."""
+        for _ in range(self.minconn):
+            self.run(lambda conn: conn.cursor().execute("SELECT 1"))
+
+    def close(self) -> None:
+        if not self._pool.closed:
+            self._pool.closeall()
+        self._last_used.clear()
+
+    def _checkout(self) -> extensions.connection:
+        conn = self._getconn()
+        if not self._is_healthy(conn):
+            self._checkin(conn, broken=True)
+            conn = self._getconn()
+        return conn
+
+    def _getconn(self) -> extensions.connection:
+        conn = self._pool.getconn()
+        # 처음 보는 커넥션은 방금 만든 것이므로 지금부터 쉰 시간을 잰다
+        self._last_used.setdefault(conn, time.monotonic())
+        return conn
+
+    def _checkin(self, conn: extensions.connection, broken: bool) -> None:
+        if not broken:
+            self._last_used[conn] = time.monotonic()
+        self._pool.putconn(conn, close=broken)
+        if conn.closed:  # 끊어졌거나, minconn을 넘어 풀이 닫은 커넥션
+            self._last_used.pop(conn, None)
+
+    def _is_healthy(self, conn: extensions.connection) -> bool:
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        idle = time.monotonic() - self._last_used[conn]
+        if idle < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+
+def make_async_pool(
+    conn_str: str,
+    minconn: Optional[int] = None,
+    maxconn: Optional[int] = None,
+    *,
+    timeout: float = 30.0,
+):
+    """
+    비동기 검색용 psycopg3 AsyncConnectionPool (열지 않은 상태로 반환, 호출하는 쪽에서 await open()).
+    PgConnectionPool과 같은 PG_POOL_MIN/MAX를 쓰고, 빌려줄 때마다 커넥션 상태를 확인한다.
+    psycopg/psycopg_pool은 비동기 API를 쓸 때만 필요하므로 여기서 import 한다.
+    """
+    from psycopg_pool import AsyncConnectionPool
+
+    return AsyncConnectionPool(
+        conn_str,
+        min_size=minconn if minconn is not None else int(os.getenv("PG_POOL_MIN", "1")),
+        max_size=maxconn if maxconn is not None else int(os.getenv("PG_POOL_MAX", "8")),
+        timeout=timeout,
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_utils import get_embedding_model
+
+_DOMAIN_GUARD: "EmbeddingDomainGuard | None" = None
+_DOMAIN_GUARD_LOCK = threading.Lock()
+
+# guard 프롬프트의 YES/NO 기준을 옮긴 시드 예시 (True = 의약품 도메인)
+SEED_EXAMPLES: List[Tuple[str, bool]] = [
+    ("지르텍에 대해서 알려줘", True),
+    ("타이레놀 500mg을 복용했는데 발열이 계속돼요. 부작용인가요?", True),
+    ("타이레놀 복용법 알려줘", True),
+    ("이부프로펜은 하루에 몇 번 먹어야 하나요?", True),
+    ("아세트아미노펜 성분이 들어간 약은 뭐가 있어?", True),
+    ("게보린과 판콜에이를 같이 먹어도 되나요?", True),
+    ("베아제 보관법 알려줘", True),
+    ("임산부가 먹으면 안 되는 감기약이 있나요?", True),
+    ("머리가 아프고 열이 나는데 먹을 수 있는 약 추천해줘", True),
+    ("소화가 안 되고 속이 더부룩할 때 먹는 약은?", True),
+    ("콧물이 계속 나는데 어떤 약을 먹으면 좋을까요?", True),
+    ("알레르기 비염약 먹고 졸린 건 정상인가요?", True),
+    ("어린이 해열제 용량은 몸무게에 따라 어떻게 달라요?", True),
+    ("항생제를 먹다가 중간에 끊어도 되나요?", True),
+    ("위장약을 식전에 먹어야 하나요 식후에 먹어야 하나요?", True),
+    ("이 연고는 하루에 몇 번 발라야 해?", True),
+    ("진통제를 술이랑 같이 먹으면 어떻게 돼?", True),
+    ("코감기약 먹고 두근거림이 생겼어요", True),
+    ("바흐의 녹턴 교향곡이 외계인에게 주는 증상은?", False),
+    ("도라에몽이 비빔밥 먹고 생기는 부작용?", False),
+    ("오늘 서울 날씨 어때?", False),
+    ("삼성전자 주가 전망 알려줘", False),
+    ("손흥민이 이번 시즌에 몇 골 넣었어?", False),
+    ("전세 계약할 때 주의할 점은?", False),
+    ("재미있는 농담 하나 해줘", False),
+    ("파이썬에서 리스트 정렬하는 방법", False),
+    ("김치찌개 맛있게 끓이는 법", False),
+    ("부산 여행 코스 추천해줘", False),
+    ("베토벤 교향곡 9번은 언제 작곡됐어?", False),
+    ("불교와 기독교의 차이는 뭐야?", False),
+    ("외계인이 지구에 오면 생기는 일은?", False),
+    ("해리포터 마법약 중에 제일 강한 건?", False),
+    ("강아지 산책은 하루에 몇 번 해야 돼?", False),
+    ("이번 대선 결과 알려줘", False),
+    ("영어 회화 공부하는 방법 알려줘", False),
+    ("아이언맨 슈트는 어떤 원리로 날아?", False),
+]
+
+
+def load_examples(path: str) -> List[Tuple[str, bool]]:
+    """{"question": ..., "label": "YES"|"NO"|true|false} 형식의 JSONL 예시 파일을 읽는다."""
+    examples: List[Tuple[str, bool]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            label = row["label"]
+            if isinstance(label, str):
+                label = label.strip().upper() == "YES"
+            examples.append((row["question"], bool(label)))
+    return examples
+
+
+class EmbeddingDomainGuard:
+    """
+    YES/NO 예시 임베딩의 중심(centroid)과의 코사인 유사도 차이로 도메인을 판별하는 guard.
+    margin = cos(질문, YES 중심) - cos(질문, NO 중심) 이 uncertainty 밴드 안이면
+    판단을 보류(None)하고, 호출하는 쪽이 LLM guard로 넘긴다.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        examples: Optional[Iterable[Tuple[str, bool]]] = None,
+        uncertainty: float = 0.02,
+    ) -> None:
+        self.embeddings = embeddings
+        self.uncertainty = uncertainty
+        self.examples = list(examples) if examples is not None else list(SEED_EXAMPLES)
+        labels = {label for _, label in self.examples}
+        if labels != {True, False}:
+            raise ValueError("guard 예시에는 YES와 NO가 모두 있어야 합니다.")
+        self._yes_centroid, self._no_centroid = self._fit()
+
+    def _fit(self) -> Tuple[np.ndarray, np.ndarray]:
+        # 실제 질문과 같은 경로(embed_query)로 임베딩해야 질의용 프롬프트를 쓰는 모델에서도 맞는다
+        vectors = np.asarray(
+            [self.embeddings.embed_query(question) for question, _ in self.examples],
+            dtype=np.float32,
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        mask = np.array([label for _, label in self.examples])
+        return _unit(vectors[mask].mean(axis=0)), _unit(vectors[~mask].mean(axis=0))
+
+    def score(self, question: str) -> float:
+        """YES 중심 쪽으로 가까울수록 큰 값 (음수면 NO 쪽)"""
+        vector = _unit(np.asarray(self.embeddings.embed_query(question), dtype=np.float32))
+        return float(vector @ self._yes_centroid - vector @ self._no_centroid)
+
+    def classify(self, question: str) -> Optional[bool]:
+        """도메인 관련이면 True, 아니면 False, 애매하면 None"""
+        margin = self.score(question)
+        if abs(margin) < self.uncertainty:
+            return None
+        return margin > 0
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def get_domain_guard() -> EmbeddingDomainGuard:
+    """기본 임베딩 모델로 학습한 프로세스 공용 guard (GUARD_EXAMPLES_PATH 예시를 시드에 추가)"""
+    global _DOMAIN_GUARD
+    with _DOMAIN_GUARD_LOCK:
+        if _DOMAIN_GUARD is None:
+            examples = list(SEED_EXAMPLES)
+            path = os.getenv("GUARD_EXAMPLES_PATH")
+            if path:
+                examples.extend(load_examples(path))
+            _DOMAIN_GUARD = EmbeddingDomainGuard(
+                get_embedding_model(),
+                examples,
+                uncertainty=float(os.getenv("GUARD_UNCERTAINTY_MARGIN", "0.02")),
+            )
+    return _DOMAIN_GUARD
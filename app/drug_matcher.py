@@ -0,0 +1,98 @@
+from collections import deque
+from typing import Dict, Generic, Iterator, List, Mapping, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class AliasMatcher(Generic[V]):
+    """
+    약 이름 별칭 사전으로 만든 Aho-Corasick 오토마톤.
+    한 번 만들어 두면 메시지를 한 번만 훑어서 모든 별칭 출현 위치를 찾고,
+    extract()는 그중 왼쪽부터 가장 긴 것을 겹치지 않게 골라 값으로 돌려준다.
+    별칭은 이미 정규화(소문자/공백 제거)되어 있다고 가정한다.
+    """
+
+    def __init__(self, aliases: Mapping[str, V]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 노드에서 끝나는 별칭 (없으면 None)
+        self._terminal: List["str | None"] = [None]
+        # fail 체인을 따라 가장 가까운 별칭 끝 노드 (없으면 0)
+        self._output_link: List[int] = [0]
+        self._values: Dict[str, V] = {}
+
+        for alias, value in aliases.items():
+            if alias:
+                self._insert(alias)
+                self._values[alias] = value
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, alias: str) -> V:
+        return self._values[alias]
+
+    def _insert(self, alias: str) -> None:
+        node = 0
+        for ch in alias:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._output_link.append(0)
+            node = nxt
+        self._terminal[node] = alias
+
+    def _build_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                fail_node = self._fail[child]
+                self._output_link[child] = (
+                    fail_node if self._terminal[fail_node] is not None else self._output_link[fail_node]
+                )
+                queue.append(child)
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """text 안의 모든 별칭 출현을 (시작, 끝, 별칭)으로 돌려준다 (겹침 포함)."""
+        goto, fail, terminal, output_link = self._goto, self._fail, self._terminal, self._output_link
+        node = 0
+        for end, ch in enumerate(text, start=1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if terminal[node] is not None else output_link[node]
+            while hit:
+                alias = terminal[hit]
+                yield end - len(alias), end, alias
+                hit = output_link[hit]
+
+    def find_longest(self, text: str) -> List[Tuple[int, int, str]]:
+        """왼쪽부터 가장 긴 별칭을 겹치지 않게 고른 출현 목록 (위치 순)"""
+        matches = sorted(self.finditer(text), key=lambda m: (m[0], m[0] - m[1]))
+        chosen: List[Tuple[int, int, str]] = []
+        last_end = 0
+        for start, end, alias in matches:
+            if start >= last_end:
+                chosen.append((start, end, alias))
+                last_end = end
+        return chosen
+
+    def extract(self, text: str) -> List[V]:
+        """find_longest 결과를 사전 값으로 바꿔 등장 순서대로 중복 없이 돌려준다."""
+        values: List[V] = []
+        for _, _, alias in self.find_longest(text):
+            value = self[alias]
+            if value not in values:
+                values.append(value)
+        return values
@@ -0,0 +1,240 @@
+import json
+import os
+import pickle
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from drug_matcher import AliasMatcher
+
+# =========================================================
+# 🔧 데이터 소스 설정 (있으면 DB→CSV→목업 순으로 로드)
+DB_TABLE = os.getenv("DRUG_TABLE", "drug_info")
+DB_NAME_COL = os.getenv("DRUG_NAME_COL", "product_name")
+DB_INGR_COL = os.getenv("DRUG_INGR_COL", "ingredient")
+DB_SYNONYM_COLS = json.loads(os.getenv("DRUG_SYNONYM_COLS", '["brand_name","generic_name","korean_name","english_name"]'))
+
+CSV_PATH = os.getenv("DRUG_CSV", "./data/drug_info_preprocessed.csv")
+CSV_NAME_COL = os.getenv("CSV_NAME_COL", "제품명")
+CSV_INGR_COL = os.getenv("CSV_INGR_COL", "성분명")
+CSV_SYNONYM_COLS = json.loads(os.getenv("CSV_SYNONYM_COLS", '["제품명영문","브랜드명","일반명"]'))
+
+# 빌드된 사전을 저장할 파일 (빈 값이면 저장하지 않음)
+SYNONYM_CACHE_PATH = os.getenv("DRUG_SYNONYM_CACHE", ".cache/drug_synonyms.pkl")
+# 사전 빌드 규칙이 바뀌면 올려서 예전 파일을 무효화
+ARTIFACT_VERSION = 1
+# =========================================================
+
+AliasMap = Dict[str, Tuple[str, str]]
+
+MOCK_SYNONYMS: AliasMap = {
+    "아세트아미노펜": ("타이레놀", "아세트아미노펜"),
+    "타이레놀": ("타이레놀", "아세트아미노펜"),
+    "파나돌": ("파나돌", "아세트아미노펜"),
+    "이부프로펜": ("이부프로펜", "이부프로펜"),
+    "애드빌": ("애드빌", "이부프로펜"),
+    "훼스탈": ("훼스탈", "소화효소"),
+    "베아제": ("베아제", "소화효소"),
+    "겔포스": ("겔포스", "알긴산/제산제"),
+    "알마겔": ("알마겔", "알루미늄/마그네슘 제산제"),
+    "지르텍": ("지르텍", "세티리진"),
+    "로페라마이드": ("로페라마이드", "로페라마이드"),
+    "파몰에이": ("파몰에이", "복합감기약"),
+    "콜대원": ("콜대원", "복합감기약"),
+}
+
+
+def _split_series(values: pd.Series) -> pd.Series:
+    """'a; b/c|d' 형태의 값을 (원래 행 인덱스, 항목) 한 줄씩으로 펼친다."""
+    parts = (
+        values.dropna()
+        .astype(str)
+        .str.replace(r"[;/|]", ",", regex=True)
+        .str.split(",")
+        .explode()
+        .str.strip()
+    )
+    return parts[parts.notna() & (parts != "")]
+
+
+def build_alias_map(df: pd.DataFrame, name_col: str, ingr_col: str, syn_cols: List[str]) -> AliasMap:
+    """
+    alias(lower) -> (display_name, main_ingredient)
+    제품명, 성분명 각각, 동의어 컬럼 값들을 별칭으로 펼쳐 한 번에 만든다.
+    같은 별칭이 여러 행에 있으면 뒤쪽 행이 이긴다.
+    """
+    df = df.reset_index(drop=True)
+    display = df[name_col].astype(str).str.strip()
+    ingredients = _split_series(df[ingr_col])
+    # 구분자를 ", " 하나로 통일 (groupby join 대신 문자열 연산으로 처리)
+    main_ingr = (
+        df[ingr_col]
+        .fillna("")
+        .astype(str)
+        .str.replace(r"\s*[;/|,][\s;/|,]*", ", ", regex=True)
+        .str.strip()
+        .str.strip(",")
+        .str.strip()
+    )
+
+    aliases = pd.concat([display, ingredients] + [_split_series(df[col]) for col in syn_cols])
+    aliases = aliases.str.strip().str.lower()
+    aliases = aliases[aliases != ""]
+    # 행 순서대로 정렬해 마지막 행의 값이 남도록 한다
+    aliases = aliases.sort_index(kind="stable")
+    aliases = aliases[~aliases.duplicated(keep="last")]
+
+    rows = aliases.index
+    return dict(zip(aliases, zip(display.loc[rows], main_ingr.loc[rows])))
+
+
+def _load_artifact(path: str, source_key: tuple) -> Optional[AliasMap]:
+    try:
+        with open(path, "rb") as f:
+            artifact = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if artifact.get("version") != ARTIFACT_VERSION or artifact.get("source_key") != source_key:
+        return None
+    return artifact["mapping"]
+
+
+def _save_artifact(path: str, source_key: tuple, mapping: AliasMap) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"version": ARTIFACT_VERSION, "source_key": source_key, "mapping": mapping},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(tmp_path, path)  # 읽는 쪽이 반쯤 쓴 파일을 보지 않도록
+
+
+def _cached(source_key: tuple, build) -> AliasMap:
+    """소스 키가 같으면 저장된 사전을 읽고, 아니면 build()로 만들어 저장한다."""
+    if SYNONYM_CACHE_PATH:
+        mapping = _load_artifact(SYNONYM_CACHE_PATH, source_key)
+        if mapping is not None:
+            return mapping
+    mapping = build()
+    if mapping and SYNONYM_CACHE_PATH:
+        try:
+            _save_artifact(SYNONYM_CACHE_PATH, source_key, mapping)
+        except OSError:
+            pass  # 저장 실패는 다음 기동 때 다시 빌드하면 된다
+    return mapping
+
+
+def _table_version(conn) -> tuple:
+    """
+    행 내용을 해시하지 않고 테이블이 바뀌었는지 알아보는 키 (행 수, 가장 최근 행 버전의 xmin).
+    INSERT/UPDATE로 생긴 행은 새 트랜잭션 id를 xmin으로 갖고, DELETE는 행 수를 바꾼다.
+    둘 다 데이터와 같은 트랜잭션에서 커밋되므로 커밋 직후 바로 키가 달라진다.
+    """
+    from sqlalchemy import text
+
+    count, last_xmin = conn.execute(
+        text(f"SELECT count(*), coalesce(max(xmin::text::bigint), 0) FROM {DB_TABLE}")
+    ).one()
+    return int(count), int(last_xmin)
+
+
+def _from_db() -> Optional[AliasMap]:
+    import sqlalchemy
+    from sqlalchemy import text
+    from db_utils import make_conn_str
+
+    engine = sqlalchemy.create_engine(make_conn_str())
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": DB_TABLE}).scalar()
+        if not exists:
+            return None
+        cols = conn.execute(
+            text("SELECT column_name FROM information_schema.columns WHERE table_name = :t"),
+            {"t": DB_TABLE},
+        ).fetchall()
+        colset = {c[0].lower() for c in cols}
+        name_col = DB_NAME_COL if DB_NAME_COL.lower() in colset else None
+        ingr_col = DB_INGR_COL if DB_INGR_COL.lower() in colset else None
+        syn_cols = [c for c in DB_SYNONYM_COLS if c.lower() in colset]
+        if not (name_col and ingr_col):
+            return None
+
+        select_cols = [name_col, ingr_col] + syn_cols
+        select_sql = ", ".join(select_cols)
+        source_key = ("db", DB_TABLE, tuple(select_cols), *_table_version(conn))
+
+        def _build() -> AliasMap:
+            df = pd.read_sql(text(f"SELECT {select_sql} FROM {DB_TABLE}"), conn)
+            return build_alias_map(df, name_col, ingr_col, syn_cols)
+
+        return _cached(source_key, _build)
+
+
+def _from_csv() -> Optional[AliasMap]:
+    if not os.path.exists(CSV_PATH):
+        return None
+    stat = os.stat(CSV_PATH)
+    source_key = (
+        "csv",
+        os.path.abspath(CSV_PATH),
+        stat.st_mtime_ns,
+        stat.st_size,
+        CSV_NAME_COL,
+        CSV_INGR_COL,
+        tuple(CSV_SYNONYM_COLS),
+    )
+
+    def _build() -> AliasMap:
+        header = pd.read_csv(CSV_PATH, nrows=0).columns
+        cols = {c.lower(): c for c in header}
+        name_col = cols.get(CSV_NAME_COL.lower())
+        ingr_col = cols.get(CSV_INGR_COL.lower())
+        syn_cols = [cols[c.lower()] for c in CSV_SYNONYM_COLS if c.lower() in cols]
+        if not (name_col and ingr_col):
+            return {}
+        df = pd.read_csv(CSV_PATH, usecols=[name_col, ingr_col] + syn_cols)
+        return build_alias_map(df, name_col, ingr_col, syn_cols)
+
+    return _cached(source_key, _build)
+
+
+def load_drug_synonyms() -> AliasMap:
+    """
+    alias(lower) -> (display_name, main_ingredient)
+    1) Postgres 테이블 → 2) CSV → 3) 목업
+    DB/CSV에서 만든 사전은 DB 행 수·최신 xmin 또는 CSV mtime을 키로 파일에 저장해 두고 다음 기동 때 그대로 읽는다.
+    """
+    for source in (_from_db, _from_csv):
+        try:
+            mapping = source()
+        except Exception:
+            mapping = None
+        if mapping:
+            return mapping
+    return dict(MOCK_SYNONYMS)
+
+
+@lru_cache(maxsize=1)
+def get_drug_matcher() -> AliasMatcher:
+    """load_drug_synonyms() 사전으로 만든 Aho-Corasick 매처 (프로세스당 한 번 생성, Streamlit 화면도 이 캐시를 그대로 쓴다)"""
+    return AliasMatcher(load_drug_synonyms())
+
+
+def detect_products(text: str) -> List[str]:
+    """
+    질문에 나온 제품명/브랜드 별칭을 제품명(display_name) 목록으로 바꾼다.
+    성분명으로만 매칭된 경우는 그 성분을 가진 제품이 여럿일 수 있으므로 제외한다.
+    """
+    matcher = get_drug_matcher()
+    products: List[str] = []
+    for _, _, alias in matcher.find_longest((text or "").strip().lower()):
+        display, main_ingr = matcher[alias]
+        ingredients = {part.strip().lower() for part in main_ingr.split(",")}
+        if alias in ingredients and alias != display.lower():
+            continue
+        if display not in products:
+            products.append(display)
+    return products
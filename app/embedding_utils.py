@@ -1,33 +1,185 @@
+import hashlib
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain_community.embeddings import HuggingFaceEmbeddings
 
+# sqlite IN (...) 절 하나에 넣을 최대 키 수
+_SQLITE_BATCH = 500
 
-@lru_cache(maxsize=1) # 함수 결과를 메모리에 저장해 두는 파이썬 표준 라이브러리
-def _load_embeddings() -> Tuple[HuggingFaceEmbeddings, int]:
-    model_name = os.getenv("LOCAL_EMBEDDING_MODEL")
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 모델 앞에 메모리 LRU + 로컬 sqlite 저장소(float32 BLOB) 2단 캐시를 두는 래퍼.
+    키는 (모델명, normalize 여부, 질의/문서 구분, 텍스트)의 해시라서 모델이나 옵션이 바뀌면 캐시도 분리된다.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        normalize: bool,
+        cache_path: Optional[str] = None,
+        memory_size: int = 4096,
+    ) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.namespace = f"{model_name}|normalize={normalize}"
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "doc", self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query", lambda items: [self.embeddings.embed_query(items[0])])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """여러 질의를 embed_query와 같은 캐시 키로 한 번에 임베딩 (캐시 미스만 모델에 보낸다)"""
+        return self._embed(list(texts), "query", lambda items: embed_queries(self.embeddings, items))
+
+    def stats(self) -> Dict[str, float]:
+        """캐시 적중/미스 카운터"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha1(f"{self.namespace}|{kind}|{text}".encode("utf-8")).hexdigest()
+
+    def _embed(
+        self,
+        texts: List[str],
+        kind: str,
+        compute: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+                    self.memory_hits += 1
+            disk = self._load(key for key in dict.fromkeys(keys) if key not in vectors)
+            self.disk_hits += sum(1 for key in keys if key in disk)
+            vectors.update(disk)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            text_for = dict(zip(keys, texts))
+            computed = compute([text_for[key] for key in missing])
+            fresh = {key: np.asarray(vec, dtype="<f4") for key, vec in zip(missing, computed)}
+            vectors.update(fresh)
+            with self._lock:
+                self.misses += sum(1 for key in keys if key in fresh)
+                self._store(fresh)
+
+        with self._lock:
+            for key in keys:
+                self._memory[key] = vectors[key]
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def _load(self, keys) -> Dict[str, np.ndarray]:
+        if self._db is None:
+            return {}
+        keys = list(keys)
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(keys), _SQLITE_BATCH):
+            batch = keys[start:start + _SQLITE_BATCH]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="<f4")
+        return found
+
+    def _store(self, vectors: Dict[str, np.ndarray]) -> None:
+        if self._db is None or not vectors:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, vec.tobytes()) for key, vec in vectors.items()],
+        )
+        self._db.commit()
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    질의 여러 개를 임베딩한다. 캐시 래퍼면 캐시를 거치고, HuggingFaceEmbeddings처럼
+    embed_query가 embed_documents([text])와 같은 모델이면 한 번의 배치 호출로 묶는다.
+    """
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_queries(texts)
+    if isinstance(embeddings, HuggingFaceEmbeddings) and not getattr(embeddings, "query_encode_kwargs", None):
+        return embeddings.embed_documents(list(texts))
+    return [embeddings.embed_query(text) for text in texts]
+
+
+def _default_model_name() -> Optional[str]:
+    return os.getenv("LOCAL_EMBEDDING_MODEL")
+
+
+@lru_cache(maxsize=4) # 함수 결과를 메모리에 저장해 두는 파이썬 표준 라이브러리 (모델명별로 캐시)
+def _load_embeddings(model_name: Optional[str]) -> Tuple[Embeddings, int]:
     normalize = os.getenv("LOCAL_EMBEDDING_NORMALIZE", "false").lower() == "true"
 
-    embeddings = HuggingFaceEmbeddings(
+    embeddings: Embeddings = HuggingFaceEmbeddings(
         model_name=model_name,
         encode_kwargs={"normalize_embeddings": normalize},
     )
+    if os.getenv("EMBEDDING_CACHE", "true").lower() == "true":
+        embeddings = CachedEmbeddings(
+            embeddings,
+            model_name=model_name or "",
+            normalize=normalize,
+            cache_path=os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3") or None,
+            memory_size=int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "4096")),
+        )
 
+    # LOCAL_EMBEDDING_DIM은 기본 모델(LOCAL_EMBEDDING_MODEL)에만 적용
     dim_env = os.getenv("LOCAL_EMBEDDING_DIM")
-    if dim_env:
+    if dim_env and model_name == _default_model_name():
         dimension = int(dim_env)
     else:
         dimension = len(embeddings.embed_query("dimension probe"))
     return embeddings, dimension
 
 
-def get_embedding_model() -> HuggingFaceEmbeddings:
-    """Return the cached embedding model instance."""
-    return _load_embeddings()[0]
+def get_embedding_model(model_name: Optional[str] = None) -> Embeddings:
+    """Return the cached embedding model instance (defaults to LOCAL_EMBEDDING_MODEL)."""
+    return _load_embeddings(model_name or _default_model_name())[0]
 
 
-def get_embedding_dim() -> int:
-    """Return the embedding dimension for the current model."""
-    return _load_embeddings()[1]
+def get_embedding_dim(model_name: Optional[str] = None) -> int:
+    """Return the embedding dimension for the given (or default) model."""
+    return _load_embeddings(model_name or _default_model_name())[1]
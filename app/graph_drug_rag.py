@@ -1,32 +1,69 @@
 import argparse
+import asyncio
+import csv
+import json
 import os
-from typing import List, TypedDict, Literal, Any, Dict
-
+import statistics
+import sys
+import time
+from functools import partial
+from itertools import islice
+from typing import Annotated, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple, TypedDict, Literal, Any, Dict
+
+import psycopg2
 from dotenv import load_dotenv
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from langchain_community.chat_models import ChatOllama
 
-from embedding_utils import get_embedding_model
-from custom_pgvector import CustomPGVector
+from answer_cache import get_answer_cache
+from context_budget import assemble_context, product_of
+from domain_guard import get_domain_guard
+from drug_synonyms import detect_products, get_drug_matcher
+from embedding_utils import embed_queries, get_embedding_model
+from custom_pgvector import CustomPGVector, embedding_model_key
 from db_utils import make_conn_str
+from instrumentation import METRICS, LLMUsageCallback, collect, format_timings, observe_run, percentile, step
 
 _LLM_INSTANCE: ChatOllama | None = None
 _COMPILED_GRAPH = None
 
+# 질문 표현 -> 검색을 좁힐 섹션명 (DrugCSVLoader 섹션 컬럼명과 같아야 한다)
+SECTION_KEYWORDS: Dict[str, List[str]] = {
+    "효능": ["효능", "효과", "어디에 좋", "무슨 약"],
+    "사용법": ["사용법", "복용법", "용법", "용량", "먹는 법", "먹는법", "몇 번", "몇번", "언제 먹"],
+    "사용 전 주의": ["사용 전", "복용 전", "먹기 전"],
+    "사용상 주의사항": ["주의사항", "주의할"],
+    "약/음식 주의": ["같이 먹", "함께 먹", "음식", "술이랑", "술과", "음주", "상호작용", "병용"],
+    "이상반응": ["부작용", "이상반응", "이상 반응"],
+    "보관법": ["보관"],
+}
+
+def merge_timings(left: Optional[Dict[str, float]], right: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """노드별 소요시간(ms) 리듀서 - 병렬로 끝난 노드들의 값도 합쳐진다."""
+    return {**(left or {}), **(right or {})}
+
+
 class RAGState(TypedDict, total=False):
     """그래프 상태 정의"""
     question: str
     k: int
     collection_name: str
+    embedding_model: str
+    query_embedding: List[float]
+    cache_hit: bool
     in_domain: bool
     retrieved_docs: List[Document]
     context: str
+    context_tokens: Dict[str, int]
     answer: str
     citations: List[Dict[str, Any]]
+    timings: Annotated[Dict[str, float], merge_timings]
+    tokens: Annotated[Dict[str, int], merge_timings]
 
 
 def get_llm() -> ChatOllama:
@@ -35,13 +72,31 @@ def get_llm() -> ChatOllama:
     if _LLM_INSTANCE is None:
         model = os.getenv("OLLAMA_MODEL")
         temperature = float(os.getenv("GEN_TEMPERATURE", "0.2"))
-        _LLM_INSTANCE = ChatOllama(model=model, temperature=temperature)
+        # 호출 시간/TTFT/토큰 수를 호출한 노드의 timings, tokens에 기록한다
+        _LLM_INSTANCE = ChatOllama(model=model, temperature=temperature, callbacks=[LLMUsageCallback()])
     return _LLM_INSTANCE
 
 
-def get_vectorstore(collection_name: str) -> CustomPGVector:
-    """pgvector 컬렉션을 VectorStore로 감싼 객체를 생성"""
-    embedding_model = get_embedding_model()
+def get_collection_models() -> Dict[str, Optional[str]]:
+    """
+    RAG_COLLECTIONS 환경변수를 {컬렉션명: 임베딩 모델명} 으로 파싱
+    예) "drug_info,drug_info_bge=BAAI/bge-m3" (모델 생략 시 LOCAL_EMBEDDING_MODEL)
+    """
+    collections: Dict[str, Optional[str]] = {}
+    for spec in os.getenv("RAG_COLLECTIONS", "drug_info").split(","):
+        name, _, model = spec.strip().partition("=")
+        if name:
+            collections[name.strip()] = model.strip() or None
+    return collections
+
+
+def get_vectorstore(collection_name: str, model_name: Optional[str] = None) -> CustomPGVector:
+    """
+    pgvector 컬렉션을 VectorStore로 감싼 객체를 반환
+    (conn_str, 테이블, 임베딩 모델) 조합마다 하나의 인스턴스를 재사용한다.
+    """
+    model_name = model_name or get_collection_models().get(collection_name)
+    embedding_model = get_embedding_model(model_name)
     return CustomPGVector(
             conn_str=make_conn_str(),
             embedding_fn=embedding_model,
@@ -107,36 +162,224 @@ def build_guard_prompt() -> ChatPromptTemplate:
     )
 
 
-def node_guard(state: RAGState) -> RAGState:
-    """사용자 질문이 의약품 도메인과 관련 있는지 LLM으로 판별"""
+def node_cache_lookup(state: RAGState) -> RAGState:
+    """
+    의미적으로 비슷한 이전 질문의 답변이 캐시에 있으면 LLM 호출 없이 그대로 사용
+    질문에서 찾은 제품 집합과 섹션 집합이 정확히 같은 답변만 재사용한다 (제품명이 없는 질문은 조회하지 않음).
+    """
+    try:
+        cache = get_answer_cache()
+    except psycopg2.Error:
+        cache = None  # 캐시 장애(풀 생성 실패 포함)는 답변 생성을 막지 않는다
+    if cache is None:
+        return {"cache_hit": False}
+
+    vectorstore = get_vectorstore(state["collection_name"], state.get("embedding_model"))
+    # 여기서 만든 질문 임베딩은 retrieve 단계에서 그대로 쓴다 (배치 모드는 미리 넣어 준다)
+    embedding = state.get("query_embedding")
+    if embedding is None:
+        with step("embed"):
+            embedding = vectorstore.embedding_fn.embed_query(state["question"])
+    update: RAGState = {"query_embedding": embedding, "cache_hit": False}
+    try:
+        hit = cache.lookup(
+            embedding,
+            state["collection_name"],
+            embedding_model_key(vectorstore.embedding_fn),
+            state.get("k", 5),
+            detect_products(state["question"]),
+            detect_sections(state["question"]),
+        )
+    except psycopg2.Error:
+        return update
+
+    if hit:
+        update.update(
+            answer=hit["answer"],
+            citations=hit["citations"],
+            in_domain=hit["in_domain"],
+            cache_hit=True,
+        )
+    return update
+
+
+def node_cache_store(state: RAGState) -> RAGState:
+    """새로 만든 답변을 의미 캐시에 저장 (도메인 밖 fallback 답변과 제품명이 없는 질문은 제외)"""
+    if state.get("cache_hit") or not state.get("query_embedding") or not state.get("in_domain"):
+        return {}
+
+    try:
+        cache = get_answer_cache()
+        if cache is None:
+            return {}
+        vectorstore = get_vectorstore(state["collection_name"], state.get("embedding_model"))
+        cache.store(
+            state["query_embedding"],
+            state["collection_name"],
+            embedding_model_key(vectorstore.embedding_fn),
+            state.get("k", 5),
+            state["question"],
+            state.get("answer", ""),
+            state.get("citations", []),
+            bool(state.get("in_domain")),
+            detect_products(state["question"]),
+            detect_sections(state["question"]),
+        )
+    except psycopg2.Error:
+        pass  # 저장 실패는 다음 질문에서 다시 계산하면 된다
+    return {}
+
+
+def get_guard_mode() -> str:
+    """RAG_GUARD_MODE: llm(기본) 또는 embedding"""
+    return os.getenv("RAG_GUARD_MODE", "llm").lower()
+
+
+def llm_guard(question: str) -> bool:
+    """LLM에게 YES/NO를 물어 의약품 도메인 여부를 판별"""
     llm = get_llm()
     guard_chain = build_guard_prompt() | llm | StrOutputParser()
-    result = guard_chain.invoke({"question": state["question"]}).strip().upper()
-    state["in_domain"] = (result == "YES")
-    return state
+    result = guard_chain.invoke({"question": question}).strip().upper()
+    return result == "YES"
+
+
+async def allm_guard(question: str) -> bool:
+    """llm_guard의 비동기 버전"""
+    guard_chain = build_guard_prompt() | get_llm() | StrOutputParser()
+    result = await guard_chain.ainvoke({"question": question})
+    return result.strip().upper() == "YES"
+
+
+def node_guard(state: RAGState) -> RAGState:
+    """
+    사용자 질문이 의약품 도메인과 관련 있는지 판별
+    embedding 모드에서는 임베딩 중심 거리로 먼저 판단하고, 애매할 때만 LLM을 호출한다.
+    """
+    if get_guard_mode() == "embedding":
+        verdict = get_domain_guard().classify(state["question"])
+        if verdict is not None:
+            return {"in_domain": verdict}
+    return {"in_domain": llm_guard(state["question"])}
+
+
+async def anode_guard(state: RAGState) -> RAGState:
+    """node_guard의 비동기 버전 (임베딩 guard는 CPU 작업이라 스레드에서 실행)"""
+    if get_guard_mode() == "embedding":
+        verdict = await asyncio.to_thread(get_domain_guard().classify, state["question"])
+        if verdict is not None:
+            return {"in_domain": verdict}
+    return {"in_domain": await allm_guard(state["question"])}
+
+
+def detect_sections(question: str) -> List[str]:
+    """질문 표현으로 어떤 섹션을 묻는지 추정 (없으면 빈 목록)"""
+    return [
+        section
+        for section, keywords in SECTION_KEYWORDS.items()
+        if any(keyword in question for keyword in keywords)
+    ]
+
+
+def search_filters(question: str) -> List[Dict[str, List[str]]]:
+    """
+    질문에서 찾은 제품명/섹션으로 만든 검색 조건 목록 (좁은 것부터)
+    결과가 없으면 다음 조건으로, 마지막에는 조건 없이 검색한다.
+    """
+    products = detect_products(question)
+    sections = detect_sections(question)
+    filters: List[Dict[str, List[str]]] = []
+    if products and sections:
+        filters.append({"products": products, "sections": sections})
+    if products:
+        filters.append({"products": products})
+    elif sections:
+        filters.append({"sections": sections})
+    filters.append({})
+    return filters
+
+
+def get_search_mode() -> str:
+    """RAG_SEARCH_MODE: vector(기본) 또는 hybrid(벡터 + content 부분일치 RRF)"""
+    return os.getenv("RAG_SEARCH_MODE", "vector").lower()
+
+
+def get_max_chunks_per_product() -> Optional[int]:
+    """RAG_MAX_CHUNKS_PER_PRODUCT: 한 제품의 청크가 컨텍스트를 독차지하지 않도록 하는 상한 (0이면 무제한)"""
+    return int(os.getenv("RAG_MAX_CHUNKS_PER_PRODUCT", "0")) or None
+
+
+def get_context_token_budget() -> Optional[int]:
+    """RAG_CONTEXT_TOKEN_BUDGET: 생성 프롬프트 CONTEXT의 추정 토큰 상한 (0이면 무제한, 겹침/중복 제거는 항상 한다)"""
+    return int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500")) or None
 
 
 def node_retrieve(state: RAGState) -> RAGState:
-    """유사도 검색으로 문서 청크를 가져오는 함수"""
-    collection = state["collection_name"]
-    k = state.get("k", 5)
-    vectorstore = get_vectorstore(collection)
-    docs_and_scores = vectorstore.similarity_search_with_score(state["question"], k=k)
+    """
+    유사도 검색으로 문서 청크를 가져오는 함수
+    질문에 제품명/섹션이 있으면 인덱스된 컬럼 조건으로 후보를 먼저 좁히고,
+    조건에 맞는 청크가 없으면 조건을 풀어서 다시 검색한다.
+    제품이 정해지지 않은 검색에만 제품별 청크 상한을 적용한다.
+    cache_lookup이 만든 질문 임베딩(query_embedding)이 있으면 다시 임베딩하지 않는다.
+    """
+    vectorstore = get_vectorstore(state["collection_name"], state.get("embedding_model"))
+    embedding = state.get("query_embedding")
+    if embedding is None:
+        with step("embed"):
+            embedding = vectorstore.embedding_fn.embed_query(state["question"])
+    if get_search_mode() == "hybrid":
+        search = partial(vectorstore.hybrid_search_with_score, state["question"], embedding=embedding)
+    else:
+        search = partial(vectorstore.similarity_search_with_score_by_vector, embedding)
+    docs_and_scores = []
+    for search_filter in search_filters(state["question"]):
+        per_product = None if search_filter.get("products") else get_max_chunks_per_product()
+        docs_and_scores = search(k=state.get("k", 5), per_product=per_product, **search_filter)
+        if docs_and_scores:
+            break
+    return _retrieval_update(state["question"], docs_and_scores)
+
+
+async def anode_retrieve(state: RAGState) -> RAGState:
+    """node_retrieve의 비동기 버전 (VectorStore의 비동기 풀로 검색)"""
+    vectorstore = get_vectorstore(state["collection_name"], state.get("embedding_model"))
+    embedding = state.get("query_embedding")
+    if embedding is None:
+        with step("embed"):
+            embedding = await vectorstore.embedding_fn.aembed_query(state["question"])
+    if get_search_mode() == "hybrid":
+        search = partial(vectorstore.ahybrid_search_with_score, state["question"], embedding=embedding)
+    else:
+        search = partial(vectorstore.asimilarity_search_with_score_by_vector, embedding)
+    docs_and_scores = []
+    for search_filter in search_filters(state["question"]):
+        per_product = None if search_filter.get("products") else get_max_chunks_per_product()
+        docs_and_scores = await search(k=state.get("k", 5), per_product=per_product, **search_filter)
+        if docs_and_scores:
+            break
+    return _retrieval_update(state["question"], docs_and_scores)
+
+
+def _retrieval_update(question: str, docs_and_scores: List[Tuple[Document, float]]) -> RAGState:
+    """
+    검색 결과를 retrieved_docs / context / citations 상태로 바꾼다.
+    context는 겹친 청크를 합치고 중복 문장을 뺀 뒤 토큰 예산 안에서 질문이 묻는 섹션부터 채운다.
+    """
     docs: List[Document] = [d for d, _ in docs_and_scores]
 
-    context_lines: List[str] = []
     citations: List[Dict[str, Any]] = []
     for doc, score in docs_and_scores:
-        meta = doc.metadata or {}
-        product = meta.get("제품명") or meta.get("title") or meta.get("product") or "알 수 없는 제품"
         snippet = (doc.page_content or "")[:300].replace("\n", " ")
-        context_lines.append(f"[제품명: {product}] {doc.page_content}")
-        citations.append({"제품명": product, "score": float(score), "snippet": snippet})
+        citations.append({"제품명": product_of(doc), "score": float(score), "snippet": snippet})
 
-    state["retrieved_docs"] = docs
-    state["context"] = "\n\n".join(context_lines)
-    state["citations"] = citations
-    return state
+    context, context_tokens = assemble_context(
+        docs_and_scores, get_context_token_budget(), detect_sections(question)
+    )
+    return {
+        "retrieved_docs": docs,
+        "context": context,
+        "context_tokens": context_tokens,
+        "citations": citations,
+    }
 
 
 def node_generate(state: RAGState) -> RAGState:
@@ -146,19 +389,43 @@ def node_generate(state: RAGState) -> RAGState:
     chain = prompt | llm | StrOutputParser()
 
     answer = chain.invoke({"question": state["question"], "context": state.get("context", "")})
-    state["answer"] = answer
-    return state
+    return {"answer": answer}
+
+
+async def anode_generate(state: RAGState) -> RAGState:
+    """node_generate의 비동기 버전"""
+    chain = build_prompt() | get_llm() | StrOutputParser()
+    answer = await chain.ainvoke({"question": state["question"], "context": state.get("context", "")})
+    return {"answer": answer}
 
 
 def node_fallback(state: RAGState) -> RAGState:
-    """도메인과 관련 없을 때의 안내 메시지"""
-    state["answer"] = (
-        "이 챗봇은 의약품 정보 전용입니다. 약 이름, 효능·용법, 상호작용, 이상반응, 보관법 등 "
-        "의약품 관련 질문을 해주시면 근거에 기반하여 정확히 안내해드릴게요."
-    )
-    state["citations"] = []
-    state["context"] = ""
-    return state
+    """도메인과 관련 없을 때의 안내 메시지 (병렬 모드에서 미리 검색한 결과도 여기서 버린다)"""
+    return {
+        "answer": (
+            "이 챗봇은 의약품 정보 전용입니다. 약 이름, 효능·용법, 상호작용, 이상반응, 보관법 등 "
+            "의약품 관련 질문을 해주시면 근거에 기반하여 정확히 안내해드릴게요."
+        ),
+        "retrieved_docs": [],
+        "citations": [],
+        "context": "",
+        "context_tokens": {},
+    }
+
+
+def node_join(state: RAGState) -> RAGState:
+    """병렬 모드에서 guard와 retrieve가 모두 끝나길 기다리는 합류 지점"""
+    return {}
+
+
+def route_cache(state: RAGState) -> Literal["hit", "miss"]:
+    """캐시 적중 여부에 따라 바로 끝낼지 guard로 갈지 정하는 함수"""
+    return "hit" if state.get("cache_hit") else "miss"
+
+
+def route_cache_parallel(state: RAGState) -> List[str]:
+    """캐시 미스면 guard와 retrieve를 동시에 실행하도록 두 노드로 분기"""
+    return [END] if state.get("cache_hit") else ["guard", "retrieve"]
 
 
 def route_topic(state: RAGState) -> Literal["retrieve", "fallback"]:
@@ -166,21 +433,71 @@ def route_topic(state: RAGState) -> Literal["retrieve", "fallback"]:
     return "retrieve" if state.get("in_domain") else "fallback"
 
 
-def build_graph():
-    """그래프를 정의 하는 함수"""
+def timed_node(name: str, func: Callable[[RAGState], RAGState], afunc=None) -> RunnableLambda:
+    """
+    노드 실행 시간을 timings[name](ms)에 기록하도록 감싼다.
+    노드 안에서 측정된 하위 단계(embed, sql, llm, ttft)는 timings["{name}.{단계}"]에,
+    LLM 토큰 수는 tokens["{name}.prompt"], tokens["{name}.completion"]에 함께 남는다.
+    afunc가 있으면 ainvoke/astream에서 쓰고, 없으면 비동기 실행 때 func를 스레드에서 돌린다.
+    """
+    def finish(update: RAGState, metrics, started: float) -> RAGState:
+        timings = {name: (time.perf_counter() - started) * 1000}
+        timings.update({f"{name}.{sub}": ms for sub, ms in metrics.timings.items()})
+        update = {**update, "timings": timings}
+        if metrics.tokens:
+            update["tokens"] = {f"{name}.{kind}": count for kind, count in metrics.tokens.items()}
+        return update
+
+    def run(state: RAGState) -> RAGState:
+        with collect() as metrics:
+            started = time.perf_counter()
+            update = func(state)
+        return finish(update, metrics, started)
+
+    async def arun(state: RAGState) -> RAGState:
+        with collect() as metrics:
+            started = time.perf_counter()
+            update = await afunc(state) if afunc else await asyncio.to_thread(func, state)
+        return finish(update, metrics, started)
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+def build_graph(parallel_guard: Optional[bool] = None):
+    """
+    그래프를 정의 하는 함수
+    parallel_guard가 True면 guard(LLM 판별)와 retrieve(검색)를 동시에 실행하고
+    join에서 합류한 뒤 guard 결과가 NO면 검색 결과를 버린다. (기본값: RAG_PARALLEL_GUARD)
+    """
+    if parallel_guard is None:
+        parallel_guard = os.getenv("RAG_PARALLEL_GUARD", "false").lower() == "true"
+
     graph = StateGraph(RAGState)
 
-    graph.add_node("guard", node_guard)        # 주제 연관성 판별
-    graph.add_node("retrieve", node_retrieve)  # 연관 시 검색
-    graph.add_node("generate", node_generate)  # 답변 생성
+    # invoke/stream은 동기 노드, ainvoke/astream은 비동기 노드(afunc)로 실행되고 소요시간은 timings에 쌓인다
+    graph.add_node("cache_lookup", timed_node("cache_lookup", node_cache_lookup))  # 의미 캐시 조회
+    graph.add_node("guard", timed_node("guard", node_guard, anode_guard))  # 주제 연관성 판별
+    graph.add_node("retrieve", timed_node("retrieve", node_retrieve, anode_retrieve))  # 연관 시 검색
+    graph.add_node("generate", timed_node("generate", node_generate, anode_generate))  # 답변 생성
     graph.add_node("fallback", node_fallback)  # 비연관 시
-
-    graph.set_entry_point("guard")
-    # guard 노드를 지나 retrieve|fallback 둘 중 어떤 노드로 갈지 결정하는 분기 엣지
-    graph.add_conditional_edges("guard", route_topic, {"retrieve": "retrieve", "fallback": "fallback"})
-    graph.add_edge("retrieve", "generate")
-    graph.add_edge("generate", END)
-    graph.add_edge("fallback", END)
+    graph.add_node("cache_store", timed_node("cache_store", node_cache_store))  # 답변 캐시 저장
+
+    graph.set_entry_point("cache_lookup")
+    if parallel_guard:
+        graph.add_node("join", node_join)  # guard + retrieve 합류
+        # 캐시에 비슷한 질문이 있으면 바로 종료, 아니면 guard와 retrieve를 동시에 실행
+        graph.add_conditional_edges("cache_lookup", route_cache_parallel, ["guard", "retrieve", END])
+        graph.add_edge(["guard", "retrieve"], "join")
+        graph.add_conditional_edges("join", route_topic, {"retrieve": "generate", "fallback": "fallback"})
+    else:
+        # 캐시에 비슷한 질문이 있으면 바로 종료
+        graph.add_conditional_edges("cache_lookup", route_cache, {"hit": END, "miss": "guard"})
+        # guard 노드를 지나 retrieve|fallback 둘 중 어떤 노드로 갈지 결정하는 분기 엣지
+        graph.add_conditional_edges("guard", route_topic, {"retrieve": "retrieve", "fallback": "fallback"})
+        graph.add_edge("retrieve", "generate")
+    graph.add_edge("generate", "cache_store")
+    graph.add_edge("fallback", "cache_store")
+    graph.add_edge("cache_store", END)
 
     return graph.compile()
 
@@ -193,12 +510,26 @@ def get_compiled_graph():
     return _COMPILED_GRAPH
 
 
-def warm_up_pipeline() -> None:
+def warm_up_pipeline(collection_names: Optional[Iterable[str]] = None) -> None:
     """
-    LangGraph와 LLM을 미리 준비해 첫 사용자 입력 전에 초기화 비용을 지불합니다.
+    LangGraph와 LLM, 컬렉션별 VectorStore(커넥션 풀/인덱스 정보)를 미리 준비해
+    첫 사용자 입력 전에 초기화 비용을 지불합니다.
     """
     get_llm()
     get_embedding_model()
+    if get_guard_mode() == "embedding":
+        get_domain_guard()
+    get_drug_matcher()  # 검색 필터용 제품명 사전/매처
+    collections = get_collection_models()
+    for name in collection_names or collections:
+        store = get_vectorstore(name, collections.get(name))
+        info = store.warm_up()
+        if info and info["distance"] and info["distance"] != store.distance:
+            print(
+                f"[warn] '{name}' 인덱스 distance({info['distance']})가 검색 distance({store.distance})와 달라 "
+                "인덱스를 타지 못합니다. PGVECTOR_DISTANCE를 맞추거나 인덱스를 다시 만드세요.",
+                file=sys.stderr,
+            )
     get_compiled_graph()
 
 
@@ -206,17 +537,174 @@ def run_once(question: str, collection_name: str = "drug_info", k: int = 4) -> D
     """그래프를 한 번 실행하고 결과를 dict로 반환"""
     app = get_compiled_graph()
     initial: RAGState = {"question": question, "collection_name": collection_name, "k": k}
-    final_state = app.invoke(initial)
+    return _to_result(app.invoke(initial))
+
+
+async def arun_once(question: str, collection_name: str = "drug_info", k: int = 4) -> Dict[str, Any]:
+    """run_once의 비동기 버전 (한 이벤트 루프에서 여러 질문을 동시에 처리할 때)"""
+    app = get_compiled_graph()
+    initial: RAGState = {"question": question, "collection_name": collection_name, "k": k}
+    return _to_result(await app.ainvoke(initial))
+
+
+def stream_once(
+    question: str, collection_name: str = "drug_info", k: int = 4
+) -> Iterator[Tuple[str, Any]]:
+    """
+    그래프를 실행하면서 generate 노드의 LLM 토큰이 나오는 즉시 ("token", 텍스트)로 넘기고,
+    끝나면 run_once와 같은 결과를 ("result", dict)로 넘긴다.
+    (캐시 적중/fallback처럼 LLM 생성이 없는 경로는 토큰 없이 result만 나온다)
+    """
+    app = get_compiled_graph()
+    initial: RAGState = {"question": question, "collection_name": collection_name, "k": k}
+    final_state: Dict[str, Any] = dict(initial)
+    for mode, payload in app.stream(initial, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            # guard 노드의 YES/NO 토큰은 답변이 아니므로 generate 노드 토큰만 내보낸다
+            if metadata.get("langgraph_node") == "generate" and isinstance(chunk.content, str) and chunk.content:
+                yield "token", chunk.content
+        else:
+            final_state = payload
+    yield "result", _to_result(final_state)
+
+
+async def astream_once(
+    question: str, collection_name: str = "drug_info", k: int = 4
+) -> AsyncIterator[Tuple[str, Any]]:
+    """stream_once의 비동기 버전"""
+    app = get_compiled_graph()
+    initial: RAGState = {"question": question, "collection_name": collection_name, "k": k}
+    final_state: Dict[str, Any] = dict(initial)
+    async for mode, payload in app.astream(initial, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "generate" and isinstance(chunk.content, str) and chunk.content:
+                yield "token", chunk.content
+        else:
+            final_state = payload
+    yield "result", _to_result(final_state)
+
+
+def _to_result(final_state: Dict[str, Any]) -> Dict[str, Any]:
+    """최종 상태를 응답 형태로 바꾸고, 측정값을 instrumentation.METRICS에 누적한다."""
+    timings = final_state.get("timings", {})
+    tokens = final_state.get("tokens", {})
+    context_tokens = final_state.get("context_tokens", {})
+    observe_run(final_state["question"], timings, tokens, context_tokens)
     return {
         "question": final_state["question"],
         "answer": final_state.get("answer", ""),
         "citations": final_state.get("citations", []),
         "in_domain": final_state.get("in_domain", False),
+        "cache_hit": final_state.get("cache_hit", False),
+        "timings": timings,
+        "tokens": tokens,
+        "context_tokens": context_tokens,
     }
 
 
-def run(collection_name: str = "drug_info", k: int = 4, exit_words: tuple[str, ...] = ("quit", "exit", "bye")) -> None:
-    """사용자가 종료 단어를 입력할 때까지 반복 실행하는 인터랙티브 루프"""
+def iter_batch_questions(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    배치 입력 파일에서 {"id": ..., "question": ...}를 한 줄씩 읽는다.
+    JSONL은 question 키, CSV는 question 또는 질문 컬럼을 쓰고 id가 없으면 줄 번호를 쓴다.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows: Iterable[Dict[str, Any]] = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            question = (row.get("question") or row.get("질문") or "").strip()
+            if question:
+                yield {"id": row["id"] if "id" in row else index, "question": question}
+
+
+def run_batch(
+    input_path: str,
+    output_path: Optional[str] = None,
+    collection_name: str = "drug_info",
+    k: int = 4,
+    concurrency: int = 8,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    입력 파일의 질문들을 동시에 최대 concurrency개씩 그래프(abatch)로 처리하고
+    끝나는 묶음마다 결과를 JSONL로 바로 쓴다 (output_path가 없으면 stdout).
+    묶음마다 질문 임베딩을 한 번의 배치 호출로 만들어 query_embedding으로 넘기므로 노드에서는 다시 임베딩하지 않는다.
+    """
+    chunk_size = chunk_size or max(concurrency * 4, 32)
+    return asyncio.run(_arun_batch(input_path, output_path, collection_name, k, concurrency, chunk_size))
+
+
+async def _arun_batch(
+    input_path: str,
+    output_path: Optional[str],
+    collection_name: str,
+    k: int,
+    concurrency: int,
+    chunk_size: int,
+) -> Dict[str, Any]:
+    app = get_compiled_graph()
+    vectorstore = get_vectorstore(collection_name, get_collection_models().get(collection_name))
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    timings: Dict[str, List[float]] = {}
+    total = errors = 0
+    started = time.perf_counter()
+    try:
+        rows = iter_batch_questions(input_path)
+        while chunk := list(islice(rows, chunk_size)):
+            questions = [row["question"] for row in chunk]
+            embeddings = await asyncio.to_thread(embed_queries, vectorstore.embedding_fn, questions)
+            states = await app.abatch(
+                [
+                    {"question": q, "collection_name": collection_name, "k": k, "query_embedding": emb}
+                    for q, emb in zip(questions, embeddings)
+                ],
+                config={"max_concurrency": concurrency},
+                return_exceptions=True,
+            )
+            for row, state in zip(chunk, states):
+                if isinstance(state, Exception):
+                    errors += 1
+                    record = {"id": row["id"], "question": row["question"], "error": repr(state)}
+                else:
+                    record = {"id": row["id"], **_to_result(state)}
+                    record.pop("timings")
+                    record.pop("tokens")
+                    for stage, ms in state.get("timings", {}).items():
+                        timings.setdefault(stage, []).append(ms)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            total += len(chunk)
+    finally:
+        if output_path:
+            out.close()
+        await vectorstore.aclose()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "questions": total,
+        "errors": errors,
+        "elapsed_sec": elapsed,
+        "questions_per_sec": total / elapsed if elapsed else 0.0,
+        "stages": {
+            stage: {"mean_ms": statistics.fmean(values), "p95_ms": percentile(values, 95)}
+            for stage, values in timings.items()
+        },
+    }
+
+
+def run(
+    collection_name: str = "drug_info",
+    k: int = 4,
+    exit_words: tuple[str, ...] = ("quit", "exit", "bye"),
+    show_timings: bool = False,
+) -> None:
+    """
+    사용자가 종료 단어를 입력할 때까지 반복 실행하는 인터랙티브 루프
+    show_timings가 True면 CITATIONS 아래에 노드/하위 단계별 소요시간과 토큰 수를 출력한다.
+    """
     app = get_compiled_graph()
     exit_words_lower = {word.lower() for word in exit_words}
     print(
@@ -245,12 +733,15 @@ def run(collection_name: str = "drug_info", k: int = 4, exit_words: tuple[str, .
             "k": k,
         }
         final_state = app.invoke(initial)
+        result = _to_result(final_state)
 
         answer = final_state.get("answer", "")
         citations = final_state.get("citations", [])
         in_domain = final_state.get("in_domain", False)
 
         print("\n=== IN_DOMAIN ===\n", in_domain)
+        if final_state.get("cache_hit"):
+            print("\n(의미 캐시에서 재사용한 답변입니다)")
         print("\n=== ANSWER ===\n")
         print(answer or "❗ 답변을 생성하지 못했습니다.")
         if citations:
@@ -267,19 +758,45 @@ def run(collection_name: str = "drug_info", k: int = 4, exit_words: tuple[str, .
                     print(f"   snippet: {snippet}")
         else:
             print("\n=== CITATIONS ===\n(없음)")
+        if show_timings:
+            print("\n=== TIMINGS ===")
+            print(format_timings(result["timings"], result["tokens"], result["context_tokens"]))
+            for name, stats in METRICS.source_stats().items():
+                print(f"{name}: " + " ".join(f"{key}={value:g}" for key, value in stats.items()))
 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--collection", default="drug_info", help="pgvector 컬렉션명")
     p.add_argument("--k", type=int, default=5, help="검색 상위 k")
+    p.add_argument("--batch-input", default=None, help="배치 모드: 질문 파일 (JSONL 또는 CSV)")
+    p.add_argument("--batch-output", default=None, help="배치 결과 JSONL 경로 (생략 시 stdout)")
+    p.add_argument("--concurrency", type=int, default=8, help="배치 모드 동시 실행 질문 수")
+    p.add_argument("--metrics-file", default=None, help="배치가 끝나면 누적 지표를 Prometheus 텍스트 포맷으로 저장")
+    p.add_argument("--show-timings", action="store_true", help="답변마다 단계별 소요시간/토큰 수 출력")
     return p.parse_args()
 
 
 def main():
     load_dotenv()
     args = parse_args()
-    run(args.collection, args.k)
+    if not args.batch_input:
+        run(args.collection, args.k, show_timings=args.show_timings)
+        return
+
+    warm_up_pipeline([args.collection])
+    report = run_batch(args.batch_input, args.batch_output, args.collection, args.k, args.concurrency)
+    print(
+        f"\n=== BATCH ({report['questions']} questions, errors={report['errors']}) ===\n"
+        f"elapsed={report['elapsed_sec']:.1f}s throughput={report['questions_per_sec']:.2f} q/s",
+        file=sys.stderr,
+    )
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<20} mean={stats['mean_ms']:.0f}ms p95={stats['p95_ms']:.0f}ms", file=sys.stderr)
+    if args.metrics_file:
+        # node_exporter textfile collector 등에서 그대로 읽을 수 있다
+        with open(args.metrics_file, "w", encoding="utf-8") as f:
+            f.write(METRICS.prometheus_text())
 
 
 if __name__ == "__main__":
@@ -1,7 +1,12 @@
 import argparse
-import math
+import hashlib
+import json
+import os
+import queue
+import threading
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence
+from itertools import chain, islice
+from typing import Iterable, Iterator, List
 
 import psycopg2
 from psycopg2 import sql
@@ -11,11 +16,18 @@ from langchain_core.runnables import RunnableLambda
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from tqdm import tqdm
 
-from custom_pgvector import CustomPGVector
+from answer_cache import SemanticAnswerCache
+from custom_pgvector import CustomPGVector, DEFAULT_DISTANCE, DISTANCE_OPS, INDEX_METHODS, WRITE_MODES
 from db_utils import make_conn_str
 from custom_loader import DrugCSVLoader
 from embedding_utils import get_embedding_model
 
+# writer 스레드에 더 이상 배치가 없음을 알리는 표식
+_END_OF_BATCHES = object()
+
+# section: (제품, 섹션)마다 청크 하나, 긴 섹션만 다시 분할 / recursive: 전체 문자열을 글자 수로 분할
+CHUNK_STRATEGIES = ("section", "recursive")
+
 
 @dataclass
 class IngestConfig:
@@ -26,6 +38,18 @@ class IngestConfig:
     chunk_overlap: int
     batch_size: int
     reset: bool
+    chunk_strategy: str = "section"
+    incremental: bool = False
+    write_mode: str = "copy"
+    writers: int = 2
+    queue_depth: int = 4
+    index_method: str = "hnsw"
+    index_distance: str = DEFAULT_DISTANCE
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    ivfflat_lists: int | None = None
+    index_only: bool = False
+    text_index: bool = True
 
 
 class CustomVectorIngestor:
@@ -39,11 +63,18 @@ class CustomVectorIngestor:
 
     def run(self) -> dict:
         """LangChain Runnable 파이프라인으로 전체 적재 과정을 실행한다."""
+        if self.config.index_only:
+            self._prepare_storage()
+            return self._build_text_index(self._build_index({"chunks": 0, "products": 0}))
+
         pipeline = (
             RunnableLambda(lambda _: self._prepare_storage())
             | RunnableLambda(lambda _: self._load_documents())
             | RunnableLambda(self._split_documents)
             | RunnableLambda(self._persist_documents)
+            | RunnableLambda(self._build_index)
+            | RunnableLambda(self._build_text_index)
+            | RunnableLambda(self._invalidate_answer_cache)
         )
         return pipeline.invoke(None)
 
@@ -56,7 +87,12 @@ class CustomVectorIngestor:
             conn_str=self.connection_str,
             embedding_fn=self.embedding_model,
             table=self.config.table_name,
+            distance=self.config.index_distance,
         )
+        self.vectorstore.ensure_schema()
+        if self.config.reset and self.config.index_method != "none":
+            # 빈 테이블에 대량 적재할 때는 인덱스 없이 넣고 마지막에 한 번에 빌드하는 편이 빠르다
+            self.vectorstore.drop_index()
 
     def _truncate_table(self) -> None:
         """재적재를 위해 테이블 내용을 비운다."""
@@ -69,29 +105,41 @@ class CustomVectorIngestor:
                 )
             conn.commit()
 
-    def _load_documents(self) -> List[Document]:
-        """CSV 파일을 Document 리스트로 변환한다."""
+    def _load_documents(self) -> Iterator[Document]:
+        """
+        CSV 파일을 chunk 단위로 읽어 Document를 하나씩 내보내는 이터레이터로 만든다.
+        전체 코퍼스를 메모리에 올리지 않고 분할/임베딩 단계로 바로 흘려보낸다.
+        """
         loader = DrugCSVLoader(self.config.csv_path)
-        documents = loader.load()
-        if not documents:
+        if self.config.chunk_strategy == "section":
+            documents = loader.lazy_load_sections()
+        else:
+            documents = loader.lazy_load()
+        first = next(documents, None)
+        if first is None:
             raise RuntimeError("적재할 Document가 없습니다. CSV 내용을 확인하세요.")
-        return documents
-
-    def batched(self, items: Sequence[Document], batch_size: int) -> Iterable[Sequence[Document]]:
-        """Sequence를 batch_size 단위로 분할한다."""
-        total = len(items)
-        for start in range(0, total, batch_size):
-            end = min(start + batch_size, total)
-            yield items[start:end]
-
-    def _split_documents(self, documents: List[Document]) -> List[Document]:
-        """Document를 RecursiveCharacterTextSplitter로 청크 단위로 나눈다."""
-        chunk_docs: List[Document] = []
+        return chain([first], documents)
+
+    def batched(self, items: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+        """Iterable을 batch_size 단위로 분할한다."""
+        iterator = iter(items)
+        while batch := list(islice(iterator, batch_size)):
+            yield batch
+
+    def _split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Document를 RecursiveCharacterTextSplitter로 청크 단위로 나눈다. (소비하는 쪽이 당길 때 분할)"""
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.config.chunk_size,
             chunk_overlap=self.config.chunk_overlap,
             separators=["\n\n", "\n", ". ", " ", ""],
+            # section 방식은 문장 끝 구분자를 앞 조각에 붙여 조각이 ". "로 시작하지 않게 한다
+            keep_separator="end" if self.config.chunk_strategy == "section" else True,
         )
+        if self.config.chunk_strategy == "section":
+            return self._iter_section_chunks(documents)
+        return self._iter_chunks(documents)
+
+    def _iter_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
         for doc in documents:
             chunks = self.splitter.split_text(doc.page_content)
             for chunk_idx, chunk_text in enumerate(chunks):
@@ -100,34 +148,228 @@ class CustomVectorIngestor:
                     continue
                 metadata = dict(doc.metadata)
                 metadata["chunk_index"] = chunk_idx
-                chunk_docs.append(Document(page_content=chunk_clean, metadata=metadata))
-        return chunk_docs
+                metadata["content_hash"] = self.chunk_hash(metadata, chunk_clean)
+                yield Document(page_content=chunk_clean, metadata=metadata)
+
+    def _iter_section_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        섹션 Document는 chunk_size 이하면 그대로 청크 하나로 쓰고, 넘는 섹션만 본문을 다시 나눈다.
+        나눈 조각마다 "제품명: X | 섹션: " 머리말을 다시 붙여 어느 제품의 어느 섹션인지 잃지 않게 한다.
+        chunk_index는 같은 행(제품)·섹션 안에서 이어지는 번호라서, 한 섹션의 청크 수가 바뀌어도
+        다른 섹션 청크의 chunk_index/content_hash는 그대로다 (증분 적재 시 바뀐 섹션만 다시 쓴다).
+        """
+        last_key = None
+        chunk_idx = 0
+        for doc in documents:
+            key = (doc.metadata.get("row_index"), doc.metadata.get("section"))
+            if key != last_key:
+                last_key, chunk_idx = key, 0
+
+            content = doc.page_content.strip()
+            if len(content) <= self.config.chunk_size:
+                pieces = [content]
+            else:
+                header = DrugCSVLoader.section_header(
+                    doc.metadata.get("product_name") or doc.metadata.get("제품명") or "",
+                    doc.metadata.get("section", ""),
+                )
+                body = doc.page_content[len(header):] if doc.page_content.startswith(header) else content
+                pieces = [header + piece.strip() for piece in self.splitter.split_text(body) if piece.strip()]
+
+            for piece in pieces:
+                metadata = dict(doc.metadata)
+                metadata["chunk_index"] = chunk_idx
+                metadata["content_hash"] = self.chunk_hash(metadata, piece)
+                chunk_idx += 1
+                yield Document(page_content=piece, metadata=metadata)
+
+    @staticmethod
+    def chunk_hash(metadata: dict, content: str) -> str:
+        """제품명, row_index, (섹션,) chunk_index, 본문으로 청크를 식별하는 해시"""
+        key = [
+            metadata.get("product_name") or metadata.get("제품명"),
+            metadata.get("row_index"),
+            metadata.get("chunk_index"),
+            content,
+        ]
+        if metadata.get("section"):
+            # chunk_index가 섹션마다 0부터 시작하므로 섹션까지 있어야 청크가 구분된다
+            key.insert(2, metadata["section"])
+        return hashlib.sha1(json.dumps(key, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+    def _persist_documents(self, documents: Iterable[Document]) -> dict:
+        """적재 모드에 따라 전체 저장 또는 증분 동기화를 수행한다."""
+        if self.config.incremental:
+            return self._persist_incremental(documents)
+        return self._write_documents(documents)
+
+    def _persist_incremental(self, documents: Iterable[Document]) -> dict:
+        """
+        content_hash 기준으로 테이블을 CSV와 맞춘다.
+        - 이미 저장된 청크는 건너뛰고 새로 생기거나 바뀐 청크만 임베딩해서 저장
+        - CSV에서 사라진(삭제/변경된) 청크, 해시 없이 저장된 예전 행, 중복 행은 삭제
+        """
+        existing = self.vectorstore.fetch_content_hashes()
+        current: set = set()
+        products: set = set()
+
+        def _pending() -> Iterator[Document]:
+            # 해시만 모아 두고 새 청크는 바로 쓰기 단계로 넘긴다
+            for doc in documents:
+                products.add(doc.metadata.get("product_name") or doc.metadata.get("제품명"))
+                content_hash = doc.metadata["content_hash"]
+                if content_hash in current:
+                    continue
+                current.add(content_hash)
+                if content_hash not in existing:
+                    yield doc
 
-    def _persist_documents(self, documents: List[Document]) -> dict:
-        """청크 Document를 CustomPGVector 테이블에 저장한다."""
+        stats = self._write_documents(_pending())
+
+        # 새 청크를 먼저 넣고 낡은 청크를 지워 검색 결과가 비는 순간이 없게 한다
+        stale = [h for h in existing if h is not None and h not in current]
+        deleted = self.vectorstore.delete_content_hashes(stale, include_unhashed=None in existing)
+        if any(count > 1 for h, count in existing.items() if h is not None):
+            deleted += self.vectorstore.delete_duplicate_hashes()
+
+        products.discard(None)
+        return {
+            **stats,
+            "products": len(products),
+            "skipped": len(current) - stats["chunks"],
+            "deleted": deleted,
+        }
+
+    def _write_documents(self, documents: Iterable[Document]) -> dict:
+        """
+        청크 Document를 CustomPGVector 테이블에 저장한다.
+        임베딩 단계(현재 스레드)와 DB 쓰기 단계(writer 스레드들)를 제한된 큐로 연결해
+        임베딩과 DB 왕복이 겹쳐서 진행되도록 한다. documents는 이터레이터여도 되며,
+        메모리는 읽는 중인 CSV chunk와 queue_depth 배치만큼만 사용한다.
+        """
         if self.vectorstore is None:
             raise RuntimeError("VectorStore가 초기화되지 않았습니다.")
 
-        total_chunks = len(documents)
-        total_batches = math.ceil(total_chunks / self.config.batch_size) if total_chunks else 0
-        products = {
-            doc.metadata.get("product_name") or doc.metadata.get("제품명")
-            for doc in documents
-        }
-        products.discard(None)
+        total_chunks = 0
+        products: set = set()
 
-        if not total_chunks:
-            return {"chunks": 0, "products": len(products)}
+        batches: queue.Queue = queue.Queue(maxsize=max(1, self.config.queue_depth))
+        failed = threading.Event()
+        errors: List[BaseException] = []
+        progress_lock = threading.Lock()
 
-        with tqdm(total=total_batches, desc="Uploading chunks") as progress:
+        # 전체 청크 수는 끝까지 읽어야 알 수 있으므로 진행 개수만 표시
+        embed_bar = tqdm(desc="Embedding", unit="chunk", position=0)
+        write_bar = tqdm(desc="Uploading", unit="chunk", position=1)
+
+        def _writer() -> None:
+            while True:
+                item = batches.get()
+                try:
+                    if item is _END_OF_BATCHES:
+                        return
+                    if failed.is_set():
+                        continue  # 실패 후에는 큐만 비워 producer가 막히지 않게 한다
+                    texts, metadatas, embeddings = item
+                    self.vectorstore.add_texts(
+                        texts,
+                        metadatas=metadatas,
+                        embeddings=embeddings,
+                        mode=self.config.write_mode,
+                    )
+                    with progress_lock:
+                        write_bar.update(len(texts))
+                except BaseException as exc:
+                    errors.append(exc)
+                    failed.set()
+                finally:
+                    batches.task_done()
+
+        writers = [
+            threading.Thread(target=_writer, name=f"ingest-writer-{idx}", daemon=True)
+            for idx in range(max(1, self.config.writers))
+        ]
+        for writer in writers:
+            writer.start()
+
+        try:
             for batch in self.batched(documents, self.config.batch_size):
+                if failed.is_set():
+                    break
                 texts = [doc.page_content for doc in batch]
                 metadatas = [doc.metadata for doc in batch]
-                self.vectorstore.add_texts(texts, metadatas=metadatas)
-                progress.update(1)
+                total_chunks += len(batch)
+                products.update(meta.get("product_name") or meta.get("제품명") for meta in metadatas)
+                embeddings = self.embedding_model.embed_documents(texts)
+                embed_bar.update(len(texts))
+                # 큐가 늘 가득 차 있으면 DB 쓰기가, 늘 비어 있으면 임베딩이 병목
+                embed_bar.set_postfix(queue=f"{batches.qsize()}/{batches.maxsize}")
+                batches.put((texts, metadatas, embeddings))
+        finally:
+            for _ in writers:
+                batches.put(_END_OF_BATCHES)
+            for writer in writers:
+                writer.join()
+            embed_bar.close()
+            write_bar.close()
 
+        if errors:
+            raise errors[0]
+        products.discard(None)
         return {"chunks": total_chunks, "products": len(products)}
 
+    def _invalidate_answer_cache(self, stats: dict) -> dict:
+        """컬렉션 내용이 바뀌었으면 예전 근거로 만든 의미 캐시 답변을 비운다."""
+        if not (stats.get("chunks") or stats.get("deleted") or self.config.reset):
+            return stats
+        cache = SemanticAnswerCache(
+            self.connection_str,
+            table=os.getenv("ANSWER_CACHE_TABLE", "rag_answer_cache"),
+        )
+        try:
+            invalidated = cache.invalidate(self.config.table_name)
+        finally:
+            cache.close()
+        return {**stats, "cache_invalidated": invalidated}
+
+    def _build_index(self, stats: dict) -> dict:
+        """적재가 끝난 뒤 ANN 인덱스를 (재)생성하고 빌드 진행률을 tqdm으로 보여준다."""
+        if self.config.index_method == "none":
+            return stats
+        if not (self.config.reset or self.config.index_only):
+            # HNSW는 새 행을 바로 반영하므로 같은 방식·같은 distance의 인덱스가 있으면 다시 만들지 않는다
+            existing = self.vectorstore.describe_index(refresh=True)
+            if (
+                existing
+                and existing["method"] == self.config.index_method
+                and existing["opclass"] == DISTANCE_OPS[self.config.index_distance][1]
+            ):
+                return stats
+
+        with tqdm(total=0, desc=f"Building {self.config.index_method} index") as progress:
+            def _report(phase: str, done: int, total: int) -> None:
+                if total and progress.total != total:
+                    progress.reset(total=total)
+                progress.set_postfix_str(phase)
+                progress.n = done
+                progress.refresh()
+
+            info = self.vectorstore.create_index(
+                self.config.index_method,
+                self.config.index_distance,
+                m=self.config.hnsw_m,
+                ef_construction=self.config.hnsw_ef_construction,
+                lists=self.config.ivfflat_lists,
+                progress_callback=_report,
+            )
+        return {**stats, "index": info}
+
+    def _build_text_index(self, stats: dict) -> dict:
+        """하이브리드 검색용 content 트라이그램 인덱스 (이미 있으면 그대로 둔다)"""
+        if not self.config.text_index:
+            return stats
+        return {**stats, "text_index": self.vectorstore.ensure_text_index()}
+
 
 def parse_args() -> IngestConfig:
     parser = argparse.ArgumentParser(description="CSV 문서를 CustomPGVector 테이블에 적재합니다.")
@@ -151,7 +393,13 @@ def parse_args() -> IngestConfig:
         "--chunk-overlap",
         type=int,
         default=300,
-        help="청크 간 겹치는 토큰 수",
+        help="청크 간 겹치는 글자 수 (section 방식에서는 chunk_size를 넘는 섹션을 나눌 때만 사용)",
+    )
+    parser.add_argument(
+        "--chunk-strategy",
+        choices=list(CHUNK_STRATEGIES),
+        default="section",
+        help="청크 분할 방식 (section: 제품×섹션 단위, 긴 섹션만 재분할 / recursive: 전체 문자열을 글자 수로 분할)",
     )
     parser.add_argument(
         "--batch-size",
@@ -159,11 +407,76 @@ def parse_args() -> IngestConfig:
         default=64,
         help="DB 적재 시 배치 크기",
     )
-    parser.add_argument(
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
         "--reset",
         action="store_true",
         help="기존 데이터를 제거하고 다시 적재",
     )
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="content_hash 기준으로 바뀐 청크만 임베딩하고 사라진 청크는 삭제",
+    )
+    parser.add_argument(
+        "--write-mode",
+        choices=list(WRITE_MODES),
+        default="copy",
+        help="DB 쓰기 방식 (copy: 바이너리 COPY, values: 다중행 INSERT, row: 행 단위 INSERT)",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=2,
+        help="DB 쓰기 스레드 수 (스레드마다 풀에서 커넥션을 하나씩 사용)",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=4,
+        help="임베딩이 끝나고 쓰기를 기다릴 수 있는 최대 배치 수",
+    )
+    parser.add_argument(
+        "--index",
+        choices=[*INDEX_METHODS, "none"],
+        default="hnsw",
+        help="적재 후 생성할 ANN 인덱스 방식 (none이면 생성하지 않음)",
+    )
+    parser.add_argument(
+        "--index-distance",
+        choices=list(DISTANCE_OPS),
+        default=DEFAULT_DISTANCE,
+        help="인덱스/검색에 사용할 거리 함수",
+    )
+    parser.add_argument(
+        "--hnsw-m",
+        type=int,
+        default=16,
+        help="HNSW 그래프의 이웃 수(m)",
+    )
+    parser.add_argument(
+        "--hnsw-ef-construction",
+        type=int,
+        default=64,
+        help="HNSW 빌드 시 후보 리스트 크기(ef_construction)",
+    )
+    parser.add_argument(
+        "--ivfflat-lists",
+        type=int,
+        default=None,
+        help="IVFFlat 리스트 수 (미지정 시 행 수 기준 자동 결정)",
+    )
+    parser.add_argument(
+        "--no-text-index",
+        dest="text_index",
+        action="store_false",
+        help="하이브리드 검색용 content 트라이그램(pg_trgm) 인덱스를 만들지 않음",
+    )
+    parser.add_argument(
+        "--index-only",
+        action="store_true",
+        help="데이터 적재 없이 인덱스만 다시 생성",
+    )
     args = parser.parse_args()
     return IngestConfig(
         csv_path=args.csv,
@@ -172,6 +485,18 @@ def parse_args() -> IngestConfig:
         chunk_overlap=args.chunk_overlap,
         batch_size=args.batch_size,
         reset=args.reset,
+        chunk_strategy=args.chunk_strategy,
+        incremental=args.incremental,
+        write_mode=args.write_mode,
+        writers=args.writers,
+        queue_depth=args.queue_depth,
+        index_method=args.index,
+        index_distance=args.index_distance,
+        hnsw_m=args.hnsw_m,
+        hnsw_ef_construction=args.hnsw_ef_construction,
+        ivfflat_lists=args.ivfflat_lists,
+        index_only=args.index_only,
+        text_index=args.text_index,
     )
 
 
@@ -184,6 +509,22 @@ def main() -> None:
         f"✅ Done. Inserted {stats['chunks']} chunks "
         f"from {stats['products']} products into table '{config.table_name}'."
     )
+    if config.incremental:
+        print(f"✅ Skipped {stats['skipped']} unchanged chunks, deleted {stats['deleted']} stale rows.")
+    if hasattr(ingestor.embedding_model, "stats"):
+        cache = ingestor.embedding_model.stats()
+        print(
+            f"✅ Embedding cache: hit_rate={cache['hit_rate']:.1%} "
+            f"(memory={cache['memory_hits']}, disk={cache['disk_hits']}, miss={cache['misses']})"
+        )
+    if stats.get("text_index") is False:
+        print("⚠️ pg_trgm 확장을 사용할 수 없어 content 트라이그램 인덱스를 만들지 못했습니다. (하이브리드 검색은 인덱스 없이 동작)")
+    index = stats.get("index")
+    if index:
+        print(
+            f"✅ Built {index['method']} index '{index['name']}' ({index['opclass']}) "
+            f"in {index['build_seconds']:.1f}s."
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger("rag.metrics")
+
+# 노드 하나가 실행되는 동안 하위 단계(embed/sql/llm) 측정값을 모으는 곳 (노드 밖이면 None)
+_CURRENT: ContextVar[Optional["NodeMetrics"]] = ContextVar("rag_node_metrics", default=None)
+
+# Prometheus summary 분위수 계산에 쓸 최근 표본 수
+SAMPLE_WINDOW = int(os.getenv("RAG_METRICS_WINDOW", "1024"))
+QUANTILES: Tuple[float, ...] = (0.5, 0.95, 0.99)
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """선형 보간 백분위수 (pct: 0~100, 값이 없으면 0.0)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class NodeMetrics:
+    """노드 실행 중 쌓이는 하위 단계 소요시간(ms)과 LLM 토큰 수"""
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {}
+
+    def add_time(self, name: str, ms: float) -> None:
+        # 같은 단계가 여러 번 불리면(필터를 풀어 재검색 등) 합산한다
+        self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def add_tokens(self, name: str, count: int) -> None:
+        self.tokens[name] = self.tokens.get(name, 0) + count
+
+
+@contextmanager
+def collect() -> Iterator[NodeMetrics]:
+    """블록 안에서 step()/LLM 콜백이 기록한 값을 모은다 (timed_node가 노드마다 사용)"""
+    metrics = NodeMetrics()
+    token = _CURRENT.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def step(name: str) -> Iterator[None]:
+    """하위 단계 소요시간을 현재 노드 측정값에 더한다 (노드 밖에서 불리면 아무것도 하지 않는다)"""
+    metrics = _CURRENT.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(name, (time.perf_counter() - started) * 1000)
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """
+    LLM 호출 시간, 첫 토큰까지의 시간(TTFT, 스트리밍일 때만), prompt/completion 토큰 수를
+    현재 노드 측정값에 기록하는 콜백. 토큰 수는 usage_metadata 또는 Ollama의
+    prompt_eval_count/eval_count에서 읽는다.
+    """
+
+    # 비동기 실행에서도 호출한 노드의 컨텍스트에서 바로 실행되도록 한다
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._started: Dict[UUID, Tuple[float, Optional[NodeMetrics]]] = {}
+        self._first_token: set = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = (time.perf_counter(), _CURRENT.get())
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = (time.perf_counter(), _CURRENT.get())
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._first_token or run_id not in self._started:
+            return
+        self._first_token.add(run_id)
+        started, metrics = self._started[run_id]
+        if metrics is not None:
+            metrics.add_time("ttft", (time.perf_counter() - started) * 1000)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._first_token.discard(run_id)
+        started, metrics = self._started.pop(run_id, (None, None))
+        if metrics is None:
+            return
+        metrics.add_time("llm", (time.perf_counter() - started) * 1000)
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens:
+            metrics.add_tokens("prompt", prompt_tokens)
+        if completion_tokens:
+            metrics.add_tokens("completion", completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._first_token.discard(run_id)
+        self._started.pop(run_id, None)
+
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                continue
+            info = generation.generation_info or {}
+            prompt_tokens += int(info.get("prompt_eval_count") or 0)
+            completion_tokens += int(info.get("eval_count") or 0)
+    return prompt_tokens, completion_tokens
+
+
+class MetricsRegistry:
+    """질문 단위 측정값을 누적해 Prometheus 텍스트 포맷으로 내보내는 프로세스 공용 집계기"""
+
+    def __init__(self, window: int = SAMPLE_WINDOW) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._sums: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._tokens: Dict[str, int] = {}
+        self._context_tokens: Dict[str, int] = {}
+        self._sources: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self.runs = 0
+
+    def add_source(self, name: str, stats: Callable[[], Dict[str, float]]) -> None:
+        """
+        질문 단위가 아닌 컴포넌트 지표(예: 의미 캐시 적중 수)를 등록한다.
+        내보낼 때마다 stats()를 불러 rag_{name}_{항목} gauge로 출력한다.
+        """
+        with self._lock:
+            self._sources[name] = stats
+
+    def source_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            sources = dict(self._sources)
+        return {name: stats() for name, stats in sources.items()}
+
+    def observe(
+        self,
+        timings: Dict[str, float],
+        tokens: Dict[str, int],
+        context_tokens: Optional[Dict[str, int]] = None,
+    ) -> None:
+        with self._lock:
+            self.runs += 1
+            for stage, ms in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=self.window)).append(ms)
+                self._sums[stage] = self._sums.get(stage, 0.0) + ms
+                self._counts[stage] = self._counts.get(stage, 0) + 1
+            for name, count in tokens.items():
+                self._tokens[name] = self._tokens.get(name, 0) + count
+            for kind in ("before", "after", "saved"):
+                if context_tokens and kind in context_tokens:
+                    self._context_tokens[kind] = self._context_tokens.get(kind, 0) + context_tokens[kind]
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP rag_runs_total 처리한 질문 수",
+            "# TYPE rag_runs_total counter",
+        ]
+        with self._lock:
+            lines.append(f"rag_runs_total {self.runs}")
+            lines += [
+                "# HELP rag_stage_latency_ms 노드/하위 단계별 소요시간 (ms)",
+                "# TYPE rag_stage_latency_ms summary",
+            ]
+            for stage in sorted(self._samples):
+                for q in QUANTILES:
+                    value = percentile(self._samples[stage], q * 100)
+                    lines.append(f'rag_stage_latency_ms{{stage="{stage}",quantile="{q}"}} {value:.3f}')
+                lines.append(f'rag_stage_latency_ms_sum{{stage="{stage}"}} {self._sums[stage]:.3f}')
+                lines.append(f'rag_stage_latency_ms_count{{stage="{stage}"}} {self._counts[stage]}')
+            lines += [
+                "# HELP rag_llm_tokens_total 노드별 LLM 토큰 수",
+                "# TYPE rag_llm_tokens_total counter",
+            ]
+            for name in sorted(self._tokens):
+                node, _, kind = name.rpartition(".")
+                lines.append(f'rag_llm_tokens_total{{node="{node}",kind="{kind}"}} {self._tokens[name]}')
+            lines += [
+                "# HELP rag_context_tokens_total 생성 CONTEXT 추정 토큰 수 (before: 청크 그대로, after: 예산 적용 후)",
+                "# TYPE rag_context_tokens_total counter",
+            ]
+            for kind, count in self._context_tokens.items():
+                lines.append(f'rag_context_tokens_total{{kind="{kind}"}} {count}')
+        for name, stats in self.source_stats().items():
+            for key, value in stats.items():
+                lines.append(f"# TYPE rag_{name}_{key} gauge")
+                lines.append(f"rag_{name}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def observe_run(
+    question: str,
+    timings: Dict[str, float],
+    tokens: Dict[str, int],
+    context_tokens: Optional[Dict[str, int]] = None,
+) -> None:
+    """질문 하나의 측정값을 METRICS에 더하고, RAG_METRICS_LOG=true면 JSON 한 줄로 로그를 남긴다."""
+    METRICS.observe(timings, tokens, context_tokens)
+    if os.getenv("RAG_METRICS_LOG", "false").lower() == "true":
+        logger.info(
+            json.dumps(
+                {
+                    "event": "rag_run",
+                    "question": question,
+                    "timings_ms": timings,
+                    "tokens": tokens,
+                    "context_tokens": context_tokens or {},
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+def format_timings(
+    timings: Dict[str, float],
+    tokens: Dict[str, int],
+    context_tokens: Optional[Dict[str, int]] = None,
+) -> str:
+    """CLI 출력용: 노드별 소요시간 아래에 하위 단계와 토큰 수를 들여써서 보여준다."""
+    lines = []
+    for stage, ms in timings.items():
+        indent = "   " if "." in stage else ""
+        lines.append(f"{indent}{stage}: {ms:.1f}ms")
+    for name, count in tokens.items():
+        lines.append(f"   {name}_tokens: {count}")
+    if context_tokens:
+        lines.append(
+            f"context_tokens: {context_tokens['before']} -> {context_tokens['after']} "
+            f"(saved {context_tokens['saved']}, dropped_sentences={context_tokens['dropped_sentences']})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,36 @@
+# MINIPROJ3/app/screen/debug.py
+import os
+
+import streamlit as st
+
+from instrumentation import METRICS
+
+
+def debug_panel_enabled() -> bool:
+    """RAG_DEBUG_PANEL=true일 때만 디버그 패널을 보여준다."""
+    return os.getenv("RAG_DEBUG_PANEL", "false").lower() == "true"
+
+
+def render_debug_panel():
+    """마지막 질문의 노드/하위 단계별 소요시간과 LLM 토큰 수, 누적 Prometheus 지표를 보여준다."""
+    if not debug_panel_enabled():
+        return
+
+    metrics = st.session_state.get("last_metrics")
+    with st.expander("⏱️ 디버그: 단계별 소요시간 / 토큰", expanded=False):
+        if not metrics:
+            st.caption("아직 측정된 질문이 없습니다.")
+            return
+
+        st.table(
+            [{"단계": stage, "소요시간(ms)": round(ms, 1)} for stage, ms in metrics["timings"].items()]
+        )
+        if metrics["tokens"]:
+            st.table([{"노드.종류": name, "토큰 수": count} for name, count in metrics["tokens"].items()])
+        context_tokens = metrics.get("context_tokens")
+        if context_tokens:
+            st.caption(
+                f"CONTEXT 추정 토큰 {context_tokens['before']} → {context_tokens['after']} "
+                f"({context_tokens['saved']} 절약, 중복 문장 {context_tokens['dropped_sentences']}개 제거)"
+            )
+        st.code(METRICS.prometheus_text(), language="text")
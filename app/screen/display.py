@@ -1,13 +1,38 @@
+import os
+from collections.abc import Iterable, Iterator
+
 import streamlit as st
-from collections.abc import Iterable
+
+# 스트리밍 중 화면을 다시 그리는 간격(토큰 수). 토큰마다 전체 답변을 다시 그리면 답변 길이의 제곱만큼 일한다
+STREAM_RENDER_EVERY = int(os.getenv("STREAM_RENDER_EVERY", "8"))
+
+
+def throttled_stream(generator: Iterable, every: int = STREAM_RENDER_EVERY) -> Iterator[str]:
+    """
+    토큰 스트림을 누적 버퍼에 이어 붙여 지금까지의 전체 문자열을 내보낸다.
+    첫 토큰은 바로 내보내 첫 글자가 LLM의 첫 토큰과 함께 보이게 하고, 그 뒤로는 every개마다, 마지막에 남은 토큰을 한 번 더 내보낸다.
+    마지막으로 내보낸 값이 최종 답변이다 (토큰이 없으면 아무것도 내보내지 않는다).
+    """
+    buffer = ""
+    pending = []
+    first = True
+    for part in generator:
+        pending.append(str(part))
+        if first or len(pending) >= max(1, every):
+            first = False
+            buffer += "".join(pending)
+            pending.clear()
+            yield buffer
+    if pending:
+        yield buffer + "".join(pending)
+
 
 def _stream_to_placeholder(generator: Iterable) -> str:
     placeholder = st.empty()
-    chunks = []
-    for part in generator:
-        chunks.append(str(part))
-        placeholder.markdown("".join(chunks))
-    return "".join(chunks)
+    text = ""
+    for text in throttled_stream(generator):
+        placeholder.markdown(text)
+    return text
 
 def print_message(role: str, content_or_gen):
     """
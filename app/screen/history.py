@@ -1,5 +1,8 @@
 # MINIPROJ3/app/screen/history.py
 import html
+import os
+from functools import lru_cache
+
 import streamlit as st
 from streamlit.components.v1 import html as html_component
 from .constant import ROLE_TYPE
@@ -8,6 +11,9 @@ from .constant import ROLE_TYPE
 def _ensure():
     if "history" not in st.session_state:
         st.session_state.history = []
+    if "history_html" not in st.session_state:
+        # 완료된 메시지의 렌더링 결과 캐시 (history와 같은 순서)
+        st.session_state.history_html = []
 
 
 def ensure_initial_greeting(message: str):
@@ -20,6 +26,8 @@ def ensure_initial_greeting(message: str):
 
 def clear_history():
     st.session_state.history = []
+    st.session_state.history_html = []
+    st.session_state.pop("history_body", None)
 
 
 def add_history(role: ROLE_TYPE, content: str):
@@ -27,11 +35,14 @@ def add_history(role: ROLE_TYPE, content: str):
     st.session_state.history.append({"role": role.value, "content": content})
 
 
-def _build_chat_box_html(height: str, extra_html: str = "") -> str:
-    """히스토리 + (옵션)추가 말풍선(extra_html)을 포함한 채팅박스 HTML 생성"""
-    _ensure()
+def _history_window() -> int:
+    """채팅박스에 그릴 최근 메시지 수 (CHAT_HISTORY_WINDOW, 0이면 전체)"""
+    return int(os.getenv("CHAT_HISTORY_WINDOW", "50"))
 
-    style = f"""
+
+@lru_cache(maxsize=8)
+def _chat_box_style(height: str) -> str:
+    return f"""
     <style>
     .chat-box {{
         height: {height};
@@ -53,17 +64,13 @@ def _build_chat_box_html(height: str, extra_html: str = "") -> str:
     .msg.user::before {{ content: "🧑‍💬"; }}
     .msg.assistant::before {{ content: "🧪"; }}
     .msg .content {{ white-space: pre-wrap; line-height: 1.5; }}
+    .chat-box .hidden-note {{ text-align: center; color: #999; font-size: 0.8rem; margin: 4px 0; }}
     </style>
     """
 
-    items = []
-    for m in st.session_state.history:
-        role = "user" if m["role"] == "user" else "assistant"
-        content = html.escape(m["content"] or "").replace("\n", "<br>")
-        items.append(f'<div class="msg {role}"><div class="content">{content}</div></div>')
 
-    # 자동 스크롤 (렌더 직후 & 약간 지연 두 번 보장)
-    autoscroll_js = """
+# 자동 스크롤 (렌더 직후 & 약간 지연 두 번 보장)
+_AUTOSCROLL_JS = """
     <script>
         function scrollBottom(){
             const box = window.parent.document.querySelector('.chat-box');
@@ -74,23 +81,61 @@ def _build_chat_box_html(height: str, extra_html: str = "") -> str:
     </script>
     """
 
-    body = "".join(items) + (extra_html or "")
-    return style + f'<div class="chat-box">{body}</div>' + autoscroll_js
+
+def _message_html(message: dict) -> str:
+    role = "user" if message["role"] == "user" else "assistant"
+    content = html.escape(message["content"] or "").replace("\n", "<br>")
+    return f'<div class="msg {role}"><div class="content">{content}</div></div>'
+
+
+def _history_body(window: int) -> str:
+    """
+    완료된 메시지들의 HTML. 새로 추가된 메시지만 렌더링해 캐시에 붙이고,
+    window개를 넘는 오래된 메시지는 숨김 안내 한 줄로 대체한다.
+    """
+    _ensure()
+    history = st.session_state.history
+    rendered = st.session_state.history_html
+    if len(rendered) > len(history):  # 히스토리가 밖에서 줄어든 경우
+        del rendered[len(history):]
+    for message in history[len(rendered):]:
+        rendered.append(_message_html(message))
+
+    hidden = max(0, len(rendered) - window) if window > 0 else 0
+    key = (len(rendered), hidden)
+    cached = st.session_state.get("history_body")
+    if cached and cached[0] == key:
+        return cached[1]
+
+    note = f'<div class="hidden-note">이전 메시지 {hidden}개는 생략되었습니다</div>' if hidden else ""
+    body = note + "".join(rendered[hidden:])
+    st.session_state.history_body = (key, body)
+    return body
+
+
+def _build_chat_box_html(height: str, extra_html: str = "", window: int | None = None) -> str:
+    """히스토리 + (옵션)추가 말풍선(extra_html)을 포함한 채팅박스 HTML 생성"""
+    if window is None:
+        window = _history_window()
+    body = _history_body(window) + (extra_html or "")
+    return _chat_box_style(height) + f'<div class="chat-box">{body}</div>' + _AUTOSCROLL_JS
 
 
-def render_chat_box(height: str = "60vh", typing_html: str | None = None):
+def render_chat_box(height: str = "60vh", typing_html: str | None = None, window: int | None = None):
     """
     채팅박스를 하나의 placeholder에 렌더링한다.
     - typing_html이 주어지면 히스토리 아래에 임시 말풍선을 함께 표시
+    - window: 그릴 최근 메시지 수 (기본값 CHAT_HISTORY_WINDOW, 0이면 전체)
     - 반환값: update 함수 (typing/최종 답변 후 재렌더링용)
+      완료된 메시지 HTML은 캐시를 재사용하므로 스트리밍 중에는 진행 중인 말풍선만 새로 만든다.
     """
     placeholder = st.empty()
-    html_block = _build_chat_box_html(height, extra_html=(typing_html or ""))
+    html_block = _build_chat_box_html(height, extra_html=(typing_html or ""), window=window)
     placeholder.markdown(html_block, unsafe_allow_html=True)
 
     def update(new_typing_html: str | None = None):
         placeholder.markdown(
-            _build_chat_box_html(height, extra_html=(new_typing_html or "")),
+            _build_chat_box_html(height, extra_html=(new_typing_html or ""), window=window),
             unsafe_allow_html=True,
         )
 
@@ -1,23 +1,9 @@
-import os
 import time
-import json
-import pandas as pd
 import streamlit as st
 from collections import defaultdict
 from datetime import datetime, timedelta
 
-# =========================================================
-# 🔧 데이터 소스 설정 (있으면 DB→CSV→목업 순으로 로드)
-DB_TABLE = os.getenv("DRUG_TABLE", "drug_info")
-DB_NAME_COL = os.getenv("DRUG_NAME_COL", "product_name")
-DB_INGR_COL = os.getenv("DRUG_INGR_COL", "ingredient")
-DB_SYNONYM_COLS = json.loads(os.getenv("DRUG_SYNONYM_COLS", '["brand_name","generic_name","korean_name","english_name"]'))
-
-CSV_PATH = os.getenv("DRUG_CSV", "./data/drug_info_preprocessed.csv")
-CSV_NAME_COL = os.getenv("CSV_NAME_COL", "제품명")
-CSV_INGR_COL = os.getenv("CSV_INGR_COL", "성분명")
-CSV_SYNONYM_COLS = json.loads(os.getenv("CSV_SYNONYM_COLS", '["제품명영문","브랜드명","일반명"]'))
-# =========================================================
+import drug_synonyms
 
 POS_TRIGGERS = ["복용 중", "먹고 있어", "먹고있어", "처방받", "처방 받", "지어줬", "지어 줬", "먹는 중", "먹습니다", "먹어요"]
 NEG_TRIGGERS = ["중단", "끊었", "안 먹", "안먹", "먹지 않", "안먹을", "그만 먹"]
@@ -48,118 +34,6 @@ def _normalize(text: str) -> str:
     return (text or "").strip().lower()
 
 
-def _split_multi(value: str):
-    if value is None:
-        return []
-    txt = str(value)
-    for sep in [";", "/", "|"]:
-        txt = txt.replace(sep, ",")
-    parts = [p.strip() for p in txt.split(",") if p.strip()]
-    return parts
-
-
-@st.cache_resource(show_spinner=False)
-def load_drug_synonyms() -> dict:
-    """
-    alias(lower) -> (display_name, main_ingredient)
-    1) Postgres 테이블 → 2) CSV → 3) 목업
-    """
-    # 1) DB
-    try:
-        from sqlalchemy import text
-        from db_utils import make_conn_str
-        from langchain_community.embeddings import HuggingFaceEmbeddings  # noqa: F401 (ensure LC deps ready)
-        import psycopg2  # ensure driver available
-
-        import sqlalchemy
-        engine = sqlalchemy.create_engine(make_conn_str())
-        with engine.begin() as conn:
-            exists = conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": DB_TABLE}).scalar()
-            if exists:
-                cols = conn.execute(
-                    text("SELECT column_name FROM information_schema.columns WHERE table_name = :t"),
-                    {"t": DB_TABLE},
-                ).fetchall()
-                colset = {c[0].lower() for c in cols}
-                name_col = DB_NAME_COL if DB_NAME_COL.lower() in colset else None
-                ingr_col = DB_INGR_COL if DB_INGR_COL.lower() in colset else None
-                syn_cols = [c for c in DB_SYNONYM_COLS if c.lower() in colset]
-
-                if name_col and ingr_col:
-                    select_cols = [name_col, ingr_col] + syn_cols
-                    rows = conn.execute(text(f'SELECT {", ".join(select_cols)} FROM {DB_TABLE}')).fetchall()
-                    mapping = {}
-                    for row in rows:
-                        rec = dict(zip(select_cols, row))
-                        display = str(rec[name_col]).strip()
-                        main_ingr = ", ".join(_split_multi(rec.get(ingr_col, ""))) or str(rec.get(ingr_col, "")).strip()
-                        aliases = set([display])
-                        for ing in _split_multi(rec.get(ingr_col, "")):
-                            aliases.add(ing)
-                        for sc in syn_cols:
-                            vals = rec.get(sc, "")
-                            cand = _split_multi(vals) or [vals]
-                            for a in cand:
-                                if a:
-                                    aliases.add(str(a).strip())
-                        for a in aliases:
-                            a_norm = _normalize(a)
-                            if a_norm:
-                                mapping[a_norm] = (display, main_ingr)
-                    if mapping:
-                        return mapping
-    except Exception:
-        pass
-
-    # 2) CSV
-    try:
-        if os.path.exists(CSV_PATH):
-            df = pd.read_csv(CSV_PATH, engine="python")
-            cols = {c.lower(): c for c in df.columns}
-            name_col = cols.get(CSV_NAME_COL.lower())
-            ingr_col = cols.get(CSV_INGR_COL.lower())
-            syn_cols = [cols[c.lower()] for c in CSV_SYNONYM_COLS if c.lower() in cols]
-            if name_col and ingr_col:
-                mapping = {}
-                for _, rec in df.iterrows():
-                    display = str(rec[name_col]).strip()
-                    main_ingr = ", ".join(_split_multi(rec.get(ingr_col, ""))) or str(rec.get(ingr_col, "")).strip()
-                    aliases = set([display])
-                    for ing in _split_multi(rec.get(ingr_col, "")):
-                        aliases.add(ing)
-                    for sc in syn_cols:
-                        vals = rec.get(sc, "")
-                        cand = _split_multi(vals) or [vals]
-                        for a in cand:
-                            if a:
-                                aliases.add(str(a).strip())
-                    for a in aliases:
-                        a_norm = _normalize(a)
-                        if a_norm:
-                            mapping[a_norm] = (display, main_ingr)
-                if mapping:
-                    return mapping
-    except Exception:
-        pass
-
-    # 3) 목업
-    return {
-        "아세트아미노펜": ("타이레놀", "아세트아미노펜"),
-        "타이레놀": ("타이레놀", "아세트아미노펜"),
-        "파나돌": ("파나돌", "아세트아미노펜"),
-        "이부프로펜": ("이부프로펜", "이부프로펜"),
-        "애드빌": ("애드빌", "이부프로펜"),
-        "훼스탈": ("훼스탈", "소화효소"),
-        "베아제": ("베아제", "소화효소"),
-        "겔포스": ("겔포스", "알긴산/제산제"),
-        "알마겔": ("알마겔", "알루미늄/마그네슘 제산제"),
-        "지르텍": ("지르텍", "세티리진"),
-        "로페라마이드": ("로페라마이드", "로페라마이드"),
-        "파몰에이": ("파몰에이", "복합감기약"),
-        "콜대원": ("콜대원", "복합감기약"),
-    }
-
-
 def _already_in_wallet(display: str) -> bool:
     for item in st.session_state.pill_wallet:
         if item["name"] == display:
@@ -199,19 +73,11 @@ def process_user_message(user_text: str):
 
 
 def _extract_drugs(text: str):
-    """사전 기반 간단 매칭"""
-    lex = load_drug_synonyms()
-    t = _normalize(text)
-    found = []
-    for alias in sorted(lex.keys(), key=len, reverse=True):
-        if alias and alias in t:
-            found.append(lex[alias])
-    uniq, seen = [], set()
-    for d, i in found:
-        if (d, i) not in seen:
-            uniq.append((d, i))
-            seen.add((d, i))
-    return uniq
+    """
+    사전 기반 매칭 - 메시지를 한 번 훑어 가장 긴 별칭을 겹치지 않게 추출
+    매처는 drug_synonyms.get_drug_matcher()가 프로세스당 한 번 만들어 RAG 검색 필터와 같이 쓴다.
+    """
+    return drug_synonyms.get_drug_matcher().extract(_normalize(text))
 
 
 def _add_to_wallet(display: str, ingredient: str):
@@ -2,7 +2,7 @@
 import streamlit as st
 from dotenv import load_dotenv
 from graph_drug_rag import (
-    get_compiled_graph,
+    stream_once,
     warm_up_pipeline,
 )
 
@@ -20,19 +20,22 @@ def init_page():
 def _get_runner():
     """
     LangGraph를 한 번만 컴파일해 재사용할 실행 함수를 반환합니다.
+    실행 함수는 답변 토큰을 생성되는 대로 흘려보내는 제너레이터입니다.
     """
     warm_up_pipeline()
-    graph = get_compiled_graph()
-
-    def _run(question: str, collection_name: str = "drug_info", k: int = 4):
-        initial_state = {"question": question, "collection_name": collection_name, "k": k}
-        final_state = graph.invoke(initial_state)
-        return {
-            "question": final_state["question"],
-            "answer": final_state.get("answer", ""),
-            "citations": final_state.get("citations", []),
-            "in_domain": final_state.get("in_domain", False),
-        }
+
+    def _run(question: str, collection_name: str = "drug_info", k: int = 4, on_result=None):
+        streamed = False
+        for kind, payload in stream_once(question, collection_name=collection_name, k=k):
+            if kind == "token":
+                streamed = True
+                yield payload
+                continue
+            if on_result is not None:
+                on_result(payload)
+            if not streamed:
+                # 캐시 적중/fallback 답변은 토큰 스트림 없이 한 번에 온다
+                yield payload.get("answer", "")
 
     return _run
 
@@ -44,15 +47,21 @@ def init_display():
     """
     rag_runner = _get_runner()
 
+    def _save_metrics(result: dict):
+        # 디버그 패널(screen/debug.py)에서 보여줄 마지막 질문의 단계별 소요시간/토큰 수
+        st.session_state["last_metrics"] = {
+            "timings": result.get("timings", {}),
+            "tokens": result.get("tokens", {}),
+            "context_tokens": result.get("context_tokens", {}),
+        }
+
     def _provider(prompt: str):
         """
-        run_once(question, collection_name="drug_info")의 결과를
-        Streamlit 스트리밍 형식으로 전달
+        stream_once(question, collection_name="drug_info")의 LLM 토큰을
+        Streamlit 스트리밍 형식으로 그대로 전달
         """
         try:
-            result = rag_runner(prompt, collection_name="drug_info")
-            answer = result.get("answer", "")
-            yield answer
+            yield from rag_runner(prompt, collection_name="drug_info", on_result=_save_metrics)
         except Exception as e:
             yield f"❗ 오류 발생: {e}"
 
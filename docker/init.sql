@@ -1,10 +1,21 @@
 -- pgvector 확장 활성화
 CREATE EXTENSION IF NOT EXISTS vector;
+-- 하이브리드 검색(content 부분일치)용 트라이그램 인덱스
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 CREATE TABLE drug_info (
     id SERIAL PRIMARY KEY,
     content TEXT,                 -- 문서 내용
     embedding VECTOR(1024),       -- OpenAI 등 임베딩 크기에 맞춤
-    metadata JSONB                -- 메타데이터
+    metadata JSONB,               -- 메타데이터
+    content_hash TEXT,            -- 증분 적재용 청크 해시 (제품명/row_index/chunk_index/본문)
+    product_name TEXT,            -- metadata.product_name (제품 필터 검색용)
+    section TEXT                  -- metadata.section (섹션 필터 검색용)
 );
 
+CREATE INDEX drug_info_content_hash_idx ON drug_info (content_hash);
+CREATE INDEX drug_info_product_name_idx ON drug_info (product_name);
+CREATE INDEX drug_info_section_idx ON drug_info (section);
+CREATE INDEX drug_info_metadata_gin_idx ON drug_info USING gin (metadata jsonb_path_ops);
+CREATE INDEX drug_info_content_trgm_idx ON drug_info USING gin (content gin_trgm_ops);
+
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+# app/ 모듈은 app 디렉터리를 기준으로 서로를 import 한다 (streamlit run app/app.py와 같은 방식)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+
+@pytest.fixture(scope="session")
+def pg_uri():
+    """pgvector가 설치된 테스트용 Postgres 주소 (TEST_DATABASE_URL이 없으면 DB 테스트는 건너뜀)"""
+    uri = os.getenv("TEST_DATABASE_URL")
+    if not uri:
+        pytest.skip("TEST_DATABASE_URL이 설정되지 않았습니다.")
+    import psycopg2
+
+    conn = psycopg2.connect(uri)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    conn.close()
+    return uri
+
+
+@pytest.fixture
+def pg_exec(pg_uri):
+    """테스트에서 DDL/검증 쿼리를 바로 실행하는 헬퍼"""
+    import psycopg2
+
+    conn = psycopg2.connect(pg_uri)
+    conn.autocommit = True
+
+    def _exec(sql, params=()):
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall() if cur.description else None
+
+    yield _exec
+    conn.close()
+
+
+@pytest.fixture
+def bare_instance():
+    """
+    생성자(레지스트리, 커넥션 풀, 모델 로딩)를 거치지 않은 인스턴스를 만드는 헬퍼.
+    DB 없이 SQL 조립/인코딩/청크 분할만 시험할 때 쓴다. 생성자 인자의 기본값은 같은 이름의 속성으로 채우고,
+    attrs로 준 속성이 우선한다.
+    """
+    import inspect
+
+    def _make(cls, **attrs):
+        instance = object.__new__(cls)
+        for name, param in inspect.signature(cls.__init__).parameters.items():
+            if param.default is not inspect.Parameter.empty:
+                setattr(instance, name, param.default)
+        for name, value in attrs.items():
+            setattr(instance, name, value)
+        return instance
+
+    return _make
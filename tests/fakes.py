@@ -0,0 +1,27 @@
+import hashlib
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class HashEmbeddings(Embeddings):
+    """텍스트 해시로 정해지는 단위 벡터를 돌려주는 테스트용 임베딩 (같은 텍스트 -> 같은 벡터)"""
+
+    def __init__(self, dim: int = 8, model_name: str = "hash-embeddings") -> None:
+        self.dim = dim
+        self.model_name = model_name
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return self._vector(text)
@@ -0,0 +1,84 @@
+import psycopg2
+import pytest
+
+import graph_drug_rag
+from answer_cache import SemanticAnswerCache, product_key
+
+TABLE = "rag_answer_cache_test"
+EMBEDDING = [1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def cache(pg_uri, pg_exec):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    cache = SemanticAnswerCache(pg_uri, table=TABLE, threshold=0.95)
+    cache.ensure_schema()
+    yield cache
+    cache.close()
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def _store(cache, products, in_domain=True, answer="답변"):
+    return cache.store(EMBEDDING, "drug_info", "model", 5, "질문", answer, [], in_domain, products)
+
+
+def test_product_key_is_order_and_duplicate_insensitive():
+    assert product_key(["타이레놀", "게보린", "타이레놀", ""]) == ["게보린", "타이레놀"]
+
+
+def test_lookup_requires_same_product_set(cache):
+    assert _store(cache, ["타이레놀"])
+
+    # 임베딩이 똑같아도 다른 약을 묻는 질문에는 답변을 돌려주지 않는다
+    assert cache.lookup(EMBEDDING, "drug_info", "model", 5, ["게보린"]) is None
+    assert cache.lookup(EMBEDDING, "drug_info", "model", 5, ["타이레놀", "게보린"]) is None
+    hit = cache.lookup(EMBEDDING, "drug_info", "model", 5, ["타이레놀"])
+    assert hit is not None and hit["answer"] == "답변"
+
+
+def test_lookup_requires_same_section_set(cache):
+    # "지르텍 보관법"과 "지르텍 부작용"은 임베딩이 가까워도 다른 섹션의 답변이다
+    assert cache.store(EMBEDDING, "drug_info", "model", 5, "지르텍 보관법", "보관 답변", [], True, ["지르텍"], ["보관법"])
+
+    assert cache.lookup(EMBEDDING, "drug_info", "model", 5, ["지르텍"], ["이상반응"]) is None
+    assert cache.lookup(EMBEDDING, "drug_info", "model", 5, ["지르텍"]) is None
+    hit = cache.lookup(EMBEDDING, "drug_info", "model", 5, ["지르텍"], ["보관법"])
+    assert hit is not None and hit["answer"] == "보관 답변"
+
+
+def test_multi_product_key_matches_in_any_order(cache):
+    _store(cache, ["타이레놀", "게보린"])
+    assert cache.lookup(EMBEDDING, "drug_info", "model", 5, ["게보린", "타이레놀"]) is not None
+
+
+def test_questions_without_products_are_not_cached(cache, pg_exec):
+    assert not _store(cache, [])
+    assert cache.lookup(EMBEDDING, "drug_info", "model", 5, []) is None
+    assert pg_exec(f"SELECT count(*) FROM {TABLE}") == [(0,)]
+
+
+def test_fallback_answers_are_not_cached(cache, pg_exec):
+    assert not _store(cache, ["타이레놀"], in_domain=False)
+    assert pg_exec(f"SELECT count(*) FROM {TABLE}") == [(0,)]
+
+
+def test_store_purges_expired_rows_when_due(cache, pg_exec):
+    _store(cache, ["타이레놀"])
+    pg_exec(f"UPDATE {TABLE} SET created_at = now() - interval '2 days'")
+
+    cache.purge_interval = 0
+    _store(cache, ["게보린"])
+
+    assert pg_exec(f"SELECT products FROM {TABLE}") == [(["게보린"],)]
+    assert cache.stats()["purged"] == 1
+
+
+def test_cache_nodes_skip_when_cache_pool_cannot_connect(monkeypatch):
+    def unreachable():
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(graph_drug_rag, "get_answer_cache", unreachable)
+    state = {"question": "타이레놀 용법", "collection_name": TABLE, "k": 3, "query_embedding": [0.1] * 8, "in_domain": True}
+
+    assert graph_drug_rag.node_cache_lookup(dict(state))["cache_hit"] is False
+    assert "answer" not in graph_drug_rag.node_cache_store(dict(state))
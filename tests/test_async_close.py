@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from custom_pgvector import CustomPGVector
+from fakes import HashEmbeddings
+
+TABLE = "t_async_close"
+
+
+@pytest.fixture
+def store(pg_uri, pg_exec):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    pg_exec(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, content TEXT, embedding VECTOR(8), metadata JSONB)")
+    store = CustomPGVector(pg_uri, HashEmbeddings(), table=TABLE)
+    store.ensure_schema()
+    store.add_texts(["두통", "치통"])
+    yield store
+    CustomPGVector.release(store)
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def test_close_outside_loop_closes_pool_on_its_idle_loop(store):
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(store.asimilarity_search_with_score("두통", k=1))
+        pool = store._apool
+        store.close()
+        assert pool.closed
+        assert store._apool is None
+    finally:
+        loop.close()
+
+
+def test_close_from_another_thread_waits_for_running_loop(store):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(store.asimilarity_search_with_score("두통", k=1), loop).result()
+        pool = store._apool
+        store.close()
+        assert pool.closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def test_close_inside_loop_schedules_close_and_aclose_waits(store):
+    async def main():
+        await store.asimilarity_search_with_score("두통", k=1)
+        pool = store._apool
+        store.close()
+        await asyncio.sleep(0.1)
+        return pool
+
+    assert asyncio.run(main()).closed
+
+    async def with_aclose():
+        await store.asimilarity_search_with_score("두통", k=1)
+        pool = store._apool
+        await store.aclose()
+        return pool
+
+    assert asyncio.run(with_aclose()).closed
+
+
+def test_close_after_asyncio_run_does_not_raise(store):
+    asyncio.run(store.asimilarity_search_with_score("두통", k=1))
+    store.close()
+    assert store._apool is None
+
+
+def test_async_paths_describe_index_without_sync_pool(store, pg_exec, monkeypatch):
+    pg_exec(f"CREATE INDEX {store.index_name('hnsw')} ON {TABLE} USING hnsw (embedding vector_l2_ops)")
+    store._index_checked = False
+
+    def blocking_fetch(*args, **kwargs):
+        raise AssertionError("async path used the sync pool")
+
+    monkeypatch.setattr(store, "_fetch", blocking_fetch)
+
+    async def main():
+        results = await store.asimilarity_search_with_score("두통", k=1)
+        store._index_checked = False
+        info = await store.awarm_up()
+        await store.aclose()
+        return results, info
+
+    results, info = asyncio.run(main())
+    assert results
+    assert info["method"] == "hnsw"
+
+
+def test_consecutive_asyncio_run_rebuilds_pool_for_new_loop(store):
+    first = asyncio.run(store.asimilarity_search_with_score("두통", k=1))
+    first_pool = store._apool
+    second = asyncio.run(store.asimilarity_search_with_score("두통", k=1))
+    assert second == first
+    assert store._apool is not first_pool
+    store.close()
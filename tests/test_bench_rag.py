@@ -0,0 +1,42 @@
+import benchmark
+
+
+def config(**overrides):
+    summary = {"p50": 10.0, "p95": 20.0, "p99": 30.0, "mean": 12.0}
+    base = {
+        "chunk_strategy": "section",
+        "chunk_size": 1000,
+        "chunk_overlap": 300,
+        "k": 5,
+        "recall_at_k": 0.9,
+        "mrr": 0.8,
+        "embed_ms": summary,
+        "sql_ms": summary,
+        "e2e_ms": summary,
+    }
+    return {**base, **overrides}
+
+
+def test_compare_reports_flags_latency_and_quality_regressions():
+    slow = {"p50": 10.0, "p95": 30.0, "p99": 40.0, "mean": 15.0}
+    report = {"configs": [config(e2e_ms=slow, recall_at_k=0.8)]}
+    regressions = benchmark.compare_reports(report, {"configs": [config()]}, 0.2, 0.01)
+    assert len(regressions) == 2
+    assert "e2e_ms p95" in regressions[0] and "recall_at_k" in regressions[1]
+
+
+def test_compare_reports_matches_configs_by_chunk_strategy():
+    report = {"configs": [config(chunk_strategy="recursive", recall_at_k=0.1)]}
+    assert benchmark.compare_reports(report, {"configs": [config()]}, 0.2, 0.01) == []
+
+    # chunk_strategy가 없는 이전 리포트는 section으로 적재한 것으로 본다
+    old = config(recall_at_k=0.95)
+    del old["chunk_strategy"]
+    assert benchmark.compare_reports({"configs": [config()]}, {"configs": [old]}, 0.2, 0.01)
+
+
+def test_rag_defaults_match_ingest(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["benchmark.py", "rag", "--chunk-strategy", "recursive"])
+    args = benchmark.parse_args()
+    assert args.csv == "../data/drug_info_preprocessed.csv"
+    assert args.chunk_strategy == "recursive"
@@ -0,0 +1,65 @@
+import pytest
+
+from embedding_utils import CachedEmbeddings, embed_queries
+from fakes import HashEmbeddings
+
+
+def cached(tmp_path, model=None, **kwargs):
+    return CachedEmbeddings(
+        model or HashEmbeddings(), "hash-embeddings", True, cache_path=str(tmp_path / "emb.sqlite"), **kwargs
+    )
+
+
+def test_memory_round_trip_and_stats(tmp_path):
+    model = HashEmbeddings()
+    emb = cached(tmp_path, model)
+    first = emb.embed_documents(["두통", "치통"])
+    again = emb.embed_documents(["치통", "두통"])
+    assert again == [first[1], first[0]]
+    assert first[0] == pytest.approx(model._vector("두통"), abs=1e-6)
+    assert model.calls == 2
+    assert emb.stats() == {"memory_hits": 2, "disk_hits": 0, "misses": 2, "hit_rate": 0.5}
+
+
+def test_disk_round_trip_survives_restart(tmp_path):
+    first = cached(tmp_path).embed_documents(["두통", "치통"])
+    model = HashEmbeddings()
+    restarted = cached(tmp_path, model)
+    assert restarted.embed_documents(["두통", "치통"]) == first
+    assert model.calls == 0
+    assert restarted.stats()["disk_hits"] == 2
+
+
+def test_duplicates_in_one_batch_are_embedded_once(tmp_path):
+    model = HashEmbeddings()
+    vectors = cached(tmp_path, model).embed_documents(["두통", "두통", "치통"])
+    assert vectors[0] == vectors[1]
+    assert model.calls == 2
+
+
+def test_query_and_document_keys_are_separate(tmp_path):
+    model = HashEmbeddings()
+    emb = cached(tmp_path, model)
+    emb.embed_documents(["두통"])
+    emb.embed_query("두통")
+    assert model.calls == 2
+    # embed_queries(배치)는 embed_query와 같은 키를 쓴다
+    assert embed_queries(emb, ["두통"]) == [emb.embed_query("두통")]
+    assert model.calls == 2
+
+
+def test_model_options_partition_the_cache(tmp_path):
+    cached(tmp_path).embed_query("두통")
+    model = HashEmbeddings()
+    other = CachedEmbeddings(model, "hash-embeddings", False, cache_path=str(tmp_path / "emb.sqlite"))
+    other.embed_query("두통")
+    assert model.calls == 1
+
+
+def test_memory_lru_evicts_oldest(tmp_path):
+    emb = CachedEmbeddings(HashEmbeddings(), "hash-embeddings", True, memory_size=2)
+    emb.embed_documents(["a", "b", "c"])
+    emb.embed_documents(["a"])  # 메모리에서 밀려났고 디스크 캐시도 없어 다시 계산한다
+    assert emb.stats()["misses"] == 4
+    emb.embed_documents(["c"])
+    assert emb.stats()["memory_hits"] == 1
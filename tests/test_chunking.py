@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from custom_loader import DrugCSVLoader
+from ingest_doc import CustomVectorIngestor, IngestConfig
+
+
+@pytest.fixture
+def ingestor(bare_instance):
+    def _make(chunk_size=60, chunk_overlap=0, chunk_strategy="section"):
+        config = IngestConfig(
+            csv_path="",
+            table_name="t",
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            batch_size=10,
+            reset=False,
+            chunk_strategy=chunk_strategy,
+        )
+        return bare_instance(CustomVectorIngestor, config=config)
+
+    return _make
+
+
+def section_docs(frame):
+    return list(DrugCSVLoader("drugs.csv", dataframe=frame).lazy_load_sections())
+
+
+@pytest.fixture
+def chunks(ingestor):
+    def _chunks(frame, **config):
+        return list(ingestor(**config)._split_documents(section_docs(frame)))
+
+    return _chunks
+
+
+def test_section_header_and_product_name_share_stripped_value():
+    frame = pd.DataFrame({"제품명": ["  게보린정 "], "효능": ["두통"]})
+    (doc,) = section_docs(frame)
+    assert doc.metadata["product_name"] == "게보린정"
+    assert doc.metadata["제품명"] == "게보린정"
+    assert doc.page_content == DrugCSVLoader.section_header("게보린정", "효능") + "두통"
+
+    (row_doc,) = DrugCSVLoader("drugs.csv", dataframe=frame).load()
+    assert row_doc.metadata["product_name"] == "게보린정"
+
+
+def test_long_section_chunks_keep_header(chunks):
+    long_text = ". ".join(f"주의 문장 {i}번입니다" for i in range(12))
+    frame = pd.DataFrame({"제품명": ["게보린정"], "효능": ["두통"], "이상반응": [long_text]})
+    docs = [doc for doc in chunks(frame) if doc.metadata["section"] == "이상반응"]
+    assert len(docs) > 1
+    header = DrugCSVLoader.section_header("게보린정", "이상반응")
+    assert all(doc.page_content.startswith(header) for doc in docs)
+
+
+def test_chunk_index_is_local_to_section(chunks):
+    long_text = ". ".join(f"주의 문장 {i}번입니다" for i in range(12))
+    frame = pd.DataFrame(
+        {"제품명": ["게보린정", "타이레놀"], "효능": [long_text, "해열"], "보관법": ["실온", "실온"]}
+    )
+    indexes = {}
+    for doc in chunks(frame):
+        key = (doc.metadata["row_index"], doc.metadata["section"])
+        indexes.setdefault(key, []).append(doc.metadata["chunk_index"])
+    assert len(indexes[(0, "효능")]) > 1
+    for numbers in indexes.values():
+        assert numbers == list(range(len(numbers)))
+
+
+def test_growing_one_section_keeps_other_section_hashes(chunks):
+    frame = pd.DataFrame({"제품명": ["게보린정"], "효능": ["두통"], "보관법": ["실온 보관"]})
+    before = {doc.metadata["section"]: doc.metadata["content_hash"] for doc in chunks(frame)}
+
+    frame.loc[0, "효능"] = ". ".join(f"효능 문장 {i}번입니다" for i in range(12))
+    after = {doc.metadata["section"]: doc.metadata["content_hash"] for doc in chunks(frame)}
+
+    assert after["보관법"] == before["보관법"]
+    assert after["효능"] != before["효능"]
+
+
+def test_chunk_hash_separates_sections_with_same_index():
+    base = {"product_name": "게보린정", "row_index": 0, "chunk_index": 0}
+    assert CustomVectorIngestor.chunk_hash({**base, "section": "효능"}, "x") != CustomVectorIngestor.chunk_hash(
+        {**base, "section": "보관법"}, "x"
+    )
+    assert CustomVectorIngestor.chunk_hash(base, "x") == CustomVectorIngestor.chunk_hash(dict(base), "x")
+    assert CustomVectorIngestor.chunk_hash(base, "x") != CustomVectorIngestor.chunk_hash(base, "y")
+
+
+def test_recursive_strategy_numbers_chunks_per_document(ingestor):
+    long_text = ". ".join(f"주의 문장 {i}번입니다" for i in range(12))
+    frame = pd.DataFrame({"제품명": ["게보린정"], "효능": [long_text]})
+    docs = DrugCSVLoader("drugs.csv", dataframe=frame).load()
+    split = list(ingestor(chunk_strategy="recursive")._split_documents(docs))
+    assert [doc.metadata["chunk_index"] for doc in split] == list(range(len(split)))
@@ -0,0 +1,70 @@
+from langchain_core.documents import Document
+
+from context_budget import assemble_context, estimate_tokens, merge_chunks
+from custom_loader import DrugCSVLoader
+
+
+def section_doc(product, section, body, chunk_index=0, row_index=0):
+    return Document(
+        page_content=DrugCSVLoader.section_header(product, section) + body,
+        metadata={
+            "product_name": product,
+            "제품명": product,
+            "section": section,
+            "row_index": row_index,
+            "chunk_index": chunk_index,
+        },
+    )
+
+
+def test_estimate_tokens_counts_hangul_per_syllable():
+    assert estimate_tokens("두통약") == 3
+    assert estimate_tokens("abcd efgh") == 2
+    assert estimate_tokens("") == 0
+
+
+def test_merge_chunks_strips_headers_and_overlap():
+    first = "첫 번째 문장입니다. 겹치는 두 번째 문장입니다."
+    second = "겹치는 두 번째 문장입니다. 세 번째 문장입니다."
+    docs = [section_doc("게보린정", "이상반응", second, 1), section_doc("게보린정", "이상반응", first, 0)]
+    header, body = merge_chunks(docs)
+    assert header == DrugCSVLoader.section_header("게보린정", "이상반응")
+    assert body == "첫 번째 문장입니다. 겹치는 두 번째 문장입니다. 세 번째 문장입니다."
+
+
+def test_merge_chunks_joins_without_overlap():
+    docs = [section_doc("게보린정", "효능", "두통", 0), section_doc("게보린정", "효능", "치통", 1)]
+    assert merge_chunks(docs)[1] == "두통 치통"
+
+
+def test_assemble_context_merges_groups_and_drops_duplicate_sentences():
+    repeated = "이 약은 위장 장애를 일으킬 수 있습니다."
+    docs_and_scores = [
+        (section_doc("게보린정", "이상반응", f"{repeated} 발진이 생길 수 있습니다.", 0), 0.1),
+        (section_doc("게보린정", "사용상 주의사항", f"{repeated} 공복 복용을 피하세요.", 0), 0.2),
+        (section_doc("타이레놀정", "이상반응", repeated, 0, row_index=1), 0.3),
+    ]
+    context, stats = assemble_context(docs_and_scores)
+    assert stats["groups"] == 3
+    assert stats["dropped_sentences"] == 1  # 같은 제품 안의 반복만 지운다
+    assert context.count(repeated) == 2
+    assert stats["saved"] == stats["before"] - stats["after"]
+
+
+def test_assemble_context_puts_requested_sections_first_and_respects_budget():
+    docs_and_scores = [
+        (section_doc("게보린정", "효능", "두통, 치통, 생리통에 씁니다."), 0.1),
+        (section_doc("게보린정", "보관법", "실온에 보관하세요. 습기를 피하세요."), 0.2),
+    ]
+    context, _ = assemble_context(docs_and_scores, sections=["보관법"])
+    assert context.index("보관법") < context.index("효능")
+
+    tight, stats = assemble_context(docs_and_scores, budget=1, sections=["보관법"])
+    # 예산이 모자라도 가장 관련 높은 그룹의 첫 문장은 남긴다
+    assert "실온에 보관하세요." in tight
+    assert "두통" not in tight and "습기" not in tight
+    assert stats["after"] < stats["before"]
+
+
+def test_assemble_context_empty():
+    assert assemble_context([]) == ("", {"chunks": 0, "groups": 0, "dropped_sentences": 0, "before": 0, "after": 0, "saved": 0})
@@ -0,0 +1,90 @@
+import argparse
+import struct
+
+import pytest
+
+import benchmark
+from custom_pgvector import WRITE_MODES, CustomPGVector
+from fakes import HashEmbeddings
+
+TABLE = "t_copy_write"
+
+
+def decode_copy(payload: bytes):
+    """COPY (FORMAT BINARY) 스트림을 행 목록(필드 bytes 또는 None)으로 되돌린다."""
+    assert payload.startswith(b"PGCOPY\n\xff\r\n\x00")
+    flags, extension = struct.unpack("!ii", payload[11:19])
+    assert (flags, extension) == (0, 0)
+    pos, rows = 19, []
+    while True:
+        (count,) = struct.unpack("!h", payload[pos : pos + 2])
+        pos += 2
+        if count == -1:
+            assert pos == len(payload)
+            return rows
+        fields = []
+        for _ in range(count):
+            (size,) = struct.unpack("!i", payload[pos : pos + 4])
+            pos += 4
+            if size == -1:
+                fields.append(None)
+                continue
+            fields.append(payload[pos : pos + size])
+            pos += size
+        rows.append(fields)
+
+
+def test_copy_payload_encodes_fields(bare_instance):
+    store = bare_instance(CustomPGVector)
+    payload = store._copy_payload(
+        ["제품명: 게보린정", "본문"],
+        [[1.0, -2.5], [0.0, 0.5]],
+        [{"product_name": "게보린정", "section": "효능", "row_index": 3}, {}],
+    )
+    first, second = decode_copy(payload)
+    assert len(first) == 3 + len(CustomPGVector.PROMOTED_COLUMNS)
+    assert first[0].decode("utf-8") == "제품명: 게보린정"
+    # pgvector 바이너리: dim(int2), unused(int2), float4 값들
+    assert first[1] == struct.pack("!hh2f", 2, 0, 1.0, -2.5)
+    assert first[2][:1] == b"\x01" and b'"row_index": 3' in first[2]
+    assert first[3:] == [None, "게보린정".encode("utf-8"), "효능".encode("utf-8")]
+    assert second[2] == b"\x01{}"
+    assert second[3:] == [None, None, None]
+
+
+@pytest.fixture
+def store(pg_uri, pg_exec):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    pg_exec(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, content TEXT, embedding VECTOR(8), metadata JSONB)")
+    store = CustomPGVector(pg_uri, HashEmbeddings(), table=TABLE)
+    store.ensure_schema()
+    yield store
+    CustomPGVector.release(store)
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def test_write_modes_store_identical_rows(store, pg_exec):
+    texts = ["제품명: 게보린정 | 효능: 두통", "따옴표 \"와 \\ 역슬래시", "빈 메타데이터"]
+    metadatas = [{"product_name": "게보린정", "section": "효능", "content_hash": "h0"}, {"row_index": 1}, {}]
+    stored = {}
+    for mode in WRITE_MODES:
+        pg_exec(f"TRUNCATE {TABLE}")
+        store.add_texts(texts, metadatas, mode=mode)
+        stored[mode] = pg_exec(
+            f"SELECT content, embedding::text, metadata, content_hash, product_name, section FROM {TABLE} ORDER BY id"
+        )
+    assert stored["copy"] == stored["values"] == stored["row"]
+    assert stored["copy"][0][4] == "게보린정"
+
+
+def test_bench_write_scratch_table_has_its_own_id_sequence(pg_uri, pg_exec, store, monkeypatch, capsys):
+    store.add_texts(["원본"])
+    sequence = pg_exec(f"SELECT pg_get_serial_sequence('{TABLE}', 'id')")[0][0]
+    before = pg_exec(f"SELECT last_value FROM {sequence}")[0][0]
+
+    monkeypatch.setattr(benchmark, "make_conn_str", lambda: pg_uri)
+    benchmark.bench_write(argparse.Namespace(table=TABLE, rows=20, batch_size=8, modes=["copy", "values"]))
+
+    assert pg_exec(f"SELECT last_value FROM {sequence}")[0][0] == before
+    assert pg_exec(f"SELECT to_regclass('{TABLE}_bench_write')")[0][0] is None
+    assert "rows/sec" in capsys.readouterr().out
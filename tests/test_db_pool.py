@@ -0,0 +1,49 @@
+import time
+
+import psycopg2
+import pytest
+
+from db_utils import PgConnectionPool
+
+
+@pytest.fixture
+def pool(pg_uri):
+    pool = PgConnectionPool(pg_uri, minconn=1, maxconn=2, health_check_interval=30.0)
+    yield pool
+    pool.close()
+
+
+def test_first_checkout_counts_idle_time_from_now(pool):
+    conn = pool._getconn()
+    # 처음 빌린 커넥션을 오래 쉰 것으로 보지 않으므로 _is_healthy가 SELECT 1을 건너뛴다
+    assert time.monotonic() - pool._last_used[conn] < pool.health_check_interval
+    pool._checkin(conn, broken=False)
+
+
+def test_connections_closed_by_the_pool_are_forgotten(pool):
+    with pool.connection() as first, pool.connection() as second:
+        pass
+    # minconn=1이라 하나는 반납 때 닫히고, 열린 커넥션만 남는다
+    assert [conn for conn in (first, second) if not conn.closed] == list(pool._last_used)
+
+
+def test_run_retries_connection_errors_then_reraises(pool):
+    calls = []
+
+    def flaky(conn):
+        calls.append(conn)
+        if len(calls) == 1:
+            raise psycopg2.OperationalError("server closed the connection")
+        return "ok"
+
+    assert pool.run(flaky) == "ok"
+    assert len(calls) == 2
+
+    def broken(conn):
+        calls.append(conn)
+        raise psycopg2.OperationalError("server closed the connection")
+
+    calls.clear()
+    with pytest.raises(psycopg2.OperationalError):
+        pool.run(broken, retries=2)
+    assert len(calls) == 3
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from domain_guard import EmbeddingDomainGuard, load_examples
+
+
+class KeywordEmbeddings(Embeddings):
+    """'약'이 들어가면 (1, 0), '날씨'가 들어가면 (0, 1) 쪽을 가리키는 2차원 임베딩"""
+
+    def embed_query(self, text):
+        return [float("약" in text), float("날씨" in text)]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+EXAMPLES = [("감기약 추천", True), ("두통약 복용법", True), ("오늘 날씨", False), ("내일 날씨", False)]
+
+
+def test_classify_yes_no_and_uncertain():
+    guard = EmbeddingDomainGuard(KeywordEmbeddings(), EXAMPLES, uncertainty=0.1)
+    assert guard.classify("소화제 같은 약 알려줘") is True
+    assert guard.classify("주말 날씨 어때") is False
+    # 양쪽 중심과 같은 거리면 LLM guard로 넘기도록 판단을 보류한다
+    assert guard.classify("날씨가 추울 때 먹는 약") is None
+    assert guard.score("약") == pytest.approx(1.0)
+
+
+def test_uncertainty_band_controls_abstention():
+    strict = EmbeddingDomainGuard(KeywordEmbeddings(), EXAMPLES, uncertainty=2.0)
+    assert strict.classify("감기약") is None
+    assert strict.classify("날씨") is None
+
+
+def test_examples_need_both_labels():
+    with pytest.raises(ValueError):
+        EmbeddingDomainGuard(KeywordEmbeddings(), [("감기약", True)])
+
+
+def test_load_examples_accepts_string_and_bool_labels(tmp_path):
+    path = tmp_path / "examples.jsonl"
+    rows = [{"question": "해열제", "label": "yes"}, {"question": "주식", "label": "NO"}, {"question": "연고", "label": True}]
+    path.write_text("\n".join(json.dumps(row, ensure_ascii=False) for row in rows) + "\n\n", encoding="utf-8")
+    assert load_examples(str(path)) == [("해열제", True), ("주식", False), ("연고", True)]
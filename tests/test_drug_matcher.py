@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from drug_matcher import AliasMatcher
+
+
+def brute_force(aliases, text):
+    return sorted(
+        (start, start + len(alias), alias)
+        for alias in aliases
+        for start in range(len(text) - len(alias) + 1)
+        if text.startswith(alias, start)
+    )
+
+
+def test_finditer_reports_overlapping_and_nested_aliases():
+    matcher = AliasMatcher({"he": 1, "she": 2, "his": 3, "hers": 4})
+    assert sorted(matcher.finditer("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_finditer_matches_brute_force(seed):
+    rng = random.Random(seed)
+    alphabet = "abc"
+    aliases = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(12)}
+    text = "".join(rng.choice(alphabet) for _ in range(60))
+    matcher = AliasMatcher({alias: alias for alias in aliases})
+    assert sorted(matcher.finditer(text)) == brute_force(aliases, text)
+
+
+def test_find_longest_prefers_leftmost_longest_without_overlap():
+    matcher = AliasMatcher({"타이레놀": "T", "타이레놀정": "T500", "레놀": "R", "정": "J"})
+    assert matcher.find_longest("타이레놀정 먹어도 돼?") == [(0, 5, "타이레놀정")]
+    assert matcher.find_longest("레놀정") == [(0, 2, "레놀"), (2, 3, "정")]
+
+
+def test_extract_returns_unique_values_in_order():
+    matcher = AliasMatcher(
+        {
+            "타이레놀": ("타이레놀", "아세트아미노펜"),
+            "아세트아미노펜": ("타이레놀", "아세트아미노펜"),
+            "지르텍": ("지르텍", "세티리진"),
+        }
+    )
+    assert matcher.extract("지르텍이랑 타이레놀(아세트아미노펜) 같이 먹어도 돼?") == [
+        ("지르텍", "세티리진"),
+        ("타이레놀", "아세트아미노펜"),
+    ]
+    assert matcher.extract("") == []
+
+
+def test_empty_aliases_are_ignored():
+    matcher = AliasMatcher({"": 0, "a": 1})
+    assert len(matcher) == 1
+    assert matcher.extract("banana") == [1]
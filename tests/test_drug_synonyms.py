@@ -0,0 +1,47 @@
+import pytest
+
+import db_utils
+import drug_synonyms
+
+TABLE = "t_drug_synonyms"
+
+
+@pytest.fixture
+def db_source(pg_uri, pg_exec, monkeypatch, tmp_path):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    pg_exec(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, product_name TEXT, ingredient TEXT, brand_name TEXT)")
+    pg_exec(f"INSERT INTO {TABLE} (product_name, ingredient, brand_name) VALUES ('게보린정', '아세트아미노펜', '게보린')")
+    monkeypatch.setattr(db_utils, "make_conn_str", lambda: pg_uri)
+    monkeypatch.setattr(drug_synonyms, "DB_TABLE", TABLE)
+    monkeypatch.setattr(drug_synonyms, "DB_SYNONYM_COLS", ["brand_name"])
+    monkeypatch.setattr(drug_synonyms, "SYNONYM_CACHE_PATH", str(tmp_path / "synonyms.pkl"))
+    builds = []
+    build_alias_map = drug_synonyms.build_alias_map
+
+    def counting_build(*args, **kwargs):
+        builds.append(1)
+        return build_alias_map(*args, **kwargs)
+
+    monkeypatch.setattr(drug_synonyms, "build_alias_map", counting_build)
+    yield builds
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def test_db_synonyms_reuse_artifact_until_table_changes(db_source, pg_exec):
+    first = drug_synonyms._from_db()
+    assert first["게보린"] == ("게보린정", "아세트아미노펜")
+    assert drug_synonyms._from_db() == first
+    assert len(db_source) == 1
+
+    pg_exec(f"INSERT INTO {TABLE} (product_name, ingredient, brand_name) VALUES ('타이레놀정', '아세트아미노펜', '타이레놀')")
+    assert "타이레놀" in drug_synonyms._from_db()
+    assert len(db_source) == 2
+
+    pg_exec(f"UPDATE {TABLE} SET brand_name = '게보린큐' WHERE product_name = '게보린정'")
+    assert "게보린큐" in drug_synonyms._from_db()
+    assert len(db_source) == 3
+
+    pg_exec(f"TRUNCATE {TABLE}")
+    pg_exec(f"INSERT INTO {TABLE} (product_name, ingredient, brand_name) VALUES ('판피린', '복합감기약', '판피린큐')")
+    assert "판피린큐" in drug_synonyms._from_db()
+    assert len(db_source) == 4
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+import graph_drug_rag
+from custom_pgvector import CustomPGVector
+from fakes import HashEmbeddings
+
+TABLE = "t_graph_retrieval"
+
+
+@pytest.fixture
+def graph_env(pg_uri, pg_exec, monkeypatch):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    pg_exec(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, content TEXT, embedding VECTOR(8), metadata JSONB)")
+    emb = HashEmbeddings()
+    store = CustomPGVector(pg_uri, emb, table=TABLE)
+    store.ensure_schema()
+    store.add_texts(
+        [f"제품명: 약{i} | 효능: 두통 {i}" for i in range(10)],
+        [{"제품명": f"약{i}", "product_name": f"약{i}"} for i in range(10)],
+    )
+    monkeypatch.setattr(graph_drug_rag, "make_conn_str", lambda: pg_uri)
+    monkeypatch.setattr(graph_drug_rag, "get_embedding_model", lambda name=None: emb)
+    monkeypatch.setattr(graph_drug_rag, "detect_products", lambda text: [])
+    emb.calls = 0
+    yield emb
+    CustomPGVector.release(store)
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+@pytest.mark.parametrize("mode", ["vector", "hybrid"])
+def test_retrieve_reuses_query_embedding(graph_env, monkeypatch, mode):
+    monkeypatch.setenv("RAG_SEARCH_MODE", mode)
+    state = {"question": "두통", "collection_name": TABLE, "k": 3, "query_embedding": graph_env.embed_query("두통")}
+    graph_env.calls = 0
+
+    update = graph_drug_rag.node_retrieve(state)
+    assert len(update["retrieved_docs"]) == 3
+    assert graph_env.calls == 0
+
+    update = asyncio.run(graph_drug_rag.anode_retrieve(state))
+    assert len(update["retrieved_docs"]) == 3
+    assert graph_env.calls == 0
+
+
+def test_retrieve_embeds_when_state_has_no_embedding(graph_env):
+    graph_drug_rag.node_retrieve({"question": "두통", "collection_name": TABLE, "k": 3})
+    assert graph_env.calls == 1
+
+
+def test_iter_batch_questions_keeps_zero_id(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    rows = [{"id": 0, "question": "첫 질문"}, {"question": "id 없는 질문"}, {"id": "q2", "question": " "}]
+    path.write_text("\n".join(json.dumps(row, ensure_ascii=False) for row in rows), encoding="utf-8")
+
+    assert list(graph_drug_rag.iter_batch_questions(str(path))) == [
+        {"id": 0, "question": "첫 질문"},
+        {"id": 1, "question": "id 없는 질문"},
+    ]
+
+
+def test_iter_batch_questions_reads_korean_csv_column(tmp_path):
+    path = tmp_path / "questions.csv"
+    path.write_text("질문\n타이레놀 효능\n", encoding="utf-8")
+    assert list(graph_drug_rag.iter_batch_questions(str(path))) == [{"id": 0, "question": "타이레놀 효능"}]
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from custom_pgvector import CustomPGVector, lexical_terms
+from fakes import HashEmbeddings
+
+TABLE = "t_hybrid_search"
+
+
+def test_lexical_terms_strips_particles():
+    assert lexical_terms("타이레놀은 어떤 효능이 있나요?") == ["타이레놀"]
+    assert lexical_terms("아세트아미노펜을 먹어도 되나요") == ["아세트아미노펜"]
+
+
+def test_lexical_terms_drops_request_words_and_short_terms():
+    assert lexical_terms("게보린 부작용 알려줘") == ["게보린", "부작용"]
+    assert lexical_terms("두통에 좋은 약 알려주세요") == []
+    assert lexical_terms("부루펜시럽에 대해서 설명해줘") == ["부루펜시럽"]
+
+
+def test_lexical_terms_deduplicates_in_order():
+    assert lexical_terms("게보린과 게보린의 차이") == ["게보린"]
+    assert lexical_terms("두통 두통", min_length=2) == ["두통"]
+
+
+@pytest.fixture
+def store(pg_uri, pg_exec):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    pg_exec(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, content TEXT, embedding VECTOR(8), metadata JSONB)")
+    emb = HashEmbeddings()
+    store = CustomPGVector(pg_uri, emb, table=TABLE)
+    store.ensure_schema()
+    store.add_texts(
+        [f"제품명: 약{i} | 효능: 두통 {i}" for i in range(10)] + ["제품명: 게보린정 | 효능: 두통, 치통"],
+        [{"product_name": f"약{i}"} for i in range(10)] + [{"product_name": "게보린정"}],
+    )
+    yield store
+    CustomPGVector.release(store)
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def test_hybrid_score_is_vector_distance(store):
+    question = "게보린정 효능 알려줘"
+    hybrid = store.hybrid_search_with_score(question, k=11)
+    vector = dict(
+        (doc.page_content, score) for doc, score in store.similarity_search_with_score(question, k=11)
+    )
+
+    # score는 벡터 검색과 같은 거리, 순서는 RRF 점수(클수록 가까움) 순
+    for doc, score in hybrid:
+        assert score == pytest.approx(vector[doc.page_content])
+    rrf_scores = [doc.metadata["rrf_score"] for doc, _ in hybrid]
+    assert rrf_scores == sorted(rrf_scores, reverse=True)
+    assert hybrid[0][0].metadata["product_name"] == "게보린정"
+
+    async_hybrid = asyncio.run(store.ahybrid_search_with_score(question, k=11))
+    assert [(doc.page_content, score) for doc, score in async_hybrid] == [
+        (doc.page_content, score) for doc, score in hybrid
+    ]
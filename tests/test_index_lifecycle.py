@@ -0,0 +1,50 @@
+import pytest
+
+from custom_pgvector import CustomPGVector
+from fakes import HashEmbeddings
+from ingest_doc import CustomVectorIngestor, IngestConfig
+
+TABLE = "t_index_lifecycle"
+
+
+@pytest.fixture
+def store(pg_uri, pg_exec):
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+    pg_exec(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, content TEXT, embedding VECTOR(8), metadata JSONB)")
+    store = CustomPGVector(pg_uri, HashEmbeddings(), table=TABLE, distance="l2")
+    store.ensure_schema()
+    store.add_texts([f"문서 {i}" for i in range(20)])
+    yield store
+    CustomPGVector.release(store)
+    pg_exec(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+@pytest.fixture
+def ingestor_for(bare_instance):
+    def _make(store, **config):
+        config = IngestConfig(
+            csv_path="", table_name=TABLE, chunk_size=500, chunk_overlap=50, batch_size=10, reset=False, **config
+        )
+        return bare_instance(CustomVectorIngestor, vectorstore=store, config=config)
+
+    return _make
+
+
+def test_describe_index_does_not_change_search_distance(store, pg_exec):
+    pg_exec(f"CREATE INDEX {TABLE}_cos_idx ON {TABLE} USING hnsw (embedding vector_cosine_ops)")
+    info = store.describe_index(refresh=True)
+    assert info["distance"] == "cosine"
+    assert store.distance == "l2"
+
+
+def test_build_index_skips_same_method_and_distance(store, ingestor_for):
+    store.create_index("hnsw", "l2")
+    stats = ingestor_for(store, index_method="hnsw", index_distance="l2")._build_index({})
+    assert "index" not in stats
+
+
+def test_build_index_rebuilds_when_distance_differs(store, ingestor_for):
+    store.create_index("hnsw", "l2")
+    stats = ingestor_for(store, index_method="hnsw", index_distance="cosine")._build_index({})
+    assert stats["index"]["opclass"] == "vector_cosine_ops"
+    assert store.describe_index()["distance"] == "cosine"
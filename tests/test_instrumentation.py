@@ -0,0 +1,28 @@
+import pytest
+
+from instrumentation import MetricsRegistry, percentile
+
+
+def test_percentile_interpolates_linearly():
+    values = [4.0, 1.0, 3.0, 2.0, 5.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 100) == 5.0
+    assert percentile(values, 95) == pytest.approx(4.8)
+    assert percentile([1.0, 2.0], 50) == pytest.approx(1.5)
+
+
+def test_percentile_edge_cases():
+    assert percentile([], 95) == 0.0
+    assert percentile([7.0], 95) == 7.0
+    assert percentile(iter([1.0, 2.0, 3.0]), 50) == 2.0
+
+
+def test_prometheus_quantiles_use_percentile():
+    registry = MetricsRegistry(window=10)
+    for ms in (10.0, 20.0, 30.0, 40.0):
+        registry.observe({"retrieve": ms}, {})
+    text = registry.prometheus_text()
+    assert 'rag_stage_latency_ms{stage="retrieve",quantile="0.5"} 25.000' in text
+    assert 'rag_stage_latency_ms{stage="retrieve",quantile="0.95"} 38.500' in text
+    assert 'rag_stage_latency_ms_count{stage="retrieve"} 4' in text
@@ -0,0 +1,69 @@
+import pytest
+
+from custom_pgvector import CustomPGVector
+
+
+@pytest.fixture
+def bare_store(bare_instance):
+    def _make(index_info):
+        return bare_instance(CustomPGVector, table="t", _index_info=index_info, _index_checked=True)
+
+    return _make
+
+
+HNSW_OLD = {"method": "hnsw", "options": {}, "iterative_scan": False}
+HNSW_NEW = {"method": "hnsw", "options": {}, "iterative_scan": True}
+IVFFLAT_NEW = {"method": "ivfflat", "options": {"lists": "100"}, "iterative_scan": True}
+
+
+def recording_fetch(store, monkeypatch):
+    calls = []
+
+    def fetch(query, params=(), settings=None):
+        calls.append((query, params, settings))
+        return []
+
+    monkeypatch.setattr(store, "_fetch", fetch)
+    return calls
+
+
+def test_filtered_vector_search_is_one_query_with_iterative_scan(bare_store, monkeypatch):
+    store = bare_store(HNSW_NEW)
+    calls = recording_fetch(store, monkeypatch)
+
+    store.similarity_search_with_score_by_vector([0.0, 1.0], k=5, products=["게보린정"])
+
+    assert len(calls) == 1
+    query, params, settings = calls[0]
+    assert "md5(content)" in query
+    assert 15 in params  # k * over_fetch_factor 후보를 한 번만 요청
+    assert ("hnsw.iterative_scan", "strict_order") in settings
+
+
+def test_hybrid_search_is_one_query(bare_store, monkeypatch):
+    store = bare_store(HNSW_NEW)
+    calls = recording_fetch(store, monkeypatch)
+
+    store.hybrid_search_with_score("게보린 효능", k=5, sections=["효능"], embedding=[0.0, 1.0])
+
+    assert len(calls) == 1
+    assert 20 in calls[0][1]
+
+
+@pytest.mark.parametrize(
+    "info, filtered, expected",
+    [
+        (HNSW_OLD, True, None),
+        (HNSW_NEW, False, None),
+        (IVFFLAT_NEW, True, ("ivfflat.iterative_scan", "relaxed_order")),
+        (IVFFLAT_NEW, False, None),
+    ],
+)
+def test_iterative_scan_only_for_filtered_searches_on_supported_pgvector(bare_store, info, filtered, expected):
+    settings = bare_store(info)._search_settings(15, filtered=filtered)
+    iterative = [setting for setting in settings if setting[0].endswith("iterative_scan")]
+    assert iterative == ([expected] if expected else [])
+
+
+def test_no_index_means_no_search_settings(bare_store):
+    assert bare_store(None)._search_settings(15, filtered=True) == []
@@ -0,0 +1,52 @@
+import pytest
+
+from custom_pgvector import CustomPGVector, StoreRegistry
+from embedding_utils import CachedEmbeddings
+from fakes import HashEmbeddings
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    monkeypatch.setattr(StoreRegistry, "_instances", type(StoreRegistry._instances)())
+    yield
+    CustomPGVector.close_all()
+
+
+def test_same_arguments_reuse_instance(pg_uri):
+    emb = HashEmbeddings()
+    first = CustomPGVector(pg_uri, emb, table="t_registry")
+    assert CustomPGVector(conn_str=pg_uri, embedding_fn=emb, table="t_registry") is first
+    # 기본값을 명시해도 같은 설정이므로 같은 인스턴스
+    assert CustomPGVector(pg_uri, emb, table="t_registry", distance="l2") is first
+
+
+@pytest.mark.parametrize(
+    "option",
+    [{"distance": "cosine"}, {"write_mode": "values"}, {"pool_max": 2}, {"over_fetch_factor": 5}],
+)
+def test_different_config_gets_own_instance(pg_uri, option):
+    emb = HashEmbeddings()
+    first = CustomPGVector(pg_uri, emb, table="t_registry")
+    other = CustomPGVector(pg_uri, emb, table="t_registry", **option)
+    assert other is not first
+    for name, value in option.items():
+        assert getattr(other, name, getattr(other.pool, "maxconn", None)) == value
+
+
+def test_cached_and_raw_embeddings_do_not_share_instance(pg_uri):
+    raw = HashEmbeddings(model_name="same-model")
+    cached = CachedEmbeddings(raw, "same-model", normalize=True)
+    assert CustomPGVector(pg_uri, raw, table="t_registry") is not CustomPGVector(pg_uri, cached, table="t_registry")
+
+
+def test_eviction_closes_evicted_store(pg_uri, monkeypatch):
+    monkeypatch.setattr(StoreRegistry, "max_instances", 1)
+    emb = HashEmbeddings()
+    evicted = CustomPGVector(pg_uri, emb, table="t_registry_a")
+    kept = CustomPGVector(pg_uri, emb, table="t_registry_b")  # evicted를 레지스트리에서 밀어낸다
+
+    assert CustomPGVector.instances() == [kept]
+    assert evicted.pool.closed
+    assert not kept.pool.closed
+    # 다시 만들면 새 풀을 가진 인스턴스가 된다
+    assert CustomPGVector(pg_uri, emb, table="t_registry_a")._fetch("SELECT 1") == [(1,)]
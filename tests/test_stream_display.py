@@ -0,0 +1,18 @@
+from screen.display import throttled_stream
+
+
+def test_throttled_stream_renders_first_token_then_every_n_tokens_and_at_end():
+    tokens = [f"t{i} " for i in range(10)]
+    renders = list(throttled_stream(iter(tokens), every=4))
+    assert renders == ["".join(tokens[:1]), "".join(tokens[:5]), "".join(tokens[:9]), "".join(tokens)]
+
+
+def test_throttled_stream_exact_multiple_has_no_duplicate_final_render():
+    renders = list(throttled_stream(["a", "b", "c", "d", "e"], every=2))
+    assert renders == ["a", "abc", "abcde"]
+
+
+def test_throttled_stream_edge_cases():
+    assert list(throttled_stream([], every=3)) == []
+    assert list(throttled_stream(["한 번에 온 답변"], every=8)) == ["한 번에 온 답변"]
+    assert list(throttled_stream(["a", "b"], every=0)) == ["a", "ab"]